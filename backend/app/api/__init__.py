@@ -3,8 +3,16 @@ from fastapi import APIRouter
 from app.api.chat import router as chat_router
 from app.api.books import router as books_router
 from app.api.auth import router as auth_router
+from app.api.shards import router as shards_router
+from app.api.admin import router as admin_router
+from app.api.themes import router as themes_router
+from app.api.suggest import router as suggest_router
 
 router = APIRouter()
 router.include_router(auth_router, tags=["auth"])
 router.include_router(chat_router, tags=["chat"])
 router.include_router(books_router, tags=["books"])
+router.include_router(shards_router, tags=["shards"])
+router.include_router(admin_router, tags=["admin"])
+router.include_router(themes_router, tags=["themes"])
+router.include_router(suggest_router, tags=["suggest"])
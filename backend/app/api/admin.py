@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Request, HTTPException, Header
+import hmac, logging
+from typing import Optional
+from app.config import ADMIN_TOKEN
+
+router = APIRouter()
+
+
+def _get_reloader(request: Request):
+    reloader = getattr(request.app.state, "index_reloader", None)
+    if reloader is None:
+        logging.error("Index reloader is not initialized.")
+        raise HTTPException(
+            status_code=500, detail="Server error: Index reloader not initialized."
+        )
+    return reloader
+
+
+# -----------------------------------------------------------------------------
+# Route: Reload Search Index
+# Rebuilds the search index from the corpus files in the background and swaps it
+# in atomically; in-flight requests finish on the previous snapshot.
+# -----------------------------------------------------------------------------
+@router.post("/admin/reload", status_code=202)
+async def reload_index(
+    request: Request, x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    Start a background reload of the search index. Requires the `X-Admin-Token`
+    header to match `ADMIN_TOKEN`; the endpoint is disabled when no token is set.
+    """
+    if not ADMIN_TOKEN or not hmac.compare_digest(
+        (x_admin_token or "").encode(), ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    reloader = _get_reloader(request)
+    if reloader.reloading:
+        raise HTTPException(status_code=409, detail="A reload is already running.")
+    reloader.reload_in_background("admin")
+    return reloader.status()
+
+
+# -----------------------------------------------------------------------------
+# Route: Index Version
+# Reports which corpus snapshot is serving and the state of the last reload.
+# -----------------------------------------------------------------------------
+@router.get("/index/version")
+async def index_version(request: Request):
+    """
+    Return the active index version, its size, vector index type, reload status and
+    how many sharded searches were answered without every shard.
+    """
+    engine = getattr(request.app.state, "search_engine", None)
+    return {
+        **_get_reloader(request).status(),
+        # The index actually serving, e.g. after falling back from sharded search.
+        "backend": type(engine.index).__name__ if engine is not None else None,
+        # Sharded searches answered without every shard.
+        "degraded_responses": (
+            getattr(engine.index, "degraded_responses", 0) if engine is not None else 0
+        ),
+    }
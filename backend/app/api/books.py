@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Request, HTTPException
-import json, logging
+from fastapi import APIRouter, Request, HTTPException, Query
+import json, logging, asyncio
 from fastapi.responses import StreamingResponse
-from app.schemas.api import BookRequest
-from app.services.profanity import contains_profanity
-from app.services.semantic_search import (
-    create_vector_embedding,
-    calculate_similarity_scores,
-    get_top_k_books,
+import numpy as np
+from app.config import (
+    BATCH_SEARCH_CHUNK_SIZE,
+    SUBJECT_ROUTER_LIVE_RESULTS,
+    SUBJECT_ROUTER_LIVE_TIMEOUT,
+    SUBJECT_ROUTER_MIN_BOOKS,
 )
+from app.schemas.api import BatchSearchRequest, BookRequest
+from app.services.profanity import contains_profanity
 from app.services.preprocessing import preprocess_book
 from app.services.rag_pipeline import sse_response_generator
 from app.clients.llm_client import DeepSeekAPIClient
+from app.services.semantic_search import create_vector_embeddings
+from app.services.themes import public_book_fields
+from app.services.subject_router import live_subject_books, routed_filters
+from app.services.suggest import picked_suggestion_books
 
 
 router = APIRouter()
@@ -33,8 +39,12 @@ async def search_books(
     The process involves:
       1. Cleaning and validating the user query.
       2. Retrieving the language model, device, book embeddings, and metadata from application state.
-      3. Checking a Redis cache for previously computed results.
-      4. Running the RAG pipeline to produce a JSON array of recommendations.
+      3. Answering a query that names a book exactly from that book and its
+         neighbours, without encoding the query.
+      4. Replaying the cached answer of a near-identical earlier query, if any.
+      5. Routing the query to its subjects, adding live Open Library results when the
+         corpus has few books under them.
+      6. Running the RAG pipeline to produce a JSON array of recommendations.
     """
     # Clean the query by stripping whitespace and converting to lowercase.
     query = payload.query.strip().lower()
@@ -44,65 +54,140 @@ async def search_books(
     if contains_profanity(query):
         raise HTTPException(status_code=403, detail="Profanity is not allowed.")
 
-    # 2. Retrieve Model and Device from the application state
-    model = getattr(request.app.state, "model", None)
-    device = getattr(request.app.state, "device", "cpu")
-    if model is None:
+    # 2. Retrieve the query embedding batcher from the application state
+    embedding_batcher = getattr(request.app.state, "embedding_batcher", None)
+    if embedding_batcher is None:
         logging.error("Model is not loaded in application state.")
         raise HTTPException(
             status_code=500, detail="Server error: Model not initialized."
         )
 
-    # 3. Retrieve precomputed book embeddings and metadata from application state.
-    document_embeddings = getattr(request.app.state, "document_embeddings", None)
-    books_metadata = getattr(request.app.state, "books_metadata", None)
-
-    if document_embeddings is None or books_metadata is None:
-        logging.error("Book embeddings or metadata are not loaded.")
+    # 3. Retrieve the search engine built over the precomputed book embeddings.
+    search_engine = getattr(request.app.state, "search_engine", None)
+    if search_engine is None:
+        logging.error("Book data not loaded.")
         raise HTTPException(
             status_code=500, detail="Server error: Book data not available."
         )
+    try:
+        field_weights = search_engine.resolve_field_weights(payload.field_weights)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
-    # 3. Retrieve Book Embeddings & Metadata
-    document_embeddings = getattr(request.app.state, "document_embeddings", None)
-    books_metadata = getattr(request.app.state, "books_metadata", None)
-    if document_embeddings is None or books_metadata is None:
-        logging.error("Book data not loaded.")
-        raise HTTPException(
-            status_code=500, detail="Server error: Book data not available."
+    try:
+        filters = payload.filters()
+        if filters:
+            logging.info(f"Applying metadata filters: {filters}")
+
+        # 4. Short-circuit Picked Suggestions
+        # A request carrying a title picked from /suggest retrieves that book and its
+        # nearest neighbours without encoding the query.
+        result_cache = getattr(request.app.state, "result_cache", None)
+        query_embedding = None
+        top_books = (
+            picked_suggestion_books(search_engine, payload.book_id, k=5)
+            if payload.book_id and not filters
+            else []
         )
+        if top_books:
+            logging.info(f"Picked suggestion: '{top_books[0].get('title')}'")
+        else:
+            # ---------------------------
+            # 5. Generate Query Embedding and Calculate Similarity
+            # ---------------------------
 
-    # 4. Check Redis Cache
-    # book_cache: BookCacheClient = request.app.state.book_cache
-    # if book_cache:
-    #     cache_key = f"books:{query}"
-    #     cached_results = book_cache.get_books(cache_key)
-    #     if cached_results:
-    #         logging.info("Cache hit: Returning cached search results.")
-    #         # Return immediately so no duplicate streaming occurs.
-    #         return JSONResponse(content=json.loads(cached_results))
-    # else:
-    #     logging.warning("Redis cache client unavailable. Proceeding without caching.")
+            # Convert the search query into an embedding vector. Repeated queries are
+            # served from the embedding cache; misses are batched with concurrent queries
+            # into one forward pass that runs off the event loop.
+            query_cache = getattr(request.app.state, "query_embedding_cache", None)
+            if query_cache is not None:
+                query_embedding = await query_cache.get_or_embed(
+                    query, embedding_batcher.embed
+                )
+            else:
+                query_embedding = await embedding_batcher.embed(query)
 
-    try:
-        # ---------------------------
-        # 5. Generate Query Embedding and Calculate Similarity
-        # ---------------------------
+            # 6. Check the Semantic Result Cache
+            # A near-identical earlier query (same index version, filters and field
+            # weights) replays its recorded recommendation stream instead of generating
+            # a new one.
+            cache_scope = (
+                f"{search_engine.version}:"
+                f"{json.dumps([filters, field_weights], sort_keys=True)}"
+            )
+            if result_cache is not None:
+                cached = await result_cache.lookup(query_embedding, cache_scope)
+                if cached is not None:
+                    logging.info(
+                        f"Result cache hit: '{cached['query']}' "
+                        f"(similarity={cached['similarity']:.3f})"
+                    )
+                    return StreamingResponse(
+                        result_cache.replay(cached["chunks"]),
+                        media_type="text/event-stream",
+                    )
 
-        # Convert the search query into an embedding vector
-        query_embedding = create_vector_embedding(model, query, device)
+            # 7. Route the Query to Subjects
+            # A query that clearly matches some subjects only searches the books under
+            # them. If the corpus holds too few of those books, live Open Library results
+            # for the subjects are fetched while the local search runs. Routing scans
+            # the metadata indexes, so it runs in a worker thread too.
+            search_filters, live_subjects = await asyncio.to_thread(
+                routed_filters,
+                getattr(request.app.state, "subject_router", None),
+                search_engine.metadata_index,
+                query_embedding,
+                filters,
+                SUBJECT_ROUTER_MIN_BOOKS,
+            )
+            if search_filters is not filters:
+                logging.info(f"Routed query to subjects: {search_filters['subjects']}")
+            live_books = None
+            open_library = getattr(request.app.state, "open_library", None)
+            if live_subjects and open_library is not None:
+                logging.info(
+                    f"Fetching live results for thin subjects: {live_subjects}"
+                )
+                live_books = asyncio.create_task(
+                    live_subject_books(
+                        open_library,
+                        live_subjects,
+                        SUBJECT_ROUTER_LIVE_RESULTS,
+                        SUBJECT_ROUTER_LIVE_TIMEOUT,
+                    )
+                )
 
-        # Compare the query embedding against the book embeddings to compute similarity scores.
-        similarity_scores = calculate_similarity_scores(
-            query_embedding, document_embeddings
-        )
+            # 8. Retrieve Top Book Recommendations
+            # Score the query against the normalized corpus and keep the top 5 books.
+            # With metadata filters only the matching books are scored.
+            # Title and author keyword matches are fused in by the lexical index.
+            # Search runs in a worker thread: sharded search waits on its shards.
+            try:
+                top_results = await asyncio.to_thread(
+                    search_engine.top_k_books,
+                    query_embedding,
+                    k=5,
+                    filters=search_filters,
+                    query_text=query,
+                    field_weights=field_weights,
+                )
+            except BaseException:
+                # Don't leave the live lookup running for a request that failed.
+                if live_books is not None:
+                    live_books.cancel()
+                raise
+            for book, score in top_results:
+                logging.info(f"Retrieved '{book.get('title')}' (score={score:.4f})")
+            top_books = [book for book, _ in top_results]
+            if live_books is not None:
+                titles = {book.get("title", "").lower() for book in top_books}
+                top_books += [
+                    book
+                    for book in await live_books
+                    if book["title"].lower() not in titles
+                ]
 
-        # 6. Retrieve Top Book Recommendations
-        # Based on similarity scores, retrieve the top 5 recommended books.
-        top_books = get_top_k_books(similarity_scores, books_metadata, k=5)
-        print("Top Books:")
-        print(top_books)
-        # 7. Construct the LLM Prompt
+        # 9. Construct the LLM Prompt
         book_summaries = [preprocess_book(book) for book in top_books]
         llm_prompt = (
             f"User query: '{query}'. RAG system has retrieved relevant book details:\n\n"
@@ -116,7 +201,7 @@ async def search_books(
             "Return only the JSON array."
         )
 
-        # 8. Prepare LLM Client & Streaming
+        # 10. Prepare LLM Client & Streaming
         llm_client = DeepSeekAPIClient()
 
         messages = [
@@ -127,15 +212,194 @@ async def search_books(
             {"role": "user", "content": llm_prompt},
         ]
 
-        # 9. Return the StreamingResponse.
+        # 11. Return the StreamingResponse, recording it for the result cache.
         # return StreamingResponse(generate(), media_type="text/event-stream")
-        return StreamingResponse(
-            sse_response_generator(llm_client, "deepseek-chat", messages, 0.7),
-            media_type="text/event-stream",
-        )
+        stream = sse_response_generator(llm_client, "deepseek-chat", messages, 0.7)
+        if result_cache is not None and query_embedding is not None:
+            stream = result_cache.record(stream, query, query_embedding, cache_scope)
+        return StreamingResponse(stream, media_type="text/event-stream")
 
     except Exception as e:
         logging.error(f"Search failed: {e}")
         raise HTTPException(
             status_code=500, detail="An error occurred while processing your request."
         )
+
+
+async def search_query_batch(
+    state, search_engine, queries: list, k: int, field_weights: dict = None
+) -> list:
+    """
+    Answer a batch of queries: cached embeddings are reused, the rest are encoded in a
+    single forward pass, and all queries are scored together in one index pass against
+    the given search engine snapshot.
+
+    Returns:
+        list: One result per query: {"query", "results": [book fields + "score"]}, or
+              {"query", "error"} when the query is rejected.
+    """
+    allowed = [query for query in queries if query and not contains_profanity(query)]
+    embeddings = {}
+
+    query_cache = getattr(state, "query_embedding_cache", None)
+    if query_cache is not None:
+        cached = await asyncio.gather(*(query_cache.aget(query) for query in allowed))
+        for query, vector in zip(allowed, cached):
+            if vector is not None:
+                embeddings[query] = vector[0]
+
+    misses = list(dict.fromkeys(query for query in allowed if query not in embeddings))
+    if misses:
+        # Encode on the host's shared embedding server when one is configured.
+        embedding_client = getattr(state, "embedding_client", None)
+        if embedding_client is not None:
+            encoded = await embedding_client.embed_batch(misses)
+        else:
+            encoded = await asyncio.to_thread(
+                create_vector_embeddings, state.model, misses, state.device
+            )
+        for query, vector in zip(misses, encoded):
+            embeddings[query] = vector
+        if query_cache is not None:
+            await asyncio.gather(
+                *(query_cache.aput(query, embeddings[query]) for query in misses)
+            )
+
+    top_results = []
+    if allowed:
+        top_results = await asyncio.to_thread(
+            search_engine.top_k_books_batch,
+            np.stack([embeddings[query] for query in allowed]),
+            k,
+            allowed,
+            field_weights,
+        )
+    results_by_query = dict(zip(allowed, top_results))
+
+    batch_results = []
+    for query in queries:
+        if query not in results_by_query:
+            error = "Empty query." if not query else "Profanity is not allowed."
+            batch_results.append({"query": query, "error": error})
+            continue
+        batch_results.append(
+            {
+                "query": query,
+                "results": [
+                    {
+                        **{
+                            key: value
+                            for key, value in book.items()
+                            if key != "embedding_input"
+                        },
+                        "score": score,
+                    }
+                    for book, score in results_by_query[query]
+                ],
+            }
+        )
+    return batch_results
+
+
+# -----------------------------------------------------------------------------
+# Route: Batch Search Books
+# Retrieval-only search for many queries in one request, without the LLM step.
+# Queries are encoded in one batched forward pass and scored with one
+# matrix-matrix product per corpus chunk.
+# -----------------------------------------------------------------------------
+@router.post("/search_books/batch")
+async def search_books_batch(request: Request, payload: BatchSearchRequest):
+    """
+    Return the top-k books with scores for every query in the request.
+
+    Results come back as one JSON object, or with `stream` set, as NDJSON with one line
+    per query, emitted as each chunk of `BATCH_SEARCH_CHUNK_SIZE` queries is scored.
+    """
+    state = request.app.state
+    # Read the snapshot once so the whole batch is served by the same index version.
+    search_engine = getattr(state, "search_engine", None)
+    if (
+        getattr(state, "model", None) is None
+        and getattr(state, "embedding_client", None) is None
+    ):
+        logging.error("Model is not loaded in application state.")
+        raise HTTPException(
+            status_code=500, detail="Server error: Model not initialized."
+        )
+    if search_engine is None:
+        logging.error("Book data not loaded.")
+        raise HTTPException(
+            status_code=500, detail="Server error: Book data not available."
+        )
+
+    try:
+        field_weights = search_engine.resolve_field_weights(payload.field_weights)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    queries = [query.strip().lower() for query in payload.queries]
+    logging.info(f"Processing batch of {len(queries)} search queries")
+    chunks = [
+        queries[start : start + BATCH_SEARCH_CHUNK_SIZE]
+        for start in range(0, len(queries), BATCH_SEARCH_CHUNK_SIZE)
+    ]
+
+    if payload.stream:
+
+        async def ndjson_generator():
+            for chunk in chunks:
+                for result in await search_query_batch(
+                    state, search_engine, chunk, payload.k, field_weights
+                ):
+                    yield json.dumps(result) + "\n"
+
+        return StreamingResponse(ndjson_generator(), media_type="application/x-ndjson")
+
+    try:
+        results = []
+        for chunk in chunks:
+            results.extend(
+                await search_query_batch(
+                    state, search_engine, chunk, payload.k, field_weights
+                )
+            )
+        return {"results": results}
+    except Exception as e:
+        logging.error(f"Batch search failed: {e}")
+        raise HTTPException(
+            status_code=500, detail="An error occurred while processing your request."
+        )
+
+
+# -----------------------------------------------------------------------------
+# Route: Similar Books
+# "More like this" for a book, read from the precomputed kNN graph: no query
+# encoding and no corpus scan.
+# -----------------------------------------------------------------------------
+@router.get("/books/{book_id}/similar")
+async def similar_books(
+    request: Request, book_id: str, k: int = Query(10, ge=1, le=100)
+):
+    """Return the k books most similar to a book, with their similarity scores."""
+    search_engine = getattr(request.app.state, "search_engine", None)
+    if search_engine is None:
+        logging.error("Book data not loaded.")
+        raise HTTPException(
+            status_code=500, detail="Server error: Book data not available."
+        )
+    if search_engine.knn_graph is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Similar books are not available; run the kNN graph pipeline.",
+        )
+    try:
+        neighbors = search_engine.knn_graph.similar(book_id, k)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown book {book_id}.")
+    return {
+        "book_id": book_id,
+        "similar": [
+            {**public_book_fields(search_engine.books_metadata[row]), "score": score}
+            for row, score in neighbors
+        ],
+    }
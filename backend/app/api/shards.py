@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Request, HTTPException, Header
+import asyncio, hmac, logging
+from typing import Optional
+import numpy as np
+from app.config import SHARD_TOKEN, VECTOR_INDEX_BACKEND
+from app.schemas.api import ShardSearchRequest
+from app.services.semantic_search import normalize_embeddings
+from app.services.sharding import (
+    build_shard_index,
+    fit_shard_projection,
+    shard_backend_params,
+)
+
+router = APIRouter()
+
+
+# -----------------------------------------------------------------------------
+# Route: Shard Search
+# Serves one shard (a contiguous row range) of this node's corpus to a
+# scatter-gather coordinator configured with this node's URL in SEARCH_SHARDS.
+# -----------------------------------------------------------------------------
+@router.post("/shards/search")
+async def search_shard(
+    request: Request,
+    payload: ShardSearchRequest,
+    x_shard_token: Optional[str] = Header(default=None),
+):
+    """
+    Return the top-k rows of the requested shard for each query. Row ids are relative
+    to the start of the shard; the coordinator maps them back to corpus rows.
+
+    Requires the `X-Shard-Token` header to match `SHARD_TOKEN`; the endpoint is
+    disabled when no token is set.
+    """
+    if not SHARD_TOKEN or not hmac.compare_digest(
+        (x_shard_token or "").encode(), SHARD_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid shard token.")
+    search_engine = getattr(request.app.state, "search_engine", None)
+    embeddings = getattr(search_engine, "embeddings", None)
+    if embeddings is None:
+        logging.error("Book data not loaded.")
+        raise HTTPException(
+            status_code=500, detail="Server error: Book data not available."
+        )
+    if payload.stop > len(embeddings) or payload.start >= payload.stop:
+        raise HTTPException(status_code=400, detail="Invalid shard row range.")
+
+    # Slicing the memory-mapped corpus is free; keep one index per served range of
+    # the active snapshot, built with the same backend as local shard workers. Reduced
+    # indexes share one projection fitted on this node's full corpus, which matches
+    # the coordinator's fit of the same corpus version.
+    shard_indexes = getattr(request.app.state, "shard_indexes", None)
+    if shard_indexes is None:
+        shard_indexes = request.app.state.shard_indexes = {}
+    key = (search_engine.version, payload.start, payload.stop)
+    for stale in [other for other in shard_indexes if other[0] != key[0]]:
+        del shard_indexes[stale]
+    if (key[0], "projection") not in shard_indexes:
+        shard_indexes[key[0], "projection"] = await asyncio.to_thread(
+            fit_shard_projection, embeddings
+        )
+    if key not in shard_indexes:
+        shard_indexes[key] = await asyncio.to_thread(
+            build_shard_index,
+            VECTOR_INDEX_BACKEND,
+            embeddings[payload.start : payload.stop],
+            shard_indexes[key[0], "projection"],
+            **shard_backend_params(VECTOR_INDEX_BACKEND),
+        )
+
+    queries = normalize_embeddings(np.asarray(payload.queries, dtype=np.float32))
+    results = await asyncio.to_thread(
+        shard_indexes[key].search_batch, queries, payload.k
+    )
+    return {
+        "results": [
+            {"rows": rows.tolist(), "scores": scores.tolist()}
+            for rows, scores in results
+        ]
+    }
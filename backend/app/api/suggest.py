@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Request, HTTPException, Query
+import logging
+from app.config import SUGGEST_LIMIT
+
+router = APIRouter()
+
+
+# -----------------------------------------------------------------------------
+# Route: Suggest
+# Typeahead completions for the search box: titles, authors and subjects starting
+# with the typed words, most popular first. Served from the in-memory prefix index;
+# no query is encoded.
+# -----------------------------------------------------------------------------
+@router.get("/suggest")
+async def suggest(
+    request: Request,
+    q: str = Query(..., max_length=200),
+    k: int = Query(SUGGEST_LIMIT, ge=1, le=20),
+):
+    """Return up to k completions of a partial query."""
+    search_engine = getattr(request.app.state, "search_engine", None)
+    if search_engine is None:
+        logging.error("Book data not loaded.")
+        raise HTTPException(
+            status_code=500, detail="Server error: Book data not available."
+        )
+    if search_engine.suggest_index is None:
+        raise HTTPException(status_code=503, detail="Suggestions are disabled.")
+    suggestions = search_engine.suggest_index.suggest(q, k)
+    for suggestion in suggestions:
+        row = suggestion.pop("row", None)
+        if row is not None:
+            book = search_engine.books_metadata[row]
+            suggestion["book_id"] = book.get("book_id")
+            suggestion["author"] = book.get("author", "")
+    return {"query": q, "suggestions": suggestions}
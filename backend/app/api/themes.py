@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Request, HTTPException, Query
+import logging
+from app.config import THEMES_PAGE_SIZE
+
+router = APIRouter()
+
+
+def _get_snapshot(request: Request):
+    """The active search engine snapshot, which must carry a theme catalog."""
+    search_engine = getattr(request.app.state, "search_engine", None)
+    if search_engine is None:
+        logging.error("Book data not loaded.")
+        raise HTTPException(
+            status_code=500, detail="Server error: Book data not available."
+        )
+    if search_engine.themes is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Themes are not available; run the themes pipeline.",
+        )
+    return search_engine
+
+
+# -----------------------------------------------------------------------------
+# Route: Browse Themes
+# Lists the topic clusters built offline over the corpus, each with a short label
+# and its most representative books. Served from memory; no query is encoded.
+# -----------------------------------------------------------------------------
+@router.get("/themes")
+async def list_themes(request: Request):
+    """Return every theme with its label, size and representative books."""
+    search_engine = _get_snapshot(request)
+    return {
+        "version": search_engine.version,
+        "themes": search_engine.themes.summaries(search_engine.books_metadata),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Route: Theme Books
+# Pages through the books of one theme, most central to the theme first.
+# -----------------------------------------------------------------------------
+@router.get("/themes/{theme_id}")
+async def theme_books(
+    request: Request,
+    theme_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(THEMES_PAGE_SIZE, ge=1, le=100),
+):
+    """Return one page of a theme's books with their similarity to the theme."""
+    search_engine = _get_snapshot(request)
+    try:
+        return search_engine.themes.page(
+            search_engine.books_metadata, theme_id, offset, limit
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown theme {theme_id}.")
@@ -22,6 +22,7 @@ class CacheClient:
         db (int): Redis database number (default 0).
         default_ttl (int): Default time-to-live in seconds for cached items (default 3600).
         redis (redis.Redis): The Redis connection instance, or None if connection fails.
+        binary_redis (redis.Redis): A connection that returns raw bytes, for binary values.
     """
 
     def __init__(
@@ -54,9 +55,17 @@ class CacheClient:
                 )
             else:
                 raise redis.ConnectionError("Ping failed")
+            self.binary_redis = redis.Redis(
+                host=self.host,
+                port=self.port,
+                db=self.db,
+                password=self.password,
+                decode_responses=False,  # Values such as vectors are raw bytes
+            )
         except redis.ConnectionError as e:
             logging.error(f"Redis connection failed: {e}")
             self.redis = None  # Fallback to avoid crashes; methods will check this
+            self.binary_redis = None
 
     def is_healthy(self) -> bool:
         """
@@ -130,6 +139,49 @@ class CacheClient:
             logging.error(f"Cache set failed for key {normalized_key}: {e}")
             return False
 
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """
+        Retrieve a raw binary value by key, without JSON deserialization.
+
+        Args:
+            key (str): The cache key (normalized internally).
+
+        Returns:
+            bytes: The stored bytes if found, None if key doesn’t exist or Redis is down.
+        """
+        if not self.binary_redis:
+            logging.warning("Redis unavailable; skipping cache get")
+            return None
+        normalized_key = self._normalize_key(key)
+        try:
+            return self.binary_redis.get(normalized_key)
+        except redis.RedisError as e:
+            logging.error(f"Cache get failed for key {normalized_key}: {e}")
+            return None
+
+    def set_bytes(self, key: str, value: bytes, ttl: Optional[int] = None) -> bool:
+        """
+        Store a raw binary value (e.g. a float32 vector) with an optional TTL.
+
+        Args:
+            key (str): The cache key (normalized internally).
+            value (bytes): The bytes to store as-is.
+            ttl (int, optional): Time-to-live in seconds; uses default_ttl if None.
+
+        Returns:
+            bool: True if successful, False if Redis is unavailable or operation fails.
+        """
+        if not self.binary_redis:
+            logging.warning("Redis unavailable; skipping cache set")
+            return False
+        normalized_key = self._normalize_key(key)
+        try:
+            self.binary_redis.setex(normalized_key, ttl or self.default_ttl, value)
+            return True
+        except redis.RedisError as e:
+            logging.error(f"Cache set failed for key {normalized_key}: {e}")
+            return False
+
     def set_hash(self, key: str, data: Dict[str, str]) -> bool:
         """
         Store a dictionary as a Redis hash under the given key (no TTL by default).
@@ -8,6 +8,180 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 BOOK_EMBEDDINGS_FILE = (
     BASE_DIR / "app" / "data" / "book_metadata" / "book_embeddings.json"
 )
+BOOK_INDEX_FILE = BASE_DIR / "app" / "data" / "book_metadata" / "book_embeddings.bin"
 BOOK_METADATA_FILE = BASE_DIR / "app" / "data" / "book_metadata" / "book_metadata.json"
+BOOK_PASSAGES_FILE = BASE_DIR / "app" / "data" / "book_metadata" / "book_passages.bin"
+BOOK_FIELDS_FILE = BASE_DIR / "app" / "data" / "book_metadata" / "book_fields.bin"
+SUBJECTS_FILE = BASE_DIR / "app" / "data" / "book_metadata" / "subjects.json"
+SUBJECT_INDEX_FILE = (
+    BASE_DIR / "app" / "data" / "book_metadata" / "subject_embeddings.bin"
+)
+KNN_GRAPH_DIR = BASE_DIR / "app" / "data" / "book_metadata" / "knn_graph"
+THEMES_DIR = BASE_DIR / "app" / "data" / "book_metadata" / "themes"
+BOOK_ALIASES_FILE = BASE_DIR / "app" / "data" / "book_metadata" / "book_aliases.json"
 FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "http://localhost:3000")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+
+# Query encoder inference backend: "torch" (fp32), "torch-int8" (dynamic int8
+# quantization), or "onnx" / "onnx-int8" (ONNX Runtime; requires onnxruntime and
+# artifacts from `python -m app.services.encoders export`).
+QUERY_ENCODER_BACKEND = os.getenv("QUERY_ENCODER_BACKEND", "torch")
+QUERY_ENCODER_DIR = Path(
+    os.getenv(
+        "QUERY_ENCODER_DIR",
+        BASE_DIR / "app" / "data" / "models" / f"{EMBEDDING_MODEL_NAME}-onnx",
+    )
+)
+
+# Offline corpus embedding build.
+EMBEDDING_BUILD_BATCH_SIZE = int(os.getenv("EMBEDDING_BUILD_BATCH_SIZE", "64"))
+EMBEDDING_BUILD_CHECKPOINT_ROWS = int(
+    os.getenv("EMBEDDING_BUILD_CHECKPOINT_ROWS", "10000")
+)
+EMBEDDING_BUILD_WORKERS = int(os.getenv("EMBEDDING_BUILD_WORKERS", "0"))
+
+# Micro-batching of concurrent query encodes.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+
+# Shared embedding server (`python -m app.services.embedding_server`): when set, API
+# workers send query encodes to the server on this Unix socket instead of loading the
+# model themselves. Empty = each worker loads its own model.
+EMBEDDING_SERVER_SOCKET = os.getenv("EMBEDDING_SERVER_SOCKET", "")
+EMBEDDING_SERVER_TIMEOUT = float(os.getenv("EMBEDDING_SERVER_TIMEOUT", "2"))
+
+# Query embedding cache: in-process LRU, optionally backed by Redis.
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+QUERY_CACHE_REDIS = os.getenv("QUERY_CACHE_REDIS", "true").lower() == "true"
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Vector index backend used by /search_books: "exact" (brute-force scan), "ivf",
+# or the quantized "int8" / "binary" indexes that re-rank with float vectors.
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "exact")
+# Optional dimensionality reduction of the index: project the corpus and every query
+# down to VECTOR_INDEX_DIM dimensions with "pca" or "truncate" (Matryoshka-style
+# models). 0 keeps the full dimension.
+VECTOR_INDEX_DIM = int(os.getenv("VECTOR_INDEX_DIM", "0")) or None
+VECTOR_INDEX_PROJECTION = os.getenv("VECTOR_INDEX_PROJECTION", "pca")
+VECTOR_INDEX_DIR = (
+    BASE_DIR
+    / "app"
+    / "data"
+    / "book_metadata"
+    / (
+        f"{VECTOR_INDEX_BACKEND}_{VECTOR_INDEX_PROJECTION}{VECTOR_INDEX_DIM}_index"
+        if VECTOR_INDEX_DIM
+        else f"{VECTOR_INDEX_BACKEND}_index"
+    )
+)
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0")) or None  # 0 = 4 * sqrt(num_books)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+QUANTIZED_SHORTLIST = int(os.getenv("QUANTIZED_SHORTLIST", "100"))
+VECTOR_INDEX_PARAMS = {
+    "ivf": {"nlist": IVF_NLIST, "nprobe": IVF_NPROBE},
+    "int8": {"shortlist": QUANTIZED_SHORTLIST},
+    "binary": {"shortlist": QUANTIZED_SHORTLIST},
+}
+
+# Hybrid retrieval: BM25 over title/author/subjects fused with vector search using
+# reciprocal rank fusion over the top HYBRID_CANDIDATES of each ranking. Opt-in, since
+# it changes the default ranking and reports RRF values instead of cosine scores.
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "false").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Multi-vector descriptions: each description is embedded as overlapping passages of
+# PASSAGE_MAX_WORDS words (PASSAGE_STRIDE apart), and a book scores as its best passage.
+# Opt-in, since it changes the default ranking.
+PASSAGE_SEARCH = os.getenv("PASSAGE_SEARCH", "false").lower() == "true"
+# Candidates of the vector index whose passages are scored per query.
+PASSAGE_CANDIDATES = int(os.getenv("PASSAGE_CANDIDATES", "100"))
+PASSAGE_MAX_WORDS = int(os.getenv("PASSAGE_MAX_WORDS", "96"))
+PASSAGE_STRIDE = int(os.getenv("PASSAGE_STRIDE", "64"))
+
+# Per-field embeddings: title, author and subjects are embedded separately, and books
+# score as a weighted sum of the whole-book and per-field similarities. Requests may
+# override the default weights, given as "field:weight" pairs. Opt-in, since it
+# changes the default ranking.
+FIELD_SEARCH = os.getenv("FIELD_SEARCH", "false").lower() == "true"
+# Candidates of the vector index rescored with the field weights per query.
+FIELD_CANDIDATES = int(os.getenv("FIELD_CANDIDATES", "100"))
+FIELD_WEIGHTS = {
+    field.strip(): float(weight)
+    for field, weight in (
+        pair.split(":")
+        for pair in os.getenv(
+            "FIELD_WEIGHTS", "book:1,title:0.5,author:0.25,subjects:0.5"
+        ).split(",")
+        if pair.strip()
+    )
+}
+
+# Subject routing: each query is matched against the embedded Open Library subjects.
+# When its best subjects score at least SUBJECT_ROUTER_MIN_SCORE, search is restricted
+# to the books under the top SUBJECT_ROUTER_TOP_N subjects, provided the corpus holds
+# at least SUBJECT_ROUTER_MIN_BOOKS of them; otherwise live Open Library results for
+# those subjects supplement the local ones. Opt-in, since it changes the default
+# ranking and can call Open Library during a search.
+SUBJECT_ROUTING = os.getenv("SUBJECT_ROUTING", "false").lower() == "true"
+SUBJECT_ROUTER_TOP_N = int(os.getenv("SUBJECT_ROUTER_TOP_N", "3"))
+SUBJECT_ROUTER_MIN_SCORE = float(os.getenv("SUBJECT_ROUTER_MIN_SCORE", "0.4"))
+SUBJECT_ROUTER_MIN_BOOKS = int(os.getenv("SUBJECT_ROUTER_MIN_BOOKS", "20"))
+SUBJECT_ROUTER_LIVE_RESULTS = int(os.getenv("SUBJECT_ROUTER_LIVE_RESULTS", "3"))
+SUBJECT_ROUTER_LIVE_TIMEOUT = float(os.getenv("SUBJECT_ROUTER_LIVE_TIMEOUT", "2"))
+
+# Browse-by-theme: clusters built offline by the themes pipeline, each listing
+# THEMES_REPRESENTATIVES books in /themes and paged by /themes/{id}.
+THEMES_NUM_CLUSTERS = int(os.getenv("THEMES_NUM_CLUSTERS", "64"))
+THEMES_REPRESENTATIVES = int(os.getenv("THEMES_REPRESENTATIVES", "5"))
+THEMES_PAGE_SIZE = int(os.getenv("THEMES_PAGE_SIZE", "20"))
+
+# "More like this": neighbours precomputed per book by the kNN graph pipeline.
+KNN_GRAPH_NEIGHBORS = int(os.getenv("KNN_GRAPH_NEIGHBORS", "20"))
+
+# /suggest typeahead: prefix index over titles, authors and subjects, built with each
+# corpus snapshot. An exact title match also lets /search_books skip query encoding.
+SUGGEST_INDEX = os.getenv("SUGGEST_INDEX", "true").lower() == "true"
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "8"))
+
+# /search_books/batch: maximum queries per request, and queries encoded and scored
+# per forward pass (also the granularity of NDJSON streaming).
+BATCH_SEARCH_MAX_QUERIES = int(os.getenv("BATCH_SEARCH_MAX_QUERIES", "1000"))
+BATCH_SEARCH_CHUNK_SIZE = int(os.getenv("BATCH_SEARCH_CHUNK_SIZE", "128"))
+
+# Sharded search: one entry per shard, "local" for a worker process on this host or a
+# remote node's base URL (e.g. "local,local,http://search-b:8000"). Empty = unsharded.
+SEARCH_SHARDS = [
+    shard.strip()
+    for shard in os.getenv("SEARCH_SHARDS", "").split(",")
+    if shard.strip()
+]
+SHARD_TIMEOUT = float(os.getenv("SHARD_TIMEOUT", "5"))
+
+# Near-duplicate collapsing at index build: minimum estimated Jaccard similarity of
+# the word shingles of two books' embedding inputs (0 disables deduplication).
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+# Hot reload of the search index: watch the corpus files and reload on change, and
+# the token required by the admin reload endpoint (unset disables the endpoint).
+INDEX_WATCH = os.getenv("INDEX_WATCH", "false").lower() == "true"
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Token a sharded-search coordinator sends to remote nodes' /shards/search endpoint in
+# the X-Shard-Token header; defaults to ADMIN_TOKEN, and unset disables the endpoint.
+SHARD_TOKEN = os.getenv("SHARD_TOKEN", "") or ADMIN_TOKEN
+
+# Shared corpus across workers: directory (ideally tmpfs, e.g. /dev/shm/lexi-gpt)
+# where the first worker publishes the normalized embeddings and a compact metadata
+# blob that every worker memory-maps read-only. Empty = each worker loads its own.
+SHARED_CORPUS_DIR = os.getenv("SHARED_CORPUS_DIR", "")
+
+# Semantic result cache: replay the recorded recommendation stream of an earlier query
+# whose embedding has cosine similarity >= RESULT_CACHE_THRESHOLD (same index version
+# and filters). Streams are stored in Redis; RESULT_CACHE_SIZE query vectors are kept
+# per worker.
+RESULT_CACHE = os.getenv("RESULT_CACHE", "true").lower() == "true"
+RESULT_CACHE_THRESHOLD = float(os.getenv("RESULT_CACHE_THRESHOLD", "0.9"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(24 * 3600)))
@@ -1,5 +1,6 @@
 import os
 import signal
+import functools
 import logging
 import multiprocessing
 from pathlib import Path
@@ -9,17 +10,43 @@ import torch
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from sentence_transformers import SentenceTransformer
 
 from app.config import (
     FRONTEND_ORIGIN,
-    BOOK_EMBEDDINGS_FILE,
-    BOOK_METADATA_FILE,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_WAIT_MS,
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_SERVER_SOCKET,
+    EMBEDDING_SERVER_TIMEOUT,
+    INDEX_WATCH,
+    QUERY_CACHE_REDIS,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL,
+    QUERY_ENCODER_BACKEND,
     REDIS_URL,
+    RESULT_CACHE,
+    RESULT_CACHE_SIZE,
+    RESULT_CACHE_THRESHOLD,
+    RESULT_CACHE_TTL,
+    SHARD_TIMEOUT,
+    SUBJECT_INDEX_FILE,
+    SUBJECT_ROUTER_MIN_SCORE,
+    SUBJECT_ROUTER_TOP_N,
+    SUBJECT_ROUTING,
+    SUBJECTS_FILE,
 )
 from app.api import router as api_router
 from app.clients.cache_client import CacheClient
-from app.pipelines.load import load_book_embeddings, load_book_metadata
+from app.clients.open_library_api_client import OpenLibraryAPI
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import QueryEmbeddingCache
+from app.services.embedding_server import EmbeddingClient, EmbeddingServerError
+from app.services.encoders import load_query_encoder
+from app.services.index_reload import IndexReloader
+from app.services.result_cache import SemanticResultCache
+from app.services.semantic_search import create_vector_embeddings
+from app.services.sharding import ShardedIndex
+from app.services.subject_router import SubjectRouter, load_subject_names
 from app.session_middleware import SessionMiddleware
 
 
@@ -46,27 +73,91 @@ async def lifespan(app: FastAPI):
     """Handles startup and shutdown events for FastAPI."""
     logging.info("Starting application...")
 
-    # Load pre-trained SentenceTransformer model on startup.
-    try:
-        app.state.model = SentenceTransformer("all-MiniLM-L6-v2")
-        app.state.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logging.info(f"Model initialized using device: {app.state.device}")
-    except Exception as e:
-        logging.error(f"Failed to load model: {e}")
-        app.state.model = None  # Avoids AttributeError in routes
+    # With a shared embedding server the model lives once per host in that process;
+    # this worker only keeps a thin client with the same `embed` interface.
+    app.state.embedding_client = None
+    if EMBEDDING_SERVER_SOCKET:
+        app.state.model = None
+        app.state.device = "cpu"
+        app.state.embedding_client = EmbeddingClient(
+            EMBEDDING_SERVER_SOCKET, timeout=EMBEDDING_SERVER_TIMEOUT
+        )
+        app.state.embedding_batcher = app.state.embedding_client
+        logging.info(f"Using the embedding server at {EMBEDDING_SERVER_SOCKET}")
+    else:
+        # Load the query encoder for the configured inference backend on startup.
+        try:
+            app.state.model = load_query_encoder(QUERY_ENCODER_BACKEND)
+            app.state.device = "cuda" if torch.cuda.is_available() else "cpu"
+            if QUERY_ENCODER_BACKEND != "torch":
+                app.state.device = "cpu"
+            logging.info(
+                f"Model initialized with '{QUERY_ENCODER_BACKEND}' encoder "
+                f"using device: {app.state.device}"
+            )
+        except Exception as e:
+            logging.error(f"Failed to load model: {e}")
+            app.state.model = None  # Avoids AttributeError in routes
 
-    # Load embeddings & metadata or retrieve from cache if available.
-    try:
+        # Batch concurrent query encodes into single forward passes off the event loop.
+        app.state.embedding_batcher = None
+        if app.state.model is not None:
+            app.state.embedding_batcher = EmbeddingBatcher(
+                functools.partial(
+                    create_vector_embeddings, app.state.model, device=app.state.device
+                ),
+                max_batch_size=EMBEDDING_BATCH_SIZE,
+                max_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+            )
+            await app.state.embedding_batcher.start()
 
-        app.state.document_embeddings = load_book_embeddings(str(BOOK_EMBEDDINGS_FILE))
-        app.state.books_metadata = load_book_metadata(str(BOOK_METADATA_FILE))
-        if app.state.document_embeddings is None or app.state.books_metadata is None:
-            raise ValueError("Embeddings or metadata failed to load.")
-        logging.info(f"Loaded {len(app.state.books_metadata)} books successfully.")
+    # Load embeddings, metadata and indexes as one immutable search engine snapshot,
+    # which the reloader can later rebuild and swap in without a restart.
+    app.state.search_engine = None
+    app.state.document_embeddings = None
+    app.state.books_metadata = None
+    app.state.index_reloader = IndexReloader(
+        app.state, retire_delay=max(2 * SHARD_TIMEOUT, 10.0)
+    )
+    try:
+        await app.state.index_reloader.reload("startup")
     except Exception as e:
         logging.error(f"Error loading book data: {e}")
-        app.state.document_embeddings = None
-        app.state.books_metadata = None
+    if INDEX_WATCH:
+        await app.state.index_reloader.start_watching()
+
+    # Route queries to Open Library subjects with the precomputed subject matrix,
+    # embedding the (short) subject list now if the embed pipeline has not.
+    app.state.subject_router = None
+    app.state.open_library = None
+    if SUBJECT_ROUTING:
+        router_params = {
+            "top_n": SUBJECT_ROUTER_TOP_N,
+            "min_score": SUBJECT_ROUTER_MIN_SCORE,
+        }
+        try:
+            subjects = load_subject_names(SUBJECTS_FILE)
+            if SUBJECT_INDEX_FILE.exists():
+                app.state.subject_router = SubjectRouter.load(
+                    SUBJECT_INDEX_FILE, subjects, **router_params
+                )
+            elif app.state.model is not None:
+                app.state.subject_router = SubjectRouter.build(
+                    subjects,
+                    functools.partial(
+                        create_vector_embeddings,
+                        app.state.model,
+                        device=app.state.device,
+                    ),
+                    **router_params,
+                )
+            if app.state.subject_router is not None:
+                app.state.open_library = OpenLibraryAPI()
+                logging.info(f"Routing queries over {len(subjects)} subjects.")
+        except Exception as e:
+            logging.error(f"Failed to load the subject router: {e}")
+            app.state.subject_router = None
+
     # Initialize Redis cache client
     try:
         app.state.cache = CacheClient()
@@ -76,8 +167,40 @@ async def lifespan(app: FastAPI):
         logging.error(f"Failed to connect to Redis: {e}")
         app.state.cache = None
 
+    # Cache query embeddings in-process, sharing them across workers through Redis.
+    shared_cache = app.state.cache
+    if not QUERY_CACHE_REDIS or shared_cache is None or not shared_cache.is_healthy():
+        shared_cache = None
+    # Backends produce slightly different vectors, so each gets its own cache keys.
+    app.state.query_embedding_cache = QueryEmbeddingCache(
+        f"{EMBEDDING_MODEL_NAME}:{QUERY_ENCODER_BACKEND}",
+        max_entries=QUERY_CACHE_SIZE,
+        cache_client=shared_cache,
+        ttl=QUERY_CACHE_TTL,
+    )
+
+    # Replay recommendation streams for near-identical queries; needs Redis.
+    app.state.result_cache = None
+    if RESULT_CACHE and app.state.cache is not None and app.state.cache.is_healthy():
+        app.state.result_cache = SemanticResultCache(
+            f"{EMBEDDING_MODEL_NAME}:{QUERY_ENCODER_BACKEND}",
+            app.state.cache,
+            threshold=RESULT_CACHE_THRESHOLD,
+            max_entries=RESULT_CACHE_SIZE,
+            ttl=RESULT_CACHE_TTL,
+        )
+
     yield  # Application runs here
 
+    if app.state.embedding_batcher is not None:
+        await app.state.embedding_batcher.stop()
+
+    await app.state.index_reloader.stop()
+    if app.state.open_library is not None:
+        await app.state.open_library.close()
+    if isinstance(getattr(app.state.search_engine, "index", None), ShardedIndex):
+        app.state.search_engine.index.close()
+
     # Cleanup GPU memory
     if torch.cuda.is_available():
         torch.cuda.empty_cache()
@@ -118,6 +241,26 @@ async def redis_healthcheck(request: Request):
     return {"status": "ok"}
 
 
+@app.get("/metrics/embeddings")
+async def embedding_metrics(request: Request):
+    batcher = getattr(request.app.state, "embedding_batcher", None)
+    if batcher is None:
+        raise HTTPException(status_code=503, detail="Embedding batcher unavailable")
+    query_cache = getattr(request.app.state, "query_embedding_cache", None)
+    server = None
+    if isinstance(batcher, EmbeddingClient):
+        # Batching happens in the shared embedding server; report its batches too.
+        try:
+            server = await batcher.server_metrics()
+        except EmbeddingServerError as e:
+            logging.warning(f"Embedding server metrics unavailable: {e}")
+    return {
+        "batcher": batcher.metrics(),
+        "server": server,
+        "cache": query_cache.metrics() if query_cache else None,
+    }
+
+
 # Handle OS signals for graceful shutdown
 def shutdown_handler(signal_received, frame):
     logging.info(f"Received shutdown signal: {signal_received}. Cleaning up...")
@@ -0,0 +1,141 @@
+"""
+Module: dedup.py
+Description: Collapses near-duplicate books before embedding. The same work is often
+             extracted under several subjects, and series entries can share almost all of
+             their metadata. Each book's `embedding_input` is reduced to a MinHash
+             signature over word shingles; locality-sensitive hashing (banding) proposes
+             candidate pairs, which are kept when their estimated Jaccard similarity
+             reaches the threshold. One canonical row is kept per cluster, and an alias
+             map records the book ids of the dropped rows.
+"""
+
+import re
+import zlib
+import logging
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+# Mersenne prime 2^31 - 1: hash permutations (a * x + b) % P stay within uint64.
+_MINHASH_PRIME = np.uint64((1 << 31) - 1)
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """Word n-grams of a text (the whole text when it has fewer than `size` words)."""
+    words = re.sub(r"[^a-z0-9\s]", " ", text.lower()).split()
+    if len(words) <= size:
+        return [" ".join(words)]
+    return [" ".join(words[i : i + size]) for i in range(len(words) - size + 1)]
+
+
+def minhash_signatures(
+    texts: List[str], num_perm: int = 128, shingle_size: int = 3, seed: int = 0
+) -> np.ndarray:
+    """
+    MinHash signature of every text: the minimum of `num_perm` universal hash functions
+    over its shingles. The fraction of equal signature entries of two texts estimates
+    the Jaccard similarity of their shingle sets.
+
+    Returns:
+        np.ndarray: Signatures (uint32, shape: [len(texts), num_perm]).
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)[:, None]
+    b = rng.integers(0, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)[:, None]
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for row, text in enumerate(texts):
+        hashes = np.fromiter(
+            (
+                zlib.crc32(shingle.encode("utf-8"))
+                for shingle in set(shingles(text, shingle_size))
+            ),
+            dtype=np.uint64,
+        )
+        signatures[row] = ((a * hashes[None, :] + b) % _MINHASH_PRIME).min(axis=1)
+    return signatures
+
+
+def _find(parents: np.ndarray, row: int) -> int:
+    while parents[row] != row:
+        parents[row] = parents[parents[row]]
+        row = parents[row]
+    return row
+
+
+def cluster_near_duplicates(
+    signatures: np.ndarray, threshold: float = 0.8, bands: int = 16
+) -> np.ndarray:
+    """
+    Group rows whose estimated Jaccard similarity is at least `threshold`.
+
+    Signatures are split into `bands` bands; rows that agree on a whole band land in the
+    same bucket and become candidates, which are verified against the bucket's first
+    row before their clusters are joined (union-find).
+
+    Returns:
+        np.ndarray: Cluster id per row: the lowest row id in its cluster.
+    """
+    num_rows, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    parents = np.arange(num_rows)
+
+    for band in range(bands):
+        columns = slice(band * rows_per_band, (band + 1) * rows_per_band)
+        buckets: Dict[bytes, int] = {}
+        for row in range(num_rows):
+            key = signatures[row, columns].tobytes()
+            first = buckets.setdefault(key, row)
+            if first == row:
+                continue
+            similarity = np.mean(signatures[row] == signatures[first])
+            if similarity >= threshold:
+                root, other = _find(parents, row), _find(parents, first)
+                parents[max(root, other)] = min(root, other)
+
+    return np.array([_find(parents, row) for row in range(num_rows)], dtype=np.int64)
+
+
+def deduplicate_books(
+    books: List[Dict[str, Any]],
+    threshold: float = 0.8,
+    num_perm: int = 128,
+    bands: int = 16,
+) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+    """
+    Keep one canonical record per cluster of near-duplicate books.
+
+    The canonical record is the first one in corpus order, so the output order is
+    stable across runs.
+
+    Args:
+        books (list): Preprocessed book records with `book_id` and `embedding_input`.
+        threshold (float): Minimum estimated Jaccard similarity of duplicates.
+        num_perm (int): MinHash signature length.
+        bands (int): LSH bands; more bands find more candidate pairs.
+
+    Returns:
+        Tuple[list, dict]: The canonical records, and a map from each canonical book id
+        to the book ids of the records collapsed into it.
+    """
+    if not books:
+        return [], {}
+    signatures = minhash_signatures(
+        [book.get("embedding_input", "") for book in books], num_perm
+    )
+    clusters = cluster_near_duplicates(signatures, threshold, bands)
+
+    canonical_books, aliases = [], {}
+    for row, book in enumerate(books):
+        canonical = books[clusters[row]]
+        if clusters[row] == row:
+            canonical_books.append(book)
+        elif book.get("book_id") != canonical.get("book_id"):
+            dropped = aliases.setdefault(canonical.get("book_id"), [])
+            if book.get("book_id") not in dropped:
+                dropped.append(book.get("book_id"))
+
+    logging.info(
+        f"Deduplicated {len(books)} books into {len(canonical_books)} "
+        f"({len(books) - len(canonical_books)} near-duplicates collapsed)"
+    )
+    return canonical_books, aliases
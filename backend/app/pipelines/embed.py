@@ -0,0 +1,475 @@
+"""
+Module: embed.py
+Description: Builds the binary embedding index for the book corpus. Texts are sorted by
+             token length to minimize padding, encoded in batches (optionally across a
+             multi-process CPU pool), and streamed straight into the on-disk matrix.
+             Periodic checkpoints let an interrupted build resume where it stopped.
+             Refreshes are incremental: every row is keyed by a hash of (model name,
+             embedding input), and only new or changed books are re-encoded.
+             Descriptions are also embedded as overlapping passages into a second
+             index, with per-book offsets into its rows, and the title, author and
+             subjects fields each into their own block of a third.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from app.config import (
+    BOOK_FIELDS_FILE,
+    BOOK_INDEX_FILE,
+    BOOK_METADATA_FILE,
+    BOOK_PASSAGES_FILE,
+    EMBEDDING_BUILD_BATCH_SIZE,
+    EMBEDDING_BUILD_CHECKPOINT_ROWS,
+    EMBEDDING_BUILD_WORKERS,
+    EMBEDDING_MODEL_NAME,
+    PASSAGE_MAX_WORDS,
+    PASSAGE_STRIDE,
+    SUBJECT_INDEX_FILE,
+    SUBJECTS_FILE,
+)
+from app.pipelines.load import (
+    EMBEDDING_INDEX_CHUNK_ROWS,
+    create_embedding_index,
+    finalize_embedding_index,
+    load_book_metadata,
+    load_embedding_index,
+    load_embedding_index_offsets,
+    load_json_file,
+)
+
+# Metadata fields embedded on their own, in the row-block order of the field index.
+EMBEDDING_FIELDS = ("title", "author", "subjects")
+
+
+def checkpoint_path(index_path: Path) -> Path:
+    """Location of the resume checkpoint written next to an index under construction."""
+    return Path(f"{index_path}.ckpt.json")
+
+
+def sort_by_token_length(model: SentenceTransformer, texts: List[str]) -> np.ndarray:
+    """
+    Order texts by token count, longest first, so each batch holds texts of similar
+    length and little compute is spent on padding.
+
+    Returns:
+        np.ndarray: Row order into `texts`.
+    """
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None:
+        input_ids = tokenizer(texts, add_special_tokens=False)["input_ids"]
+        lengths = np.fromiter((len(ids) for ids in input_ids), dtype=np.int64)
+    else:
+        lengths = np.fromiter((len(text.split()) for text in texts), dtype=np.int64)
+    return np.argsort(-lengths, kind="stable")
+
+
+def _order_digest(order: np.ndarray, texts: List[str]) -> str:
+    """Fingerprint of the build inputs, so a checkpoint is only reused for the same job."""
+    digest = hashlib.sha256(order.astype(np.int64).tobytes())
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _write_checkpoint(path: Path, checkpoint: Dict[str, Any]) -> None:
+    """Write the checkpoint atomically so a crash never leaves a torn file."""
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(tmp_path, path)
+
+
+def build_book_embeddings(
+    model: SentenceTransformer,
+    texts: List[str],
+    index_path: Path,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    batch_size: int = 64,
+    checkpoint_rows: int = 10000,
+    num_workers: int = 0,
+    device: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Encode a corpus into a binary embedding index of unit-length rows.
+
+    Rows are written at their original positions, so row i of the index always belongs
+    to texts[i]. After every `checkpoint_rows` rows the matrix is flushed and a checkpoint
+    is recorded; calling this again with the same inputs resumes after the last one.
+
+    Args:
+        model (SentenceTransformer): Model used to encode the texts.
+        texts (List[str]): Texts to embed, e.g. each book's `embedding_input`.
+        index_path (Path): Destination of the binary embedding index.
+        model_name (str): Model name recorded in the index header.
+        batch_size (int): Number of texts per forward pass.
+        checkpoint_rows (int): Rows encoded between checkpoints.
+        num_workers (int): CPU worker processes; 0 or 1 encodes in this process.
+        device (str, optional): Device for single-process encoding.
+
+    Returns:
+        Dict[str, Any]: The header of the finished index.
+    """
+    index_path = Path(index_path)
+    ckpt_path = checkpoint_path(index_path)
+    processed_texts = [text.lower() for text in texts]
+    order = sort_by_token_length(model, processed_texts)
+    dim = model.get_sentence_embedding_dimension()
+    job = {
+        "model_name": model_name,
+        "rows": len(texts),
+        "dim": dim,
+        "checkpoint_rows": checkpoint_rows,
+        "digest": _order_digest(order, processed_texts),
+    }
+
+    # Resume from a matching checkpoint, otherwise start a fresh index.
+    checkpoint = load_json_file(ckpt_path) if ckpt_path.exists() else {}
+    if index_path.exists() and checkpoint.get("job") == job:
+        matrix, _ = load_embedding_index(index_path, mode="r+")
+        completed = checkpoint["completed_rows"]
+        logging.info(f"Resuming embedding build at row {completed}/{len(texts)}")
+    else:
+        matrix = create_embedding_index(
+            index_path, len(texts), dim, model_name, normalized=True
+        )
+        completed = 0
+
+    pool = None
+    if num_workers > 1:
+        pool = model.start_multi_process_pool(["cpu"] * num_workers)
+
+    started = time.perf_counter()
+    encoded = 0
+    try:
+        for start in range(completed, len(texts), checkpoint_rows):
+            rows = order[start : start + checkpoint_rows]
+            segment = [processed_texts[row] for row in rows]
+            if pool is not None:
+                embeddings = model.encode_multi_process(
+                    segment, pool, batch_size=batch_size, normalize_embeddings=True
+                )
+            else:
+                embeddings = model.encode(
+                    segment,
+                    batch_size=batch_size,
+                    device=device,
+                    normalize_embeddings=True,
+                )
+
+            # Scatter the rows straight into their slots in the on-disk matrix.
+            matrix[rows] = np.asarray(embeddings, dtype=np.float32)
+            if isinstance(matrix, np.memmap):
+                matrix.flush()
+            encoded += len(rows)
+            _write_checkpoint(
+                ckpt_path, {"job": job, "completed_rows": start + len(rows)}
+            )
+
+            elapsed = time.perf_counter() - started
+            logging.info(
+                f"Embedded {start + len(rows)}/{len(texts)} rows "
+                f"({encoded / elapsed:.1f} rows/s)"
+            )
+    finally:
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+
+    del matrix
+    header = finalize_embedding_index(index_path)
+    ckpt_path.unlink(missing_ok=True)
+
+    elapsed = time.perf_counter() - started
+    rate = encoded / elapsed if elapsed > 0 else 0.0
+    logging.info(
+        f"Embedding build finished: {len(texts)} rows, {encoded} encoded "
+        f"in {elapsed:.1f}s ({rate:.1f} rows/s)"
+    )
+    return header
+
+
+def content_hashes(model_name: str, texts: List[str]) -> np.ndarray:
+    """
+    Content-address each text: a 16-byte digest of (model name, text).
+
+    Returns:
+        np.ndarray: Fixed-width byte strings (dtype "S16"), one per text.
+    """
+    prefix = model_name.encode("utf-8") + b"\0"
+    return np.array(
+        [hashlib.sha256(prefix + text.encode("utf-8")).digest()[:16] for text in texts],
+        dtype="S16",
+    )
+
+
+def keys_path(index_path: Path) -> Path:
+    """Location of the content-hash keys stored alongside an index (one per row)."""
+    return Path(index_path).with_suffix(".keys.npy")
+
+
+def refresh_book_embeddings(
+    model: SentenceTransformer,
+    texts: List[str],
+    index_path: Path,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    batch_size: int = 64,
+    checkpoint_rows: int = 10000,
+    num_workers: int = 0,
+    device: Optional[str] = None,
+    offsets: Optional[np.ndarray] = None,
+) -> Dict[str, int]:
+    """
+    Incrementally rebuild the embedding index for the current corpus.
+
+    Rows whose content hash already exists in the current index are copied over; only
+    new or changed texts are encoded (identical texts are encoded once), and books that
+    disappeared are dropped. The new index is written next to the old one and swapped in
+    atomically, with row i aligned to texts[i]. Without a usable existing index this is
+    a full build. Row group `offsets`, if given, are stored in the index file itself.
+
+    Returns:
+        Dict[str, int]: Row counts: total rows, reused rows, encoded texts, removed rows.
+    """
+    index_path = Path(index_path)
+    new_keys = content_hashes(model_name, [text.lower() for text in texts])
+    dim = model.get_sentence_embedding_dimension()
+
+    # Match the new rows against the keys of the current index.
+    source_rows = np.full(len(texts), -1, dtype=np.int64)
+    old_embeddings, old_count = None, 0
+    if index_path.exists() and keys_path(index_path).exists():
+        old_embeddings, header = load_embedding_index(index_path)
+        old_keys = np.load(keys_path(index_path))
+        if (
+            np.array_equal(old_keys, new_keys)
+            and header["model_name"] == model_name
+            and (
+                offsets is None
+                or np.array_equal(load_embedding_index_offsets(index_path), offsets)
+            )
+        ):
+            logging.info("Embedding index is up to date; nothing to re-encode.")
+            return {
+                "rows": len(texts),
+                "reused": len(texts),
+                "encoded": 0,
+                "removed": 0,
+            }
+        if header["dim"] == dim and len(old_keys) == len(old_embeddings):
+            old_count = len(old_keys)
+            sorter = np.argsort(old_keys)
+            positions = np.searchsorted(old_keys, new_keys, sorter=sorter)
+            positions = np.minimum(positions, max(old_count - 1, 0))
+            if old_count:
+                matched = old_keys[sorter[positions]] == new_keys
+                source_rows[matched] = sorter[positions[matched]]
+        else:
+            logging.info("Existing index is incompatible; re-encoding every book.")
+
+    # Encode each missing text once, through the resumable batch builder.
+    missing = np.flatnonzero(source_rows < 0)
+    unique_keys, first_rows, delta_rows = np.unique(
+        new_keys[missing], return_index=True, return_inverse=True
+    )
+    delta_path = Path(f"{index_path}.delta")
+    delta_embeddings = None
+    if len(unique_keys):
+        build_book_embeddings(
+            model,
+            [texts[row] for row in missing[first_rows]],
+            delta_path,
+            model_name=model_name,
+            batch_size=batch_size,
+            checkpoint_rows=checkpoint_rows,
+            num_workers=num_workers,
+            device=device,
+        )
+        delta_embeddings, _ = load_embedding_index(delta_path)
+
+    # Assemble the new index from reused and freshly encoded rows.
+    tmp_path = Path(f"{index_path}.tmp")
+    matrix = create_embedding_index(tmp_path, len(texts), dim, model_name, True)
+    reused = np.flatnonzero(source_rows >= 0)
+    for start in range(0, len(reused), EMBEDDING_INDEX_CHUNK_ROWS):
+        rows = reused[start : start + EMBEDDING_INDEX_CHUNK_ROWS]
+        matrix[rows] = old_embeddings[source_rows[rows]]
+    for start in range(0, len(missing), EMBEDDING_INDEX_CHUNK_ROWS):
+        rows = missing[start : start + EMBEDDING_INDEX_CHUNK_ROWS]
+        matrix[rows] = delta_embeddings[delta_rows[start : start + len(rows)]]
+    if isinstance(matrix, np.memmap):
+        matrix.flush()
+    del matrix, old_embeddings, delta_embeddings
+    finalize_embedding_index(tmp_path, offsets)
+
+    keys_tmp_path = Path(f"{keys_path(index_path)}.tmp")
+    with open(keys_tmp_path, "wb") as file:
+        np.save(file, new_keys)
+    os.replace(tmp_path, index_path)
+    os.replace(keys_tmp_path, keys_path(index_path))
+    delta_path.unlink(missing_ok=True)
+
+    stats = {
+        "rows": len(texts),
+        "reused": int(len(reused)),
+        "encoded": int(len(unique_keys)),
+        "removed": int(old_count - len(np.unique(source_rows[reused]))),
+    }
+    logging.info(
+        f"Embedding refresh: {stats['rows']} rows, {stats['reused']} reused, "
+        f"{stats['encoded']} encoded, {stats['removed']} removed"
+    )
+    return stats
+
+
+def split_passages(text: str, max_words: int = 96, stride: int = 64) -> List[str]:
+    """
+    Split text into overlapping windows of at most `max_words` words, starting every
+    `stride` words, so no sentence is only ever seen cut at a window edge.
+
+    Returns:
+        List[str]: The passages; empty for blank text.
+    """
+    words = text.split()
+    if len(words) <= max_words:
+        return [" ".join(words)] if words else []
+    return [
+        " ".join(words[start : start + max_words])
+        for start in range(0, len(words) - max_words + stride, stride)
+    ]
+
+
+def refresh_passage_embeddings(
+    model: SentenceTransformer,
+    books: List[Dict[str, Any]],
+    index_path: Path,
+    max_words: int = 96,
+    stride: int = 64,
+    **refresh_params,
+) -> Dict[str, int]:
+    """
+    Incrementally rebuild the passage index over the books' descriptions. Each passage
+    is prefixed with the book title, so it is embedded in context. Rows are keyed by
+    content like the book index, so unchanged passages are reused. The per-book
+    offsets (the passages of book i are rows offsets[i]:offsets[i + 1]) are stored in
+    the index file, so a reader never pairs new rows with old offsets.
+
+    Args:
+        model (SentenceTransformer): Model used to encode the passages.
+        books (List[Dict[str, Any]]): Preprocessed book records (with `description`).
+        index_path (Path): Destination of the passage embedding index.
+        max_words (int): Words per passage.
+        stride (int): Words between passage starts.
+        **refresh_params: Passed on to `refresh_book_embeddings`.
+
+    Returns:
+        Dict[str, int]: Row counts from the refresh, plus the number of books with
+        passages.
+    """
+    passages, counts = [], np.zeros(len(books), dtype=np.int64)
+    for row, book in enumerate(books):
+        book_passages = split_passages(book.get("description", ""), max_words, stride)
+        passages.extend(f"{book.get('title', '')}: {text}" for text in book_passages)
+        counts[row] = len(book_passages)
+    if not passages:
+        logging.info("No book descriptions to embed; skipping the passage index.")
+        return {"rows": 0, "books": 0}
+
+    offsets = np.zeros(len(books) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    stats = refresh_book_embeddings(
+        model, passages, index_path, offsets=offsets, **refresh_params
+    )
+    return {**stats, "books": int(np.count_nonzero(counts))}
+
+
+def refresh_field_embeddings(
+    model: SentenceTransformer,
+    books: List[Dict[str, Any]],
+    index_path: Path,
+    fields: tuple = EMBEDDING_FIELDS,
+    **refresh_params,
+) -> Dict[str, int]:
+    """
+    Incrementally rebuild the per-field index: one block of rows per field, with row
+    `f * num_books + i` holding field f of book i. All fields are encoded in a single
+    batched pass. Empty fields are embedded as the empty string; their rows are
+    recognised by key and masked out at search time.
+
+    Args:
+        model (SentenceTransformer): Model used to encode the fields.
+        books (List[Dict[str, Any]]): Preprocessed book records.
+        index_path (Path): Destination of the field embedding index.
+        fields (tuple): Fields to embed, in block order.
+        **refresh_params: Passed on to `refresh_book_embeddings`.
+
+    Returns:
+        Dict[str, int]: Row counts from the refresh.
+    """
+    texts = [str(book.get(field) or "").strip() for field in fields for book in books]
+    return refresh_book_embeddings(model, texts, index_path, **refresh_params)
+
+
+def main():
+    """
+    Build or incrementally refresh the binary embedding index, the description passage
+    index and the per-field index from the preprocessed book metadata, and the subject
+    matrix from subjects.json.
+    """
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+    logging.info(f"Loading preprocessed book metadata from {BOOK_METADATA_FILE}")
+    book_metadata = load_book_metadata(BOOK_METADATA_FILE)
+
+    refresh_book_embeddings(
+        model,
+        [book["embedding_input"] for book in book_metadata],
+        BOOK_INDEX_FILE,
+        model_name=EMBEDDING_MODEL_NAME,
+        batch_size=EMBEDDING_BUILD_BATCH_SIZE,
+        checkpoint_rows=EMBEDDING_BUILD_CHECKPOINT_ROWS,
+        num_workers=EMBEDDING_BUILD_WORKERS,
+    )
+    refresh_passage_embeddings(
+        model,
+        book_metadata,
+        BOOK_PASSAGES_FILE,
+        max_words=PASSAGE_MAX_WORDS,
+        stride=PASSAGE_STRIDE,
+        model_name=EMBEDDING_MODEL_NAME,
+        batch_size=EMBEDDING_BUILD_BATCH_SIZE,
+        checkpoint_rows=EMBEDDING_BUILD_CHECKPOINT_ROWS,
+        num_workers=EMBEDDING_BUILD_WORKERS,
+    )
+    refresh_field_embeddings(
+        model,
+        book_metadata,
+        BOOK_FIELDS_FILE,
+        model_name=EMBEDDING_MODEL_NAME,
+        batch_size=EMBEDDING_BUILD_BATCH_SIZE,
+        checkpoint_rows=EMBEDDING_BUILD_CHECKPOINT_ROWS,
+        num_workers=EMBEDDING_BUILD_WORKERS,
+    )
+
+    # The subject router's matrix: one row per subject in subjects.json.
+    refresh_book_embeddings(
+        model,
+        load_json_file(SUBJECTS_FILE).get("subjects", []),
+        SUBJECT_INDEX_FILE,
+        model_name=EMBEDDING_MODEL_NAME,
+    )
+
+
+if __name__ == "__main__":
+    main()
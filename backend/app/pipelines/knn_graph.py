@@ -0,0 +1,104 @@
+"""
+Module: knn_graph.py
+Description: Offline build of the book-to-book nearest-neighbour graph served by
+             /books/{book_id}/similar. Books are processed in blocks: each block of
+             rows is scored against the corpus one chunk at a time with a
+             matrix-matrix product, keeping a running top-N per row, so memory stays
+             bounded by block size x chunk size regardless of corpus size.
+
+Usage:
+    python -m app.pipelines.knn_graph --neighbors 20
+"""
+
+import time
+import argparse
+import logging
+from typing import Tuple
+
+import numpy as np
+
+from app.config import KNN_GRAPH_DIR, KNN_GRAPH_NEIGHBORS
+from app.services.index_reload import load_corpus
+from app.services.knn_graph import KnnGraph, graph_book_ids
+from app.services.semantic_search import FlatIndex
+
+
+def exclude_self(
+    rows: np.ndarray, scores: np.ndarray, self_rows: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Drop each row's own entry from its top-(k + 1) neighbours and keep k. Rows whose
+    own entry was crowded out by exact duplicates just lose their last neighbour.
+    """
+    # A stable sort moves the self entry to the end and keeps the rest in order.
+    order = np.argsort(rows == self_rows[:, np.newaxis], axis=1, kind="stable")[:, :k]
+    return (
+        np.take_along_axis(rows, order, axis=1),
+        np.take_along_axis(scores, order, axis=1),
+    )
+
+
+def build_knn_graph(
+    embeddings: np.ndarray,
+    num_neighbors: int = 20,
+    block_size: int = 1024,
+    chunk_size: int = 8192,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute every book's top neighbours by cosine similarity, excluding itself.
+
+    Args:
+        embeddings (np.ndarray): Unit-length corpus embeddings (may be memory-mapped).
+        num_neighbors (int): Neighbours kept per book.
+        block_size (int): Books scored per block.
+        chunk_size (int): Corpus rows per matrix product within a block.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Neighbour rows (int32) and their similarities
+        (float16), both of shape [num_books, num_neighbors], best first.
+    """
+    num_books = len(embeddings)
+    num_neighbors = min(num_neighbors, num_books - 1)
+    index = FlatIndex(embeddings, chunk_size)
+    neighbors = np.empty((num_books, num_neighbors), dtype=np.int32)
+    scores = np.empty((num_books, num_neighbors), dtype=np.float16)
+
+    started = time.perf_counter()
+    for start in range(0, num_books, block_size):
+        stop = min(start + block_size, num_books)
+        block = np.asarray(embeddings[start:stop], dtype=np.float32)
+        results = index.search_batch(block, num_neighbors + 1)
+        block_rows, block_scores = exclude_self(
+            np.stack([rows for rows, _ in results]),
+            np.stack([row_scores for _, row_scores in results]),
+            np.arange(start, stop),
+            num_neighbors,
+        )
+        neighbors[start:stop] = block_rows
+        scores[start:stop] = block_scores
+        logging.info(
+            f"Neighbours of {stop}/{num_books} books "
+            f"({stop / (time.perf_counter() - started):.1f} books/s)"
+        )
+    return neighbors, scores
+
+
+def main():
+    """Build the kNN graph for the current corpus and save it."""
+    parser = argparse.ArgumentParser(description="Book-to-book kNN graph")
+    parser.add_argument("--neighbors", type=int, default=KNN_GRAPH_NEIGHBORS)
+    parser.add_argument("--block-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    embeddings, books_metadata, model_name = load_corpus()
+    neighbors, scores = build_knn_graph(embeddings, args.neighbors, args.block_size)
+    book_ids = np.asarray(graph_book_ids(books_metadata))
+    KnnGraph(neighbors, scores, book_ids).save(KNN_GRAPH_DIR, model_name)
+    logging.info(f"Saved {neighbors.shape[1]}-NN graph to {KNN_GRAPH_DIR}.")
+
+
+if __name__ == "__main__":
+    main()
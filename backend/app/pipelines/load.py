@@ -1,10 +1,13 @@
+import os
 import json
+import struct
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
 import numpy as np
-import pandas as pd
 
 
 def load_json_file(filepath: str) -> Dict[str, Any]:
@@ -58,6 +61,8 @@ def load_book_embeddings(filepath: str) -> np.ndarray:
     """
     Load book embeddings from a JSON file as a NumPy array.
 
+    This is the legacy text format; prefer `load_embedding_index` for the binary index.
+
     Args:
         file_path (str): Path to the JSON file containing embeddings.
 
@@ -65,13 +70,246 @@ def load_book_embeddings(filepath: str) -> np.ndarray:
         np.ndarray: Array of embeddings cast to float32.
     """
     try:
-        df = pd.read_json(filepath)
-        logging.info(f"Loaded embeddings with shape {df.shape}")
-        return df.to_numpy().astype("float32")
+        with open(filepath, "r", encoding="utf-8") as file:
+            embeddings = np.asarray(json.load(file), dtype=np.float32)
+        logging.info(f"Loaded embeddings with shape {embeddings.shape}")
+        return embeddings
     except Exception as e:
         logging.error(f"Error loading embeddings from {filepath}: {e}")
 
 
+# -----------------------------------------------------------------------------
+# Binary embedding index
+#
+# Layout (little-endian):
+#   bytes 0-7     magic b"LEXIEMB\0"
+#   bytes 8-11    format version (uint32)
+#   bytes 12-15   length of the JSON header (uint32)
+#   bytes 16-...  JSON header (model_name, dim, rows, dtype, normalized, checksum)
+#   byte  4096    row-major float32 matrix of shape [rows, dim]
+#   then          optional row group offsets (int64, ["offsets"] entries), e.g. the
+#                 passages of each book, so rows and offsets are replaced together
+#
+# The header region is a fixed size so a build can rewrite it in place (e.g. to
+# record the checksum) and the matrix starts on a page boundary for np.memmap.
+# -----------------------------------------------------------------------------
+EMBEDDING_INDEX_MAGIC = b"LEXIEMB\0"
+EMBEDDING_INDEX_VERSION = 1
+EMBEDDING_INDEX_DATA_OFFSET = 4096
+EMBEDDING_INDEX_CHUNK_ROWS = 65536
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def _write_embedding_index_header(file, header: Dict[str, Any]) -> None:
+    """Serialize the header into the fixed-size region at the start of the file."""
+    payload = json.dumps(header, sort_keys=True).encode("utf-8")
+    if _PREAMBLE.size + len(payload) > EMBEDDING_INDEX_DATA_OFFSET:
+        raise ValueError("Embedding index header exceeds the reserved header size.")
+    file.seek(0)
+    file.write(
+        _PREAMBLE.pack(EMBEDDING_INDEX_MAGIC, EMBEDDING_INDEX_VERSION, len(payload))
+    )
+    file.write(payload)
+    file.write(b"\0" * (EMBEDDING_INDEX_DATA_OFFSET - _PREAMBLE.size - len(payload)))
+
+
+def read_embedding_index_header(filepath: Path) -> Dict[str, Any]:
+    """
+    Read and validate the header of a binary embedding index.
+
+    Raises:
+        ValueError: If the file is not an embedding index or uses an unsupported version.
+    """
+    with open(filepath, "rb") as file:
+        magic, version, header_length = _PREAMBLE.unpack(file.read(_PREAMBLE.size))
+        if magic != EMBEDDING_INDEX_MAGIC:
+            raise ValueError(f"{filepath} is not a binary embedding index.")
+        if version != EMBEDDING_INDEX_VERSION:
+            raise ValueError(
+                f"Unsupported embedding index version {version} in {filepath}."
+            )
+        return json.loads(file.read(header_length).decode("utf-8"))
+
+
+def compute_embedding_checksum(
+    embeddings: np.ndarray, chunk_rows: int = EMBEDDING_INDEX_CHUNK_ROWS
+) -> str:
+    """
+    Compute a SHA-256 checksum of an embedding matrix, hashing it in row chunks
+    so memory-mapped matrices are never pulled into RAM all at once.
+    """
+    digest = hashlib.sha256()
+    for start in range(0, len(embeddings), chunk_rows):
+        chunk = np.ascontiguousarray(embeddings[start : start + chunk_rows])
+        digest.update(memoryview(chunk).cast("B"))
+    return f"sha256:{digest.hexdigest()}"
+
+
+def create_embedding_index(
+    filepath: Path,
+    rows: int,
+    dim: int,
+    model_name: str,
+    normalized: bool = False,
+) -> np.memmap:
+    """
+    Allocate a binary embedding index on disk and return a writable memory map
+    over its matrix, so rows can be streamed in without holding them in memory.
+
+    Call `finalize_embedding_index` once every row has been written.
+    """
+    header = {
+        "model_name": model_name,
+        "dim": int(dim),
+        "rows": int(rows),
+        "dtype": "float32",
+        "normalized": bool(normalized),
+        "checksum": None,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(filepath, "wb") as file:
+        _write_embedding_index_header(file, header)
+        file.truncate(EMBEDDING_INDEX_DATA_OFFSET + rows * dim * 4)
+    if rows == 0:
+        return np.empty((0, dim), dtype=np.float32)
+    return np.memmap(
+        filepath,
+        dtype=np.float32,
+        mode="r+",
+        offset=EMBEDDING_INDEX_DATA_OFFSET,
+        shape=(rows, dim),
+    )
+
+
+def finalize_embedding_index(
+    filepath: Path, offsets: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    Compute the checksum of a fully written index and record it in the header, and
+    append the row group `offsets` after the matrix if given.
+
+    Returns:
+        Dict[str, Any]: The final header.
+    """
+    embeddings, header = load_embedding_index(filepath)
+    header["checksum"] = compute_embedding_checksum(embeddings)
+    del embeddings
+    with open(filepath, "r+b") as file:
+        if offsets is not None:
+            offsets = np.asarray(offsets, dtype="<i8")
+            file.seek(EMBEDDING_INDEX_DATA_OFFSET + header["rows"] * header["dim"] * 4)
+            file.write(offsets.tobytes())
+            file.truncate()
+            header["offsets"] = len(offsets)
+        _write_embedding_index_header(file, header)
+    return header
+
+
+def save_embedding_index(
+    embeddings: np.ndarray,
+    filepath: Path,
+    model_name: str,
+    normalized: bool = False,
+) -> Dict[str, Any]:
+    """
+    Store vector embeddings for the book corpus as a binary embedding index.
+
+    The index is written next to `filepath` and swapped in atomically, since servers
+    may be memory-mapping the file being replaced.
+
+    Returns:
+        Dict[str, Any]: The header written to the file.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    rows, dim = embeddings.shape
+    tmp_path = Path(f"{filepath}.tmp")
+    matrix = create_embedding_index(tmp_path, rows, dim, model_name, normalized)
+    for start in range(0, rows, EMBEDDING_INDEX_CHUNK_ROWS):
+        matrix[start : start + EMBEDDING_INDEX_CHUNK_ROWS] = embeddings[
+            start : start + EMBEDDING_INDEX_CHUNK_ROWS
+        ]
+    if isinstance(matrix, np.memmap):
+        matrix.flush()
+    del matrix
+    header = finalize_embedding_index(tmp_path)
+    os.replace(tmp_path, filepath)
+    logging.info(f"Embedding index with {rows} rows saved to {filepath}")
+    return header
+
+
+def load_embedding_index(
+    filepath: Path, verify: bool = False, mode: str = "r"
+) -> Tuple[np.memmap, Dict[str, Any]]:
+    """
+    Open a binary embedding index as a read-only memory map (no copy).
+
+    Args:
+        filepath (Path): Path to the binary index.
+        verify (bool): Recompute the checksum and compare it with the header.
+                       This reads the whole file, so it is off by default.
+        mode (str): Memory-map mode; "r+" reopens a partially built index for writing.
+
+    Returns:
+        Tuple[np.memmap, Dict[str, Any]]: The embedding matrix and the index header.
+
+    Raises:
+        ValueError: If the file is truncated or fails checksum verification.
+    """
+    header = read_embedding_index_header(filepath)
+    rows, dim = header["rows"], header["dim"]
+    expected_size = (
+        EMBEDDING_INDEX_DATA_OFFSET + rows * dim * 4 + header.get("offsets", 0) * 8
+    )
+    if Path(filepath).stat().st_size < expected_size:
+        raise ValueError(f"Embedding index {filepath} is truncated.")
+
+    if rows == 0:
+        embeddings = np.empty((0, dim), dtype=np.float32)
+    else:
+        embeddings = np.memmap(
+            filepath,
+            dtype=np.float32,
+            mode=mode,
+            offset=EMBEDDING_INDEX_DATA_OFFSET,
+            shape=(rows, dim),
+        )
+
+    if verify and header.get("checksum"):
+        checksum = compute_embedding_checksum(embeddings)
+        if checksum != header["checksum"]:
+            raise ValueError(f"Checksum mismatch for embedding index {filepath}.")
+
+    logging.info(
+        f"Opened embedding index {filepath} ({rows} x {dim}, model={header['model_name']})"
+    )
+    return embeddings, header
+
+
+def load_embedding_index_offsets(filepath: Path) -> Optional[np.ndarray]:
+    """
+    Read the row group offsets stored after the matrix of an embedding index.
+
+    Returns:
+        np.ndarray: The offsets (int64), or None if the index has none.
+
+    Raises:
+        ValueError: If the file is truncated.
+    """
+    header = read_embedding_index_header(filepath)
+    count = header.get("offsets")
+    if count is None:
+        return None
+    offsets = np.fromfile(
+        filepath,
+        dtype="<i8",
+        count=count,
+        offset=EMBEDDING_INDEX_DATA_OFFSET + header["rows"] * header["dim"] * 4,
+    )
+    if len(offsets) != count:
+        raise ValueError(f"Offsets of embedding index {filepath} are truncated.")
+    return offsets.astype(np.int64)
+
+
 def load_book_metadata(filepath: str) -> list:
     """
     Load book metadata from a JSON file.
@@ -0,0 +1,155 @@
+"""
+Module: reduce.py
+Description: Offline dimensionality reduction of the book index. Reports how much
+             recall a PCA or truncation projection to fewer dimensions costs compared
+             with full-dimension exact search, and optionally builds and saves the
+             reduced index that the server loads (see `VECTOR_INDEX_DIM`).
+
+             Queries are sampled from the corpus itself. Each query's own row is
+             excluded from both rankings, so recall measures how well its real
+             neighbours are preserved.
+
+Usage:
+    python -m app.pipelines.reduce --dims 256 128 64 --method pca
+    python -m app.pipelines.reduce --dims 128 --save
+"""
+
+import argparse
+import logging
+from typing import List, Dict, Any
+
+import numpy as np
+
+from app.config import (
+    BOOK_INDEX_FILE,
+    EMBEDDING_MODEL_NAME,
+    VECTOR_INDEX_BACKEND,
+    VECTOR_INDEX_DIR,
+    VECTOR_INDEX_PARAMS,
+)
+from app.pipelines.load import load_embedding_index
+from app.services.semantic_search import (
+    PROJECTION_METHODS,
+    FlatIndex,
+    ProjectedIndex,
+    normalize_embeddings,
+    save_vector_index,
+)
+
+
+def _neighbours(results: List, query_rows: np.ndarray, k: int) -> List[np.ndarray]:
+    """Top-k rows per query, excluding the query's own row."""
+    return [
+        rows[rows != query_row][:k] for (rows, _), query_row in zip(results, query_rows)
+    ]
+
+
+def recall_report(
+    embeddings: np.ndarray,
+    dims: List[int],
+    methods: List[str],
+    k: int = 10,
+    num_queries: int = 500,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Measure recall@k of reduced-dimension exact search against full-dimension exact
+    search, for every combination of target dimension and projection method.
+
+    Args:
+        embeddings (np.ndarray): Unit-length corpus embeddings.
+        dims (List[int]): Target dimensions to evaluate.
+        methods (List[str]): Projection methods to evaluate ("pca", "truncate").
+        k (int): Neighbours compared per query.
+        num_queries (int): Corpus rows sampled as queries.
+        seed (int): Random seed for the query sample.
+
+    Returns:
+        List[Dict[str, Any]]: One row per (method, dim) with its mean recall@k and the
+        size of the reduced vectors relative to the full ones.
+    """
+    full_dim = embeddings.shape[1]
+    rng = np.random.default_rng(seed)
+    query_rows = np.sort(
+        rng.choice(len(embeddings), min(num_queries, len(embeddings)), replace=False)
+    )
+    queries = np.asarray(embeddings[query_rows], dtype=np.float32)
+    exact = _neighbours(
+        FlatIndex(embeddings).search_batch(queries, k + 1), query_rows, k
+    )
+
+    report = []
+    for method in methods:
+        for dim in dims:
+            index = ProjectedIndex.build(embeddings, dim, method)
+            reduced = _neighbours(index.search_batch(queries, k + 1), query_rows, k)
+            recall = np.mean(
+                [
+                    len(np.intersect1d(truth, found)) / max(len(truth), 1)
+                    for truth, found in zip(exact, reduced)
+                ]
+            )
+            report.append(
+                {
+                    "method": method,
+                    "dim": dim,
+                    f"recall@{k}": round(float(recall), 4),
+                    "bytes_per_vector": dim * 4,
+                    "size_ratio": round(dim / full_dim, 3),
+                }
+            )
+    return report
+
+
+def main():
+    """
+    Print a recall report for the requested dimensions, and optionally save the
+    reduced index for the first of them.
+    """
+    parser = argparse.ArgumentParser(description="Dimensionality-reduced index")
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 128, 64])
+    parser.add_argument(
+        "--method", choices=PROJECTION_METHODS, nargs="+", default=["pca"]
+    )
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="Build and save the reduced index for the first --dims and --method.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    embeddings, header = load_embedding_index(BOOK_INDEX_FILE)
+    if not header["normalized"]:
+        embeddings = normalize_embeddings(embeddings)
+
+    for row in recall_report(embeddings, args.dims, args.method, args.k, args.queries):
+        logging.info(
+            f"{row['method']:>8} {row['dim']:>4}d: recall@{args.k}="
+            f"{row[f'recall@{args.k}']:.4f}, {row['bytes_per_vector']} bytes/vector "
+            f"({row['size_ratio']:.0%} of full size)"
+        )
+
+    if args.save:
+        dim, method = args.dims[0], args.method[0]
+        index = ProjectedIndex.build(
+            embeddings,
+            dim,
+            method,
+            VECTOR_INDEX_BACKEND,
+            **VECTOR_INDEX_PARAMS.get(VECTOR_INDEX_BACKEND, {}),
+        )
+        path = VECTOR_INDEX_DIR.with_name(f"{VECTOR_INDEX_BACKEND}_{method}{dim}_index")
+        save_vector_index(index, path, EMBEDDING_MODEL_NAME, header["checksum"])
+        logging.info(
+            f"Saved {dim}-d {VECTOR_INDEX_BACKEND} index to {path}; serve it with "
+            f"VECTOR_INDEX_DIM={dim} VECTOR_INDEX_PROJECTION={method}."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Module: themes.py
+Description: Offline topic clustering of the book corpus for browse-by-theme. Runs
+             mini-batch spherical k-means over the normalized book embeddings, assigns
+             every book to its nearest centroid, ranks each theme's members by
+             similarity to the centroid and labels each theme with its most
+             distinctive subjects. The resulting catalog is served by /themes.
+
+Usage:
+    python -m app.pipelines.themes --clusters 64
+"""
+
+import argparse
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+from app.config import (
+    BOOK_INDEX_FILE,
+    THEMES_DIR,
+    THEMES_NUM_CLUSTERS,
+    THEMES_REPRESENTATIVES,
+)
+from app.services.index_reload import corpus_fingerprint, load_corpus
+from app.services.semantic_search import (
+    SEARCH_CHUNK_ROWS,
+    minibatch_spherical_kmeans,
+)
+from app.services.themes import ThemeCatalog
+
+
+def book_subjects(book: Dict[str, Any]) -> List[str]:
+    """The distinct, non-empty subjects of a preprocessed book record."""
+    subjects = (s.strip() for s in str(book.get("subjects") or "").split(","))
+    return list(dict.fromkeys(s for s in subjects if s))
+
+
+def label_themes(
+    books_metadata: Sequence[Dict[str, Any]],
+    members: np.ndarray,
+    offsets: np.ndarray,
+    max_subjects: int = 3,
+) -> List[str]:
+    """
+    Label each theme with the subjects most over-represented among its members
+    (member count weighted by inverse corpus frequency), so generic subjects shared
+    by every book do not crowd out the ones that set a theme apart.
+
+    Returns:
+        List[str]: One label per theme, e.g. "Dragons, Magic, Fantasy".
+    """
+    document_frequency = Counter(
+        subject for book in books_metadata for subject in book_subjects(book)
+    )
+    num_books = max(len(books_metadata), 1)
+
+    labels = []
+    for theme_id in range(len(offsets) - 1):
+        rows = members[offsets[theme_id] : offsets[theme_id + 1]]
+        counts = Counter(
+            subject for row in rows for subject in book_subjects(books_metadata[row])
+        )
+        weights = {
+            subject: count * np.log(num_books / document_frequency[subject])
+            for subject, count in counts.items()
+            if count > 1
+        }
+        top = [
+            subject
+            for subject in sorted(weights, key=weights.get, reverse=True)
+            if weights[subject] > 0
+        ][:max_subjects]
+        if top:
+            labels.append(", ".join(subject.title() for subject in top))
+        else:
+            title = books_metadata[rows[0]].get("title", "") if len(rows) else ""
+            labels.append(f"Books like {title}".strip())
+    return labels
+
+
+def build_theme_catalog(
+    embeddings: np.ndarray,
+    books_metadata: Sequence[Dict[str, Any]],
+    num_clusters: int = 64,
+    representatives: int = 5,
+    batch_size: int = 4096,
+    iterations: int = 100,
+    seed: int = 0,
+    chunk_size: int = SEARCH_CHUNK_ROWS,
+    source: Optional[str] = None,
+) -> ThemeCatalog:
+    """
+    Cluster unit-length book embeddings into themes.
+
+    After training, every book is assigned to its most similar centroid in chunks of
+    `chunk_size` rows. Themes that end up empty are dropped. `source` is the
+    fingerprint of the corpus (see `corpus_fingerprint`), recorded in the catalog.
+
+    Returns:
+        ThemeCatalog: Themes with ranked members and labels.
+    """
+    centroids = minibatch_spherical_kmeans(
+        embeddings, num_clusters, batch_size, iterations, seed
+    )
+    assignments = np.empty(len(embeddings), dtype=np.int64)
+    similarities = np.empty(len(embeddings), dtype=np.float32)
+    for start in range(0, len(embeddings), chunk_size):
+        chunk_scores = (
+            np.asarray(embeddings[start : start + chunk_size], dtype=np.float32)
+            @ centroids.T
+        )
+        best = np.argmax(chunk_scores, axis=1)
+        assignments[start : start + chunk_size] = best
+        similarities[start : start + chunk_size] = chunk_scores[
+            np.arange(len(best)), best
+        ]
+
+    # Group members by theme, most central first, and drop empty themes.
+    counts = np.bincount(assignments, minlength=len(centroids))
+    kept = np.flatnonzero(counts)
+    remap = np.full(len(centroids), -1)
+    remap[kept] = np.arange(len(kept))
+    theme_ids = remap[assignments]
+    members = np.lexsort((-similarities, theme_ids))
+    offsets = np.zeros(len(kept) + 1, dtype=np.int64)
+    np.cumsum(counts[kept], out=offsets[1:])
+
+    return ThemeCatalog(
+        centroids[kept],
+        label_themes(books_metadata, members, offsets),
+        members,
+        similarities[members],
+        offsets,
+        len(embeddings),
+        representatives,
+        source,
+    )
+
+
+def main():
+    """Cluster the current corpus into themes and save the catalog."""
+    parser = argparse.ArgumentParser(description="Browse-by-theme clustering")
+    parser.add_argument("--clusters", type=int, default=THEMES_NUM_CLUSTERS)
+    parser.add_argument("--representatives", type=int, default=THEMES_REPRESENTATIVES)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    embeddings, books_metadata, model_name = load_corpus()
+    catalog = build_theme_catalog(
+        embeddings,
+        books_metadata,
+        args.clusters,
+        args.representatives,
+        args.batch_size,
+        args.iterations,
+        args.seed,
+        source=corpus_fingerprint(
+            BOOK_INDEX_FILE if BOOK_INDEX_FILE.exists() else None
+        ),
+    )
+    catalog.save(THEMES_DIR, model_name)
+    for theme_id, label in enumerate(catalog.labels):
+        logging.info(f"Theme {theme_id}: {label} ({catalog.size(theme_id)} books)")
+    logging.info(f"Saved {len(catalog)} themes to {THEMES_DIR}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,24 @@ Module: transform.py
 Description: Provides functions for normalizing text and preprocessing raw book metadata 
              for embedding generation. This module reads a JSON file containing raw book data 
              (grouped by subject), normalizes key fields (title, author, subjects, year), 
-             and writes the preprocessed metadata to an output file.
+             and writes the preprocessed metadata to an output file. Near-duplicate
+             books are collapsed before saving (see dedup.py).
 """
 
 import json
 import logging
 import re
+from functools import lru_cache
 from pathlib import Path
 import spacy
 from typing import List, Dict, Any, Optional
+from app.config import BOOK_ALIASES_FILE, DEDUP_THRESHOLD
+from app.pipelines.dedup import deduplicate_books
 from app.pipelines.load import (
     load_json_file,
     save_book_metadata,
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
 # Set project base directory using relative paths (adjust the number of parents as needed)
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DATA_DIR = BASE_DIR / "app" / "data" / "book_metadata"
@@ -30,9 +29,15 @@ DATA_DIR = BASE_DIR / "app" / "data" / "book_metadata"
 INPUT_FILE = DATA_DIR / "books.json"
 OUTPUT_FILE = DATA_DIR / "book_metadata.json"
 
-# Load the spaCy model
-# Prerequisite: poetry run python -m spacy download en_core_web_sm
-nlp = spacy.load("en_core_web_sm")
+
+@lru_cache(maxsize=1)
+def spacy_model():
+    """
+    The spaCy pipeline used by `normalize_text`, loaded on first use so that importing
+    this module (the API normalizes filter values with it) stays cheap.
+    """
+    # Prerequisite: poetry run python -m spacy download en_core_web_sm
+    return spacy.load("en_core_web_sm")
 
 
 def normalize_text(text: str) -> str:
@@ -49,7 +54,7 @@ def normalize_text(text: str) -> str:
     text = " ".join(text.split())
 
     # Use spaCy to tokenize, lemmatize, and remove stopwords.
-    doc = nlp(text)
+    doc = spacy_model()(text)
     tokens = [token.lemma_ for token in doc if token.is_alpha and not token.is_stop]
     return " ".join(tokens)
 
@@ -79,6 +84,23 @@ def normalize_subjects(subjects) -> str:
     return ", ".join(normalized_list)
 
 
+def clean_description(description) -> str:
+    """
+    Clean a raw Open Library description for passage embedding: drop the extraction
+    placeholder, the trailing "----------" link section, markdown link references and
+    source citations, and collapse whitespace. Case and punctuation are kept.
+    """
+    if isinstance(description, dict):
+        description = description.get("value", "")
+    if not isinstance(description, str) or description == "No description available":
+        return ""
+    description = description.split("----------")[0]
+    description = re.sub(r"^\s*\[\d+\]:\s*\S+\s*$", "", description, flags=re.M)
+    description = re.sub(r"\(\[source\]\[\d+\]\)", "", description)
+    description = re.sub(r"\[([^\]]+)\]\[\d+\]", r"\1", description)
+    return " ".join(description.split())
+
+
 def preprocess_book_record(book: dict) -> dict:
     """
     Preprocess a single book record. This function supports multiple input formats:
@@ -92,6 +114,7 @@ def preprocess_book_record(book: dict) -> dict:
                 if it has an 'authors' field (list of dict or strings), the first author is used.
       - subjects: normalized subjects field (using comma separation)
       - year: converted to string (from 'year' or 'first_publish_year')
+      - description: cleaned description text, embedded as passages (may be empty)
       - embedding_input: formatted string for embedding generation
 
 
@@ -142,6 +165,9 @@ def preprocess_book_record(book: dict) -> dict:
     year = book.get("year") or book.get("first_publish_year")
     processed_book_record["year"] = str(year) if year is not None else ""
 
+    # Keep the description; it is split into passages at embedding time.
+    processed_book_record["description"] = clean_description(book.get("description"))
+
     # Generate embedding input
     processed_book_record["embedding_input"] = format_book_for_embedding(
         processed_book_record
@@ -200,6 +226,9 @@ def main():
     It loads raw book data, preprocesses each record, prints the preprocessed data,
     and writes the output to a JSON file.
     """
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
 
     logging.info(f"Loading raw book metadata from {INPUT_FILE}")
     raw_book_metadata = load_json_file(INPUT_FILE)
@@ -207,6 +236,16 @@ def main():
     logging.info("Preprocessing book metadata...")
     preprocessed_books = preprocess_book_metadata(raw_book_metadata)
 
+    # Collapse near-duplicate books so each work is embedded and retrieved once.
+    if DEDUP_THRESHOLD > 0:
+        logging.info("Collapsing near-duplicate books...")
+        preprocessed_books, aliases = deduplicate_books(
+            preprocessed_books, threshold=DEDUP_THRESHOLD
+        )
+        logging.info(f"Saving book alias map to: {BOOK_ALIASES_FILE}")
+        with open(BOOK_ALIASES_FILE, "w", encoding="utf-8") as file:
+            json.dump(aliases, file, indent=2)
+
     logging.info("Saving preprocessed book metadata to:", OUTPUT_FILE)
     save_book_metadata(preprocessed_books, OUTPUT_FILE)
 
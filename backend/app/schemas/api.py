@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, model_validator
-from typing import List, Optional
+from typing import Annotated, List, Literal, Optional
 import re
+from app.config import BATCH_SEARCH_MAX_QUERIES
 from app.schemas.models import Book, Message
 from openapi_pydantic.v3 import OpenAPI, Info, PathItem, Operation
 from openapi_pydantic.util import PydanticSchema, construct_open_api_with_schema_class
@@ -8,11 +9,104 @@ from openapi_pydantic.util import PydanticSchema, construct_open_api_with_schema
 from typing import Dict, Any
 import yaml
 
+# Weighted components of a book's score when the per-field index is loaded.
+FieldWeights = Dict[
+    Literal["book", "title", "author", "subjects"], Annotated[float, Field(ge=0)]
+]
+
 
 class BookRequest(BaseModel):
     query: str = Field(
         ..., title="Search Query", description="The query string for book search"
     )
+    year_min: Optional[int] = Field(
+        None,
+        title="Earliest Year",
+        description="Only return books first published in or after this year",
+        examples=[2000],
+    )
+    year_max: Optional[int] = Field(
+        None,
+        title="Latest Year",
+        description="Only return books first published in or before this year",
+        examples=[2010],
+    )
+    subjects: Optional[List[str]] = Field(
+        None,
+        title="Subjects",
+        description="Only return books tagged with at least one of these subjects",
+        examples=[["fantasy"]],
+    )
+    author: Optional[str] = Field(
+        None,
+        title="Author",
+        description="Only return books by this author",
+        examples=["erin hunter"],
+    )
+    field_weights: Optional[FieldWeights] = Field(
+        None,
+        title="Field Weights",
+        description=(
+            "Weights of the whole-book, title, author and subjects similarities, "
+            "overriding the server defaults for the fields given"
+        ),
+        examples=[{"title": 2.0, "subjects": 0.25}],
+    )
+    book_id: Optional[str] = Field(
+        None,
+        title="Picked Suggestion",
+        description=(
+            "Book id of a title picked from /suggest; the book and its nearest "
+            "neighbours are recommended without searching"
+        ),
+        examples=["OL8215153W"],
+    )
+
+    def filters(self) -> Dict[str, Any]:
+        """The metadata filters set on this request."""
+        return self.model_dump(
+            include={"year_min", "year_max", "subjects", "author"}, exclude_none=True
+        )
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(
+        ...,
+        title="Search Queries",
+        description="Query strings to search for; each is answered independently",
+        min_length=1,
+        max_length=BATCH_SEARCH_MAX_QUERIES,
+        examples=[["fantasy with dragons", "history of rome"]],
+    )
+    k: int = Field(
+        5,
+        title="Results per Query",
+        description="Number of books returned for each query",
+        ge=1,
+        le=100,
+    )
+    stream: bool = Field(
+        False,
+        title="Stream",
+        description=(
+            "If set to True, results are streamed as NDJSON, one line per query, "
+            "as each batch of queries is scored."
+        ),
+    )
+    field_weights: Optional[FieldWeights] = Field(
+        None,
+        title="Field Weights",
+        description="Overrides of the whole-book and per-field score weights",
+    )
+
+
+class ShardSearchRequest(BaseModel):
+    start: int = Field(..., ge=0, description="First corpus row of the shard")
+    stop: int = Field(..., gt=0, description="End (exclusive) corpus row of the shard")
+    queries: List[List[float]] = Field(
+        ..., min_length=1, description="Unit-length query embeddings"
+    )
+    k: int = Field(5, ge=1, le=1000, description="Results per query")
 
 
 class BookResponse(BaseModel):
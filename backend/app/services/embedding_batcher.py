@@ -0,0 +1,168 @@
+# app/services/embedding_batcher.py
+import time
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Dynamic micro-batcher for query embeddings.
+
+    Concurrent callers enqueue single texts; a background task collects them into one
+    batch until `max_batch_size` texts are waiting or the oldest has waited `max_wait_ms`,
+    then encodes the whole batch with one `encode_fn` call on a worker thread. Each
+    caller receives its own row through a future, so the event loop is never blocked
+    by the model and concurrent requests share a forward pass.
+
+    Attributes:
+        encode_fn (Callable[[List[str]], np.ndarray]): Encodes a batch of texts into an
+            array of shape [len(texts), dim].
+        max_batch_size (int): Maximum number of texts per encode call.
+        max_wait_ms (float): Maximum time the first text in a batch waits for others.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        metrics_window: int = 1024,
+    ) -> None:
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Metrics
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes: Counter = Counter()
+        self._queue_waits_ms: Deque[float] = deque(maxlen=metrics_window)
+        self._encode_ms: Deque[float] = deque(maxlen=metrics_window)
+
+    async def start(self) -> None:
+        """Start the background batching task on the running event loop."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+            logger.info(
+                f"Embedding batcher started (max_batch_size={self.max_batch_size}, "
+                f"max_wait_ms={self.max_wait_ms})"
+            )
+
+    async def stop(self) -> None:
+        """Stop the batching task and fail any texts still waiting in the queue."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding batcher stopped."))
+        logger.info("Embedding batcher stopped.")
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a single text as part of the next batch.
+
+        Returns:
+            np.ndarray: float32 embedding (shape: [1, dim]).
+        """
+        if self._worker is None:
+            raise RuntimeError("Embedding batcher is not running.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future, float]]:
+        """Wait for the first text, then gather more until the batch is full or due."""
+        batch = [await self._queue.get()]
+        deadline = batch[0][2] + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # Still drain anything that is already queued.
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            # Drop callers that gave up (e.g. client disconnected) before encoding.
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            texts = [text for text, _, _ in batch]
+            try:
+                embeddings = await asyncio.to_thread(self.encode_fn, texts)
+            except Exception as e:
+                logger.error(f"Batch encode of {len(texts)} texts failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            for row, (_, future, enqueued_at) in enumerate(batch):
+                self._queue_waits_ms.append((started - enqueued_at) * 1000)
+                if not future.done():
+                    future.set_result(embeddings[row : row + 1])
+            self._record_batch(len(batch), (finished - started) * 1000)
+
+    def _record_batch(self, size: int, encode_ms: float) -> None:
+        self._batches += 1
+        self._items += size
+        self._batch_sizes[size] += 1
+        self._encode_ms.append(encode_ms)
+        logger.debug(f"Encoded batch of {size} queries in {encode_ms:.1f} ms")
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Report batch-size and queue-wait metrics.
+
+        Queue waits and encode times are summarized over the most recent texts/batches.
+        """
+
+        def percentiles(values: Deque[float]) -> Dict[str, float]:
+            if not values:
+                return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+            array = np.fromiter(values, dtype=np.float64)
+            return {
+                "p50": round(float(np.percentile(array, 50)), 3),
+                "p95": round(float(np.percentile(array, 95)), 3),
+                "max": round(float(array.max()), 3),
+            }
+
+        return {
+            "batches": self._batches,
+            "queries": self._items,
+            "mean_batch_size": (
+                round(self._items / self._batches, 3) if self._batches else 0.0
+            ),
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_wait_ms": percentiles(self._queue_waits_ms),
+            "encode_ms": percentiles(self._encode_ms),
+        }
@@ -0,0 +1,146 @@
+# app/services/embedding_cache.py
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.clients.cache_client import CacheClient
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text for cache lookups: lowercase and collapse whitespace."""
+    return " ".join(text.lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Two-level cache of query text to float32 embedding.
+
+    Level 1 is a bounded in-process LRU. Level 2 is an optional Redis tier, accessed via
+    `CacheClient`, that stores the raw vector bytes so every worker shares the same
+    encodes. Keys include the model name, so changing models never serves stale vectors.
+
+    Attributes:
+        model_name (str): Name of the model that produced the cached vectors.
+        max_entries (int): Capacity of the in-process LRU.
+        cache_client (CacheClient, optional): Shared Redis tier; None disables level 2.
+        ttl (int): Time-to-live in seconds for vectors stored in Redis.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = 4096,
+        cache_client: Optional[CacheClient] = None,
+        ttl: int = 7 * 24 * 3600,
+    ) -> None:
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.cache_client = cache_client
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def _key(self, normalized_text: str) -> str:
+        digest = hashlib.sha1(normalized_text.encode("utf-8")).hexdigest()
+        return f"query_embedding:{self.model_name}:{digest}"
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_local(self, key: str) -> Optional[np.ndarray]:
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+            self._stats["local_hits"] += 1
+        return vector
+
+    def _from_redis(self, key: str, data: Optional[bytes]) -> Optional[np.ndarray]:
+        if data:
+            vector = np.frombuffer(data, dtype=np.float32).reshape(1, -1)
+            self._remember(key, vector)
+            self._stats["redis_hits"] += 1
+            return vector
+        self._stats["misses"] += 1
+        return None
+
+    def _prepare(self, text: str, vector: np.ndarray) -> Tuple[str, np.ndarray]:
+        key = self._key(normalize_query(text))
+        vector = np.ascontiguousarray(vector, dtype=np.float32).reshape(1, -1)
+        vector.setflags(write=False)  # Cached vectors are shared between requests.
+        self._remember(key, vector)
+        return key, vector
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """
+        Look up a query embedding, checking the local LRU before Redis.
+
+        Returns:
+            np.ndarray: The cached embedding (shape: [1, dim]), or None on a miss.
+        """
+        key = self._key(normalize_query(text))
+        vector = self._get_local(key)
+        if vector is not None:
+            return vector
+        data = self.cache_client.get_bytes(key) if self.cache_client else None
+        return self._from_redis(key, data)
+
+    def put(self, text: str, vector: np.ndarray) -> None:
+        """Store a query embedding in both cache levels."""
+        key, vector = self._prepare(text, vector)
+        if self.cache_client is not None:
+            self.cache_client.set_bytes(key, vector.tobytes(), ttl=self.ttl)
+
+    async def aget(self, text: str) -> Optional[np.ndarray]:
+        """`get` for request handlers: the Redis round trip runs off the event loop."""
+        key = self._key(normalize_query(text))
+        vector = self._get_local(key)
+        if vector is not None:
+            return vector
+        data = None
+        if self.cache_client is not None:
+            data = await asyncio.to_thread(self.cache_client.get_bytes, key)
+        return self._from_redis(key, data)
+
+    async def aput(self, text: str, vector: np.ndarray) -> None:
+        """`put` for request handlers: the Redis write runs off the event loop."""
+        key, vector = self._prepare(text, vector)
+        if self.cache_client is not None:
+            await asyncio.to_thread(
+                self.cache_client.set_bytes, key, vector.tobytes(), ttl=self.ttl
+            )
+
+    async def get_or_embed(
+        self, text: str, embed_fn: Callable[[str], Awaitable[np.ndarray]]
+    ) -> np.ndarray:
+        """
+        Return the cached embedding for a query, encoding and caching it on a miss.
+
+        Args:
+            text (str): Query text.
+            embed_fn (Callable[[str], Awaitable[np.ndarray]]): Encodes a single query,
+                e.g. `EmbeddingBatcher.embed`.
+        """
+        vector = await self.aget(text)
+        if vector is None:
+            vector = await embed_fn(text)
+            await self.aput(text, vector)
+        return vector
+
+    def metrics(self) -> Dict[str, Any]:
+        """Report hit counts for each cache level."""
+        lookups = sum(self._stats.values())
+        hits = self._stats["local_hits"] + self._stats["redis_hits"]
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,342 @@
+"""
+Module: embedding_server.py
+Description: Standalone query embedding server shared by all API workers on a host.
+             The model is loaded once, in this process, and every worker sends its
+             encodes over a Unix socket. Requests from all workers feed one
+             `EmbeddingBatcher`, so concurrent queries share forward passes across the
+             whole host instead of per worker.
+
+Protocol (one request/response at a time per connection; connections are reused):
+    request:  uint32 length (big-endian) + JSON {"op": "embed", "texts": [...]}
+                                            or {"op": "metrics"}
+    response: uint32 header length + uint32 payload length (big-endian)
+              + JSON header ({"shape": [rows, dim]}, {"metrics": {...}} or
+              {"error": "..."}) + payload (row-major float32 embeddings)
+
+Usage:
+    python -m app.services.embedding_server --socket /run/lexi-gpt/embed.sock
+"""
+
+import os
+import json
+import time
+import struct
+import socket
+import asyncio
+import argparse
+import functools
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_WAIT_MS,
+    EMBEDDING_SERVER_SOCKET,
+    QUERY_ENCODER_BACKEND,
+)
+from app.services.embedding_batcher import EmbeddingBatcher
+
+logger = logging.getLogger(__name__)
+
+_REQUEST_PREFIX = struct.Struct("!I")
+_RESPONSE_PREFIX = struct.Struct("!II")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+
+class EmbeddingServerError(RuntimeError):
+    """The embedding server is unreachable, timed out, or failed the request."""
+
+
+class EmbeddingServer:
+    """
+    Serves query embeddings over a Unix socket from a shared `EmbeddingBatcher`.
+
+    Attributes:
+        batcher (EmbeddingBatcher): Batches encodes from every connection.
+        socket_path (Path): Filesystem path of the Unix socket.
+    """
+
+    def __init__(self, batcher: EmbeddingBatcher, socket_path: Path) -> None:
+        self.batcher = batcher
+        self.socket_path = Path(socket_path)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set = set()
+
+    async def start(self) -> None:
+        """Start the batcher and listen on the socket, replacing a stale socket file."""
+        if self.socket_path.exists():
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(str(self.socket_path))
+                raise RuntimeError(
+                    f"An embedding server is already on {self.socket_path}"
+                )
+            except (ConnectionRefusedError, FileNotFoundError):
+                self.socket_path.unlink(missing_ok=True)
+            finally:
+                probe.close()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        await self.batcher.start()
+        self._server = await asyncio.start_unix_server(
+            self._handle, path=str(self.socket_path)
+        )
+        os.chmod(self.socket_path, 0o660)
+        logger.info(f"Embedding server listening on {self.socket_path}")
+
+    async def stop(self) -> None:
+        """Stop accepting connections, stop the batcher and remove the socket."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self.batcher.stop()
+        self.socket_path.unlink(missing_ok=True)
+
+    async def _respond(
+        self, writer: asyncio.StreamWriter, header: Dict[str, Any], payload: bytes = b""
+    ) -> None:
+        header_bytes = json.dumps(header).encode("utf-8")
+        writer.write(_RESPONSE_PREFIX.pack(len(header_bytes), len(payload)))
+        writer.write(header_bytes)
+        writer.write(payload)
+        await writer.drain()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    (length,) = _REQUEST_PREFIX.unpack(
+                        await reader.readexactly(_REQUEST_PREFIX.size)
+                    )
+                except asyncio.IncompleteReadError:
+                    break  # Client closed the connection.
+                if length > MAX_FRAME_BYTES:
+                    await self._respond(writer, {"error": "Request too large."})
+                    break
+                request = json.loads(await reader.readexactly(length))
+
+                if request.get("op") == "metrics":
+                    await self._respond(writer, {"metrics": self.batcher.metrics()})
+                    continue
+                try:
+                    texts = request["texts"]
+                    rows = await asyncio.gather(
+                        *(self.batcher.embed(text) for text in texts)
+                    )
+                    embeddings = np.ascontiguousarray(
+                        np.concatenate(rows), dtype=np.float32
+                    )
+                except Exception as e:
+                    logger.error(f"Embedding request failed: {e}")
+                    await self._respond(writer, {"error": str(e)})
+                    continue
+                await self._respond(
+                    writer, {"shape": list(embeddings.shape)}, embeddings.tobytes()
+                )
+        except (ConnectionError, asyncio.IncompleteReadError, json.JSONDecodeError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+
+class EmbeddingClient:
+    """
+    Thin asyncio client for the embedding server, used by API workers in place of a
+    local model. It exposes the same `embed` / `stop` / `metrics` methods as
+    `EmbeddingBatcher`.
+
+    Connections are pooled and reused. A connection that times out or fails is closed
+    rather than reused, since its response stream may be out of step.
+
+    Attributes:
+        socket_path (Path): Unix socket of the embedding server.
+        timeout (float): Seconds allowed for connecting plus one request.
+        max_connections (int): Maximum concurrent requests (and pooled connections).
+    """
+
+    def __init__(
+        self,
+        socket_path: Path,
+        timeout: float = 2.0,
+        max_connections: int = 8,
+        metrics_window: int = 1024,
+    ) -> None:
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._stats = {"requests": 0, "errors": 0, "timeouts": 0}
+        self._latencies_ms: Deque[float] = deque(maxlen=metrics_window)
+
+    async def start(self) -> None:
+        """Nothing to start; connections are opened on demand."""
+
+    async def stop(self) -> None:
+        """Close all pooled connections."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def _roundtrip(
+        self,
+        connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter],
+        request: Dict[str, Any],
+    ) -> Tuple[Dict[str, Any], bytes]:
+        reader, writer = connection
+        body = json.dumps(request).encode("utf-8")
+        writer.write(_REQUEST_PREFIX.pack(len(body)) + body)
+        await writer.drain()
+        header_length, payload_length = _RESPONSE_PREFIX.unpack(
+            await reader.readexactly(_RESPONSE_PREFIX.size)
+        )
+        header = json.loads(await reader.readexactly(header_length))
+        payload = await reader.readexactly(payload_length)
+        return header, payload
+
+    async def _request(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        async with self._slots:
+            started = time.perf_counter()
+            self._stats["requests"] += 1
+            connection = None
+            try:
+                connection = self._idle.pop() if self._idle else None
+                if connection is None:
+                    connection = await asyncio.wait_for(
+                        asyncio.open_unix_connection(str(self.socket_path)),
+                        self.timeout,
+                    )
+                header, payload = await asyncio.wait_for(
+                    self._roundtrip(connection, request),
+                    self.timeout - (time.perf_counter() - started),
+                )
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                self._discard(connection)
+                raise EmbeddingServerError(
+                    f"Embedding server timed out after {self.timeout}s."
+                )
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                self._stats["errors"] += 1
+                self._discard(connection)
+                raise EmbeddingServerError(f"Embedding server unavailable: {e}")
+            except BaseException:
+                # Cancelled mid-request: the response would be left unread.
+                self._discard(connection)
+                raise
+            self._idle.append(connection)
+            self._latencies_ms.append((time.perf_counter() - started) * 1000)
+
+        if "error" in header:
+            self._stats["errors"] += 1
+            raise EmbeddingServerError(header["error"])
+        return header, payload
+
+    @staticmethod
+    def _discard(connection) -> None:
+        if connection is not None:
+            connection[1].close()
+
+    async def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed several texts; the server batches them with other workers' requests.
+
+        Returns:
+            np.ndarray: float32 embeddings (shape: [len(texts), dim]).
+
+        Raises:
+            EmbeddingServerError: If the server is unreachable, times out or fails.
+        """
+        header, payload = await self._request({"op": "embed", "texts": list(texts)})
+        return np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a single text.
+
+        Returns:
+            np.ndarray: float32 embedding (shape: [1, dim]).
+        """
+        return await self.embed_batch([text])
+
+    async def server_metrics(self) -> Dict[str, Any]:
+        """Batching metrics of the shared server."""
+        header, _ = await self._request({"op": "metrics"})
+        return header["metrics"]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Report request counts and round-trip latency from this worker."""
+        latencies = np.fromiter(self._latencies_ms, dtype=np.float64)
+        return {
+            **self._stats,
+            "socket": str(self.socket_path),
+            "pooled_connections": len(self._idle),
+            "latency_ms": {
+                name: (
+                    round(float(np.percentile(latencies, q)), 3)
+                    if len(latencies)
+                    else 0.0
+                )
+                for name, q in (("p50", 50), ("p95", 95))
+            },
+        }
+
+
+async def serve(socket_path: Path, backend: str) -> None:
+    """Load the query encoder once and serve it until cancelled."""
+    import torch
+
+    from app.services.encoders import load_query_encoder
+    from app.services.semantic_search import create_vector_embeddings
+
+    model = load_query_encoder(backend)
+    device = "cuda" if torch.cuda.is_available() and backend == "torch" else "cpu"
+    server = EmbeddingServer(
+        EmbeddingBatcher(
+            functools.partial(create_vector_embeddings, model, device=device),
+            max_batch_size=EMBEDDING_BATCH_SIZE,
+            max_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+        ),
+        socket_path,
+    )
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    """Run the embedding server for the configured query encoder backend."""
+    parser = argparse.ArgumentParser(description="Shared query embedding server")
+    parser.add_argument("--socket", type=Path, default=EMBEDDING_SERVER_SOCKET or None)
+    parser.add_argument("--backend", default=QUERY_ENCODER_BACKEND)
+    args = parser.parse_args()
+    if args.socket is None:
+        parser.error("--socket (or EMBEDDING_SERVER_SOCKET) is required")
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    try:
+        asyncio.run(serve(args.socket, args.backend))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
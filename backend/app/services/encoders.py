@@ -0,0 +1,357 @@
+"""
+Module: encoders.py
+Description: Pluggable CPU inference backends for the query encoder. Every backend
+             exposes the subset of the SentenceTransformer interface the search path
+             uses (`encode` and `get_sentence_embedding_dimension`), so it can be passed
+             to `create_vector_embedding` unchanged.
+
+             Backends:
+               - "torch":      stock PyTorch fp32 SentenceTransformer.
+               - "torch-int8": the same model with Linear layers dynamically quantized
+                               to int8.
+               - "onnx":       the transformer exported to an ONNX Runtime graph.
+               - "onnx-int8":  the exported graph with dynamically quantized weights.
+
+             The ONNX backends need `onnxruntime` (and `onnx` to export). Artifacts are
+             produced offline:
+
+                 python -m app.services.encoders export
+                 python -m app.services.encoders parity --backend onnx
+"""
+
+import json
+import time
+import argparse
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+from sentence_transformers.models import Normalize, Pooling
+
+from app.config import (
+    BOOK_METADATA_FILE,
+    EMBEDDING_MODEL_NAME,
+    QUERY_ENCODER_BACKEND,
+    QUERY_ENCODER_DIR,
+)
+from app.pipelines.load import load_json_file
+
+QUERY_ENCODER_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+ENCODER_CONFIG_FILE = "encoder.json"
+
+# Sample queries for the parity check when no book metadata is available.
+PARITY_QUERIES = [
+    "I am looking for a book about maximizing my potential and learning valuable skills",
+    "science fiction novels about artificial intelligence",
+    "a cozy mystery set in a small english village",
+    "history of the roman empire",
+    "books like harry potter",
+    "beginner guide to personal finance and investing",
+    "poetry about grief and loss",
+    "fantasy with dragons",
+]
+
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError(
+            "The ONNX encoder backends require onnxruntime: pip install onnxruntime"
+        ) from e
+    return onnxruntime
+
+
+class OnnxEncoder:
+    """
+    Sentence encoder that runs an exported transformer graph on ONNX Runtime and
+    applies the model's pooling (and normalization) in numpy.
+    """
+
+    def __init__(self, artifact_dir: Path, quantized: bool = False):
+        from transformers import AutoTokenizer
+
+        ort = _import_onnxruntime()
+        artifact_dir = Path(artifact_dir)
+        self.config = load_json_file(artifact_dir / ENCODER_CONFIG_FILE)
+        self.tokenizer = AutoTokenizer.from_pretrained(str(artifact_dir))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_file = ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        self.session = ort.InferenceSession(
+            str(artifact_dir / model_file),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dim"]
+
+    def encode(
+        self,
+        sentences: List[str],
+        batch_size: int = 32,
+        device: Optional[str] = None,
+        normalize_embeddings: bool = False,
+        **kwargs: Any,
+    ) -> np.ndarray:
+        """
+        Encode sentences into float32 embeddings (shape: [len(sentences), dim]).
+        `device` is accepted for interface compatibility; inference runs on CPU.
+        """
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        embeddings = np.empty((len(sentences), self.config["dim"]), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start : start + batch_size]
+            features = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.config["max_seq_length"],
+                return_tensors="np",
+            )
+            inputs = {
+                name: value.astype(np.int64)
+                for name, value in features.items()
+                if name in self.input_names
+            }
+            token_embeddings = self.session.run(None, inputs)[0]
+            embeddings[start : start + len(batch)] = pool_token_embeddings(
+                token_embeddings, features["attention_mask"], self.config["pooling"]
+            )
+
+        if normalize_embeddings or self.config["normalize"]:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+        return embeddings
+
+
+def pool_token_embeddings(
+    token_embeddings: np.ndarray, attention_mask: np.ndarray, mode: str = "mean"
+) -> np.ndarray:
+    """
+    Reduce per-token embeddings to one vector per sentence, ignoring padding.
+
+    Args:
+        token_embeddings (np.ndarray): Shape [batch, seq_len, dim].
+        attention_mask (np.ndarray): Shape [batch, seq_len]; 1 for real tokens.
+        mode (str): "mean", "cls" or "max".
+
+    Returns:
+        np.ndarray: float32 sentence embeddings (shape: [batch, dim]).
+    """
+    if mode == "cls":
+        return token_embeddings[:, 0].astype(np.float32)
+    mask = attention_mask[..., None].astype(np.float32)
+    if mode == "max":
+        masked = np.where(mask > 0, token_embeddings, -np.inf)
+        return masked.max(axis=1).astype(np.float32)
+    if mode != "mean":
+        raise ValueError(f"Unsupported pooling mode '{mode}'.")
+    summed = (token_embeddings * mask).sum(axis=1)
+    return (summed / np.maximum(mask.sum(axis=1), 1e-9)).astype(np.float32)
+
+
+def _pooling_mode(model: SentenceTransformer) -> str:
+    """The pooling mode of a SentenceTransformer, as understood by the ONNX encoder."""
+    for module in model:
+        if isinstance(module, Pooling):
+            mode = module.get_pooling_mode_str()
+            if mode not in ("mean", "cls", "max"):
+                raise ValueError(f"Pooling mode '{mode}' cannot be exported.")
+            return mode
+    raise ValueError("Model has no pooling module to export.")
+
+
+def export_onnx_encoder(
+    model_name: str = EMBEDDING_MODEL_NAME,
+    output_dir: Path = QUERY_ENCODER_DIR,
+    quantize: bool = True,
+    opset: int = 14,
+    model: Optional[SentenceTransformer] = None,
+) -> Path:
+    """
+    Export a SentenceTransformer's transformer to ONNX, with its tokenizer and pooling
+    config, so it can be served by `OnnxEncoder`. With `quantize`, an int8
+    dynamically-quantized copy of the graph is written alongside.
+
+    Returns:
+        Path: The artifact directory.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model = model or SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    sample = tokenizer(["an example query"], return_tensors="pt")
+    input_names = [
+        name
+        for name in ("input_ids", "attention_mask", "token_type_ids")
+        if name in sample
+    ]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    logging.info(f"Exporting {model_name} to {output_dir / ONNX_MODEL_FILE}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            str(output_dir / ONNX_MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(str(output_dir))
+
+    config = {
+        "model_name": model_name,
+        "dim": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.get_max_seq_length(),
+        "pooling": _pooling_mode(model),
+        "normalize": any(isinstance(module, Normalize) for module in model),
+    }
+    with open(output_dir / ENCODER_CONFIG_FILE, "w", encoding="utf-8") as file:
+        json.dump(config, file, indent=2)
+
+    if quantize:
+        _import_onnxruntime()
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logging.info(f"Quantizing graph to {output_dir / ONNX_INT8_MODEL_FILE}...")
+        quantize_dynamic(
+            str(output_dir / ONNX_MODEL_FILE),
+            str(output_dir / ONNX_INT8_MODEL_FILE),
+            weight_type=QuantType.QInt8,
+        )
+    return output_dir
+
+
+def load_query_encoder(
+    backend: str = QUERY_ENCODER_BACKEND,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    artifact_dir: Path = QUERY_ENCODER_DIR,
+):
+    """
+    Load the query encoder for a configured backend.
+
+    Returns:
+        An object with SentenceTransformer-compatible `encode` and
+        `get_sentence_embedding_dimension` methods.
+    """
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "torch-int8":
+        model = SentenceTransformer(model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    if backend in ("onnx", "onnx-int8"):
+        encoder = OnnxEncoder(artifact_dir, quantized=backend == "onnx-int8")
+        if encoder.config["model_name"] != model_name:
+            logging.warning(
+                f"ONNX encoder was exported from {encoder.config['model_name']}, "
+                f"but the configured model is {model_name}."
+            )
+        return encoder
+    raise ValueError(
+        f"Unknown query encoder backend '{backend}'. "
+        f"Expected one of: {', '.join(QUERY_ENCODER_BACKENDS)}"
+    )
+
+
+def check_encoder_parity(
+    reference, candidate, texts: List[str], threshold: float = 0.99
+) -> Dict[str, Any]:
+    """
+    Compare a candidate encoder against the reference model on the same texts.
+
+    Both encoders embed each text one at a time (the query path) and the row-wise
+    cosine similarity of the two embeddings is reported, together with the median
+    per-query encode latency of each.
+
+    Returns:
+        Dict[str, Any]: min/mean cosine, latencies in ms, speedup, and `passed`, which
+        is True when every cosine is at least `threshold`.
+    """
+
+    def encode_each(encoder):
+        embeddings, latencies = [], []
+        for text in texts:
+            started = time.perf_counter()
+            with torch.no_grad():
+                embedding = encoder.encode([text.lower()], batch_size=1)
+            latencies.append((time.perf_counter() - started) * 1000)
+            embeddings.append(np.asarray(embedding, dtype=np.float32)[0])
+        return np.stack(embeddings), float(np.median(latencies))
+
+    reference_embeddings, reference_ms = encode_each(reference)
+    candidate_embeddings, candidate_ms = encode_each(candidate)
+    cosine = np.sum(reference_embeddings * candidate_embeddings, axis=1) / (
+        np.linalg.norm(reference_embeddings, axis=1)
+        * np.linalg.norm(candidate_embeddings, axis=1)
+    )
+    return {
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "reference_ms": reference_ms,
+        "candidate_ms": candidate_ms,
+        "speedup": reference_ms / candidate_ms if candidate_ms > 0 else float("inf"),
+        "passed": bool(cosine.min() >= threshold),
+    }
+
+
+def main():
+    """
+    Export ONNX encoder artifacts, or check a backend's parity with the reference model.
+    """
+    parser = argparse.ArgumentParser(description="Query encoder backends")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export the ONNX encoder")
+    export_parser.add_argument("--output-dir", type=Path, default=QUERY_ENCODER_DIR)
+    export_parser.add_argument("--no-quantize", action="store_true")
+
+    parity_parser = subparsers.add_parser("parity", help="Check encoder parity")
+    parity_parser.add_argument("--backend", default=QUERY_ENCODER_BACKEND)
+    parity_parser.add_argument("--samples", type=int, default=200)
+    parity_parser.add_argument("--threshold", type=float, default=0.99)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    if args.command == "export":
+        export_onnx_encoder(output_dir=args.output_dir, quantize=not args.no_quantize)
+        return
+
+    texts = list(PARITY_QUERIES)
+    if BOOK_METADATA_FILE.exists():
+        books = load_json_file(BOOK_METADATA_FILE)
+        texts += [book["embedding_input"] for book in books[: args.samples]]
+    report = check_encoder_parity(
+        SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu"),
+        load_query_encoder(args.backend),
+        texts,
+        threshold=args.threshold,
+    )
+    logging.info(f"Parity of '{args.backend}' against torch fp32: {report}")
+    if not report["passed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
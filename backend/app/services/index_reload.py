@@ -0,0 +1,435 @@
+"""
+Module: index_reload.py
+Description: Loads the search engine snapshot (embeddings, metadata and indexes) and
+             hot-reloads it without downtime. A new `SearchEngine` is built in a worker
+             thread and then swapped into `app.state.search_engine` with a single
+             attribute assignment. Requests read that attribute once, so in-flight
+             requests finish on the snapshot they started with. Reloads are triggered
+             through the admin endpoint, or by watching the data files for changes.
+"""
+
+import time
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+import numpy as np
+
+from app.config import (
+    BOOK_EMBEDDINGS_FILE,
+    BOOK_FIELDS_FILE,
+    BOOK_INDEX_FILE,
+    BOOK_METADATA_FILE,
+    BOOK_PASSAGES_FILE,
+    EMBEDDING_MODEL_NAME,
+    FIELD_CANDIDATES,
+    FIELD_SEARCH,
+    FIELD_WEIGHTS,
+    HYBRID_CANDIDATES,
+    HYBRID_SEARCH,
+    KNN_GRAPH_DIR,
+    PASSAGE_CANDIDATES,
+    PASSAGE_SEARCH,
+    RRF_K,
+    SUGGEST_INDEX,
+    SEARCH_SHARDS,
+    SHARD_TIMEOUT,
+    SHARD_TOKEN,
+    SHARED_CORPUS_DIR,
+    THEMES_DIR,
+    VECTOR_INDEX_BACKEND,
+    VECTOR_INDEX_DIM,
+    VECTOR_INDEX_DIR,
+    VECTOR_INDEX_PARAMS,
+    VECTOR_INDEX_PROJECTION,
+)
+from app.pipelines.embed import keys_path
+from app.pipelines.load import (
+    load_book_embeddings,
+    load_book_metadata,
+    load_embedding_index,
+    read_embedding_index_header,
+)
+from app.services.knn_graph import KNN_GRAPH_MANIFEST_NAME, KnnGraph, graph_book_ids
+from app.services.lexical_search import BM25Index
+from app.services.semantic_search import (
+    FieldIndex,
+    PassageIndex,
+    SearchEngine,
+    load_vector_index,
+    normalize_embeddings,
+)
+from app.services.shared_corpus import open_shared_corpus
+from app.services.sharding import (
+    ShardedIndex,
+    fit_shard_projection,
+    shard_backend_params,
+)
+from app.services.suggest import SuggestIndex
+from app.services.themes import THEMES_MANIFEST_NAME, ThemeCatalog
+
+CORPUS_FILES = [
+    BOOK_INDEX_FILE,
+    BOOK_EMBEDDINGS_FILE,
+    BOOK_METADATA_FILE,
+    BOOK_PASSAGES_FILE,
+    BOOK_FIELDS_FILE,
+    THEMES_DIR / THEMES_MANIFEST_NAME,
+    KNN_GRAPH_DIR / KNN_GRAPH_MANIFEST_NAME,
+]
+
+
+def corpus_version(paths: List[Path]) -> str:
+    """
+    Short fingerprint of the corpus files (name, size and modification time), so a
+    snapshot can be matched to the files it was loaded from.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        path = Path(path)
+        if path.exists():
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+def load_corpus() -> Tuple[np.ndarray, List[Dict[str, Any]], str]:
+    """
+    Load the embeddings and metadata from disk, normalizing the embeddings to unit
+    length if the index was not built that way.
+
+    Returns:
+        Tuple[np.ndarray, list, str]: The embeddings, the metadata records and the name
+        of the model that produced the embeddings.
+
+    Raises:
+        ValueError: If the embeddings or metadata fail to load.
+    """
+    # Prefer the memory-mapped binary index; fall back to the legacy JSON file.
+    normalized = False
+    model_name = EMBEDDING_MODEL_NAME
+    if BOOK_INDEX_FILE.exists():
+        document_embeddings, header = load_embedding_index(BOOK_INDEX_FILE)
+        normalized = header["normalized"]
+        model_name = header["model_name"]
+        if model_name != EMBEDDING_MODEL_NAME:
+            logging.warning(
+                f"Embedding index was built with {model_name}, "
+                f"but the query model is {EMBEDDING_MODEL_NAME}."
+            )
+    else:
+        logging.warning(
+            f"{BOOK_INDEX_FILE} not found; loading JSON embeddings instead."
+        )
+        document_embeddings = load_book_embeddings(str(BOOK_EMBEDDINGS_FILE))
+    books_metadata = load_book_metadata(str(BOOK_METADATA_FILE))
+    if document_embeddings is None or books_metadata is None:
+        raise ValueError("Embeddings or metadata failed to load.")
+
+    # Normalize the corpus once so each query is a single matrix-vector product.
+    if not normalized:
+        document_embeddings = normalize_embeddings(document_embeddings)
+    return document_embeddings, books_metadata, model_name
+
+
+def corpus_fingerprint(index_file: Optional[Path]) -> Optional[str]:
+    """
+    Checksum of the corpus embedding index. Artifacts built from the corpus (prebuilt
+    vector indexes, themes) record it, so stale ones are detected on load. None for
+    the legacy JSON embeddings, which carry no checksum.
+    """
+    if index_file is None:
+        return None
+    return read_embedding_index_header(index_file).get("checksum")
+
+
+def load_search_engine(attempts: int = 3) -> SearchEngine:
+    """
+    Build a complete search engine snapshot with the configured vector, metadata and
+    lexical indexes. With `SHARED_CORPUS_DIR` set, the corpus is attached from shared
+    memory (published once per host) instead of being loaded by every worker.
+
+    The snapshot is labelled with the corpus version only if the files still have that
+    version once everything is loaded; a pipeline writing the files mid-load makes the
+    load start over, so new data is never labelled with an old version.
+
+    Raises:
+        ValueError: If the embeddings or metadata fail to load, or the corpus files
+            keep changing for `attempts` loads in a row.
+    """
+    for _ in range(attempts):
+        version = corpus_version(CORPUS_FILES)
+        engine = _build_search_engine(version)
+        if corpus_version(CORPUS_FILES) == version:
+            return engine
+        logging.warning("Corpus files changed while loading; loading them again.")
+        close = getattr(engine.index, "close", None)
+        if close is not None:
+            close()
+    raise ValueError(f"Corpus files kept changing over {attempts} loads.")
+
+
+def _build_search_engine(version: str) -> SearchEngine:
+    """Load the corpus files into a snapshot labelled `version`."""
+    if SHARED_CORPUS_DIR:
+        document_embeddings, books_metadata, index_file = open_shared_corpus(
+            SHARED_CORPUS_DIR, version, load_corpus
+        )
+    else:
+        document_embeddings, books_metadata, _ = load_corpus()
+        index_file = BOOK_INDEX_FILE if BOOK_INDEX_FILE.exists() else None
+    source = corpus_fingerprint(index_file)
+
+    if SEARCH_SHARDS and index_file is not None:
+        # Scatter each query across shard workers (or nodes) that each build the
+        # configured backend over their slice of the binary index, reduced with one
+        # projection fitted on the full corpus.
+        index = ShardedIndex(
+            document_embeddings,
+            index_file,
+            SEARCH_SHARDS,
+            backend=VECTOR_INDEX_BACKEND,
+            backend_params=shard_backend_params(VECTOR_INDEX_BACKEND),
+            timeout=SHARD_TIMEOUT,
+            token=SHARD_TOKEN,
+            projection=fit_shard_projection(document_embeddings),
+        )
+        # Start the shard workers before this snapshot is swapped in, so their cold
+        # start doesn't count against SHARD_TIMEOUT on the first queries.
+        try:
+            index.warm_up()
+        except BaseException:
+            index.close()
+            raise
+    else:
+        if SEARCH_SHARDS:
+            logging.warning(
+                f"Sharded search needs {BOOK_INDEX_FILE}; serving unsharded."
+            )
+        index = load_vector_index(
+            VECTOR_INDEX_BACKEND,
+            document_embeddings,
+            index_path=VECTOR_INDEX_DIR,
+            dim=VECTOR_INDEX_DIM,
+            projection=VECTOR_INDEX_PROJECTION,
+            source=source,
+            **VECTOR_INDEX_PARAMS.get(VECTOR_INDEX_BACKEND, {}),
+        )
+
+    passage_index = None
+    if PASSAGE_SEARCH and BOOK_PASSAGES_FILE.exists():
+        try:
+            passage_index = PassageIndex.load(BOOK_PASSAGES_FILE)
+            if passage_index.num_books != len(books_metadata):
+                raise ValueError(
+                    f"Passage index covers {passage_index.num_books} books, but the "
+                    f"corpus has {len(books_metadata)}; rebuild it with the embed "
+                    "pipeline."
+                )
+            logging.info(f"Loaded {len(passage_index)} description passages.")
+        except ValueError as e:
+            logging.warning(f"Serving without passages: {e}")
+            passage_index = None
+
+    field_index = None
+    if FIELD_SEARCH and keys_path(BOOK_FIELDS_FILE).exists():
+        try:
+            field_index = FieldIndex.load(BOOK_FIELDS_FILE, document_embeddings)
+            field_index.weight_vector(FIELD_WEIGHTS)
+            logging.info(f"Loaded field index over {', '.join(field_index.fields)}.")
+        except ValueError as e:
+            logging.warning(f"Serving without the field index: {e}")
+            field_index = None
+
+    themes = None
+    if (THEMES_DIR / THEMES_MANIFEST_NAME).exists():
+        themes = ThemeCatalog.load(THEMES_DIR)
+        if themes.num_books != len(books_metadata) or themes.source != source:
+            logging.warning(
+                f"Themes were built for another corpus ({themes.num_books} books, "
+                f"{themes.source}) than the loaded one ({len(books_metadata)} books, "
+                f"{source}); rerun the themes pipeline."
+            )
+            themes = None
+
+    knn_graph = None
+    if (KNN_GRAPH_DIR / KNN_GRAPH_MANIFEST_NAME).exists():
+        knn_graph = KnnGraph.load(KNN_GRAPH_DIR)
+        # Rows are matched by book id, so a reordered corpus is caught too.
+        if knn_graph.book_ids.tolist() != graph_book_ids(books_metadata):
+            logging.warning(
+                f"kNN graph covers other books ({len(knn_graph)}) than the corpus "
+                f"({len(books_metadata)}); rerun the kNN graph pipeline."
+            )
+            knn_graph = None
+
+    lexical_index = None
+    if HYBRID_SEARCH:
+        lexical_index = BM25Index.build(books_metadata)
+        logging.info(f"Built BM25 index over {len(lexical_index)} books.")
+
+    suggest_index = None
+    if SUGGEST_INDEX:
+        suggest_index = SuggestIndex.build(books_metadata)
+        logging.info(f"Built suggest index over {len(suggest_index)} entries.")
+
+    logging.info(
+        f"Loaded {len(books_metadata)} books with '{VECTOR_INDEX_BACKEND}' vector "
+        f"index (version {version})."
+    )
+    return SearchEngine(
+        index,
+        books_metadata,
+        lexical_index=lexical_index,
+        hybrid_candidates=HYBRID_CANDIDATES,
+        rrf_k=RRF_K,
+        version=version,
+        embeddings=document_embeddings,
+        passage_index=passage_index,
+        field_index=field_index,
+        field_weights=FIELD_WEIGHTS,
+        field_candidates=FIELD_CANDIDATES,
+        passage_candidates=PASSAGE_CANDIDATES,
+        themes=themes,
+        knn_graph=knn_graph,
+        suggest_index=suggest_index,
+    )
+
+
+class IndexReloader:
+    """
+    Builds new search engine snapshots in the background and swaps them in atomically.
+
+    Attributes:
+        state: The application state holding `search_engine`.
+        loader (Callable[[], SearchEngine]): Builds a complete snapshot.
+        watch_paths (List[Path]): Files whose changes trigger a reload when watching.
+        debounce_ms (int): Quiet period before a burst of file changes triggers a reload.
+        retire_delay (float): Seconds before a replaced snapshot's resources (e.g. shard
+                              workers) are released, letting in-flight requests finish.
+    """
+
+    def __init__(
+        self,
+        state,
+        loader: Callable[[], SearchEngine] = load_search_engine,
+        watch_paths: Optional[List[Path]] = None,
+        debounce_ms: int = 2000,
+        retire_delay: float = 30.0,
+    ) -> None:
+        self.state = state
+        self.loader = loader
+        self.watch_paths = [Path(p).resolve() for p in (watch_paths or CORPUS_FILES)]
+        self.debounce_ms = debounce_ms
+        self.retire_delay = retire_delay
+        self._lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._background: set = set()
+        self.loaded_at: Optional[float] = None
+        self.last_reload_s: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def reloading(self) -> bool:
+        return self._lock.locked()
+
+    async def reload(self, reason: str = "admin") -> Dict[str, Any]:
+        """
+        Build a new snapshot off the event loop and swap it in. If loading fails, the
+        current snapshot stays active and the error is recorded and re-raised.
+        """
+        async with self._lock:
+            logging.info(f"Reloading search index ({reason})...")
+            started = time.perf_counter()
+            try:
+                engine = await asyncio.to_thread(self.loader)
+            except Exception as e:
+                self.last_error = str(e)
+                logging.error(f"Search index reload failed: {e}")
+                raise
+
+            previous = getattr(self.state, "search_engine", None)
+            self.state.search_engine = engine  # The atomic swap.
+            self.state.document_embeddings = engine.embeddings
+            self.state.books_metadata = engine.books_metadata
+            self.loaded_at = time.time()
+            self.last_reload_s = time.perf_counter() - started
+            self.last_error = None
+            logging.info(
+                f"Search index version {engine.version} active "
+                f"({self.last_reload_s:.2f}s to build)."
+            )
+            if previous is not None and previous is not engine:
+                self._spawn(self._retire(previous))
+        return self.status()
+
+    def reload_in_background(self, reason: str = "admin") -> None:
+        """Start a reload without waiting for it; failures are logged."""
+        self._spawn(self._reload_quietly(reason))
+
+    async def _reload_quietly(self, reason: str) -> None:
+        try:
+            await self.reload(reason)
+        except Exception:
+            pass  # Already logged and recorded in `last_error`.
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _retire(self, engine: SearchEngine) -> None:
+        """Release a replaced snapshot's worker resources once requests have drained."""
+        close = getattr(engine.index, "close", None)
+        if close is None:
+            return
+        try:
+            await asyncio.sleep(self.retire_delay)
+        finally:
+            close()
+            logging.info(f"Retired search index version {engine.version}.")
+
+    def status(self) -> Dict[str, Any]:
+        engine = getattr(self.state, "search_engine", None)
+        return {
+            "version": engine.version if engine is not None else None,
+            "books": len(engine) if engine is not None else 0,
+            "loaded_at": self.loaded_at,
+            "last_reload_s": self.last_reload_s,
+            "reloading": self.reloading,
+            "watching": self._watch_task is not None,
+            "last_error": self.last_error,
+        }
+
+    async def start_watching(self) -> None:
+        """Reload whenever one of the watched files is replaced or modified."""
+        from watchfiles import awatch
+
+        self._stop_event = asyncio.Event()
+        directories = sorted({str(path.parent) for path in self.watch_paths})
+
+        async def watch():
+            async for changes in awatch(
+                *directories, debounce=self.debounce_ms, stop_event=self._stop_event
+            ):
+                if any(Path(path).resolve() in self.watch_paths for _, path in changes):
+                    await self._reload_quietly("file change")
+
+        self._watch_task = asyncio.create_task(watch())
+        logging.info(f"Watching {', '.join(directories)} for corpus changes.")
+
+    async def stop(self) -> None:
+        """Stop watching and cancel pending background work."""
+        if self._watch_task is not None:
+            self._stop_event.set()
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._watch_task = None
+        for task in list(self._background):
+            task.cancel()
@@ -0,0 +1,121 @@
+"""
+Module: knn_graph.py
+Description: Precomputed book-to-book nearest-neighbour graph behind "more like this".
+             Every book's top-N most similar books are computed offline (see
+             app/pipelines/knn_graph.py) and stored as compact arrays, so a request
+             for similar books is a dictionary lookup plus one row read, with no
+             query encoding and no corpus scan.
+
+             Directory layout:
+               neighbors.npy  neighbour rows per book, best first (int32, [n, N])
+               scores.npy     cosine similarity of each neighbour (float16, [n, N])
+               book_ids.npy   book id of every row (unicode)
+               graph.json     build parameters; written last
+"""
+
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Sequence, Tuple
+
+import numpy as np
+
+from app.config import EMBEDDING_MODEL_NAME
+
+KNN_GRAPH_MANIFEST_NAME = "graph.json"
+
+
+def graph_book_ids(books_metadata: Sequence[Dict[str, Any]]) -> List[str]:
+    """The id of every corpus row in the graph: its book_id, or the row if it has none."""
+    return [str(book.get("book_id") or row) for row, book in enumerate(books_metadata)]
+
+
+class KnnGraph:
+    """
+    Top-N neighbours of every book in the corpus.
+
+    Attributes:
+        neighbors (np.ndarray): Neighbour rows per book, best first (int32).
+        scores (np.ndarray): Similarity of each neighbour (float16).
+        book_ids (np.ndarray): Book id of every row.
+    """
+
+    def __init__(
+        self, neighbors: np.ndarray, scores: np.ndarray, book_ids: np.ndarray
+    ) -> None:
+        if not neighbors.shape == scores.shape or len(neighbors) != len(book_ids):
+            raise ValueError("Neighbour, score and book id arrays do not match.")
+        self.neighbors = neighbors
+        self.scores = scores
+        self.book_ids = book_ids
+        self._rows: Dict[str, int] = {
+            str(book_id): row for row, book_id in enumerate(book_ids)
+        }
+
+    @classmethod
+    def load(cls, path: Path) -> "KnnGraph":
+        """Memory-map the neighbour arrays; rows are paged in as they are read."""
+        path = Path(path)
+        return cls(
+            np.load(path / "neighbors.npy", mmap_mode="r"),
+            np.load(path / "scores.npy", mmap_mode="r"),
+            np.load(path / "book_ids.npy"),
+        )
+
+    def save(self, path: Path, model_name: str = EMBEDDING_MODEL_NAME) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "neighbors.npy", self.neighbors.astype(np.int32))
+        np.save(path / "scores.npy", self.scores.astype(np.float16))
+        np.save(path / "book_ids.npy", np.asarray(self.book_ids, dtype=str))
+        # The manifest goes last, so a reader never sees a half-written graph.
+        tmp_path = path / f"{KNN_GRAPH_MANIFEST_NAME}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "model_name": model_name,
+                    "num_books": len(self),
+                    "num_neighbors": self.num_neighbors,
+                },
+                file,
+            )
+        tmp_path.replace(path / KNN_GRAPH_MANIFEST_NAME)
+
+    def __len__(self) -> int:
+        return len(self.neighbors)
+
+    @property
+    def num_neighbors(self) -> int:
+        return self.neighbors.shape[1]
+
+    def row(self, book_id: str) -> int:
+        """
+        Corpus row of a book.
+
+        Raises:
+            KeyError: If the book is not in the graph.
+        """
+        return self._rows[book_id]
+
+    def similar(self, book_id: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        The k most similar books to a book, best first.
+
+        Returns:
+            List[Tuple[int, float]]: (corpus row, similarity) pairs.
+
+        Raises:
+            KeyError: If the book is not in the graph.
+        """
+        return self.similar_rows(self.row(book_id), k)
+
+    def similar_rows(self, row: int, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        The k most similar books to the book in a corpus row, best first.
+
+        Returns:
+            List[Tuple[int, float]]: (corpus row, similarity) pairs.
+        """
+        return [
+            (int(neighbor), float(score))
+            for neighbor, score in zip(self.neighbors[row, :k], self.scores[row, :k])
+        ]
@@ -0,0 +1,211 @@
+"""
+Module: lexical_search.py
+Description: BM25 keyword search over the normalized `title`, `author` and `subjects`
+             fields produced by `app/pipelines/transform.py`, for exact title and author
+             queries that embedding similarity ranks poorly. Stored fields and queries
+             share one lightweight term key, so no spaCy model is needed to serve.
+
+             The inverted index is array-backed (CSR layout): the postings of term t are
+             `doc_ids[offsets[t]:offsets[t + 1]]`, with a precomputed BM25 impact per
+             posting, so a query is a few array slices and one `np.bincount`.
+"""
+
+import re
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# Weight of a token occurrence in each field (a simple BM25F-style term frequency).
+BM25_FIELD_WEIGHTS = {"title": 3.0, "author": 2.0, "subjects": 1.0}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens of a text."""
+    return re.sub(r"[^a-z0-9\s]", " ", str(text).lower()).split()
+
+
+# Common English function words. The transform pipeline drops spaCy's stopwords from
+# the stored fields, so raw text has to lose them too before it can match.
+STOPWORDS = frozenset("""
+    a about above after again against all am an and any are as at be because been
+    before being below between both but by can could did do does doing down during
+    each few for from further had has have having he her here hers herself him
+    himself his how i if in into is it its itself just me more most my myself no nor
+    not now of off on once only or other our ours ourselves out over own same she
+    should so some such than that the their theirs them themselves then there these
+    they this those through to too under until up very was we were what when where
+    which while who whom why will with would you your yours yourself yourselves
+    """.split())
+
+
+def term_key(token: str) -> str:
+    """
+    Light suffix folding of a token ("stories" -> "story", "cats" -> "cat"). Applied
+    to indexed and queried text alike, so plurals meet the lemmas the transform
+    pipeline stored without loading spaCy at request time.
+    """
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith("sses"):
+        return token[:-2]
+    if (
+        len(token) > 3
+        and token.endswith("s")
+        and not token.endswith(("ss", "us", "is"))
+    ):
+        return token[:-1]
+    return token
+
+
+def key_terms(text: str) -> List[str]:
+    """Stopword-free, suffix-folded tokens of a text (see `term_key`)."""
+    return [term_key(token) for token in tokenize(text) if token not in STOPWORDS]
+
+
+def query_terms(query: str) -> List[str]:
+    """
+    Terms of a raw query, keyed like the indexed fields were at build time (see
+    `key_terms`), so "secrets" matches a stored "secret".
+    """
+    return key_terms(query)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over book metadata, aligned with the embedding rows.
+
+    Attributes:
+        vocabulary (Dict[str, int]): Term -> term id.
+        offsets (np.ndarray): Start of each term's postings (int64, [num_terms + 1]).
+        doc_ids (np.ndarray): Row id of every posting, grouped by term (int32).
+        impacts (np.ndarray): BM25 contribution of every posting (float32).
+        num_rows (int): Number of indexed books.
+    """
+
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        impacts: np.ndarray,
+        num_rows: int,
+    ) -> None:
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.num_rows = num_rows
+
+    @classmethod
+    def build(
+        cls,
+        books_metadata: List[Dict[str, Any]],
+        field_weights: Optional[Dict[str, float]] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> "BM25Index":
+        """
+        Index the weighted title/author/subjects tokens of every book.
+
+        Returns:
+            BM25Index: Index whose postings hold precomputed BM25 impacts.
+        """
+        field_weights = field_weights or BM25_FIELD_WEIGHTS
+        vocabulary: Dict[str, int] = {}
+        posting_terms, posting_docs, posting_tfs = [], [], []
+        doc_lengths = np.zeros(len(books_metadata), dtype=np.float32)
+
+        for row, book in enumerate(books_metadata):
+            frequencies: Counter = Counter()
+            for field, weight in field_weights.items():
+                for token in key_terms(book.get(field) or ""):
+                    frequencies[token] += weight
+            doc_lengths[row] = sum(frequencies.values())
+            for token, frequency in frequencies.items():
+                posting_terms.append(vocabulary.setdefault(token, len(vocabulary)))
+                posting_docs.append(row)
+                posting_tfs.append(frequency)
+
+        # Group postings by term (CSR); rows stay ascending within each term.
+        terms = np.asarray(posting_terms, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")
+        doc_ids = np.asarray(posting_docs, dtype=np.int32)[order]
+        tfs = np.asarray(posting_tfs, dtype=np.float32)[order]
+        doc_freqs = np.bincount(terms, minlength=len(vocabulary))
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(doc_freqs, out=offsets[1:])
+
+        # Precompute each posting's BM25 impact: idf * saturated, length-normalized tf.
+        num_rows = len(books_metadata)
+        idf = np.log1p((num_rows - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        avg_length = float(doc_lengths.mean()) if num_rows else 0.0
+        length_norm = k1 * (1 - b + b * doc_lengths / max(avg_length, 1e-9))
+        impacts = (
+            np.repeat(idf, doc_freqs) * tfs * (k1 + 1) / (tfs + length_norm[doc_ids])
+        ).astype(np.float32)
+        return cls(vocabulary, offsets, doc_ids, impacts, num_rows)
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def search(
+        self, query: str, k: int, rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rank books by BM25 score for a text query. Only books containing at least one
+        query term are scored.
+
+        Args:
+            query (str): Raw query text.
+            k (int): Number of rows to return.
+            rows (np.ndarray, optional): Sorted row ids to restrict the search to.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row ids and their BM25 scores, best first.
+        """
+        term_ids = [
+            self.vocabulary[t] for t in query_terms(query) if t in self.vocabulary
+        ]
+        if not term_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        docs = np.concatenate(
+            [self.doc_ids[self.offsets[t] : self.offsets[t + 1]] for t in term_ids]
+        )
+        impacts = np.concatenate(
+            [self.impacts[self.offsets[t] : self.offsets[t + 1]] for t in term_ids]
+        )
+        candidates, positions = np.unique(docs, return_inverse=True)
+        scores = np.bincount(positions, weights=impacts).astype(np.float32)
+        if rows is not None:
+            keep = np.isin(candidates, rows, assume_unique=True)
+            candidates, scores = candidates[keep], scores[keep]
+
+        if k < len(scores):
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return candidates[top].astype(np.int64), scores[top]
+
+
+def reciprocal_rank_fusion(
+    rankings: List[np.ndarray], k: int, rrf_k: int = 60
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fuse several best-first rankings of row ids: each row scores the sum of
+    1 / (rrf_k + rank) over the rankings it appears in.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The k best fused row ids and their fused scores.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking.tolist()):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (rrf_k + rank + 1)
+    best = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+    return (
+        np.array([row for row, _ in best], dtype=np.int64),
+        np.array([score for _, score in best], dtype=np.float32),
+    )
@@ -0,0 +1,167 @@
+"""
+Module: metadata_filter.py
+Description: Inverted indexes over book metadata, built once at load time, that turn
+             structured filters (publication year range, subjects, author) into the set
+             of matching corpus rows. Vector search then only scores those rows.
+
+             - subjects: subject -> packed row bitmap (1 bit per book)
+             - authors:  author -> sorted int32 row ids
+             - years:    publication years sorted ascending, with their row ids
+"""
+
+import re
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.services.lexical_search import key_terms
+
+
+def normalize_filter_value(value: str) -> str:
+    """
+    Canonical form of a subject or author used as an index key: lowercase letters,
+    digits and single spaces.
+    """
+    value = re.sub(r"[^a-z0-9\s]", "", str(value).lower())
+    return " ".join(value.split())
+
+
+def filter_key(value: str) -> str:
+    """
+    Index key of a subject or author, computed the same way for the stored fields (at
+    build time) and for filter values: stopwords dropped and plurals folded, so "Cats"
+    matches "cat" and "History of Science" "history science".
+    """
+    return " ".join(key_terms(normalize_filter_value(value)))
+
+
+def _test_bits(bitmap: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Boolean mask of which `rows` are set in a packed (big-endian bit order) bitmap."""
+    return ((bitmap[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+
+
+class MetadataIndex:
+    """
+    Inverted indexes over `books_metadata`, aligned with the embedding rows.
+
+    Attributes:
+        num_rows (int): Number of books indexed.
+        subject_bitmaps (Dict[str, np.ndarray]): Packed uint8 row bitmap per subject.
+        author_rows (Dict[str, np.ndarray]): Sorted int32 row ids per author.
+        years (np.ndarray): Known publication years, sorted ascending (int32).
+        year_rows (np.ndarray): Row id of each entry in `years` (int32).
+    """
+
+    def __init__(
+        self,
+        num_rows: int,
+        subject_bitmaps: Dict[str, np.ndarray],
+        author_rows: Dict[str, np.ndarray],
+        years: np.ndarray,
+        year_rows: np.ndarray,
+    ) -> None:
+        self.num_rows = num_rows
+        self.subject_bitmaps = subject_bitmaps
+        self.author_rows = author_rows
+        self.years = years
+        self.year_rows = year_rows
+
+    @classmethod
+    def build(cls, books_metadata: List[Dict[str, Any]]) -> "MetadataIndex":
+        """
+        Build the indexes from preprocessed book records (`subjects` is a
+        comma-separated string, `year` a string that may be empty).
+        """
+        num_rows = len(books_metadata)
+        subject_lists: Dict[str, List[int]] = {}
+        author_lists: Dict[str, List[int]] = {}
+        years, year_rows = [], []
+
+        for row, book in enumerate(books_metadata):
+            for subject in str(book.get("subjects") or "").split(","):
+                key = filter_key(subject)
+                if key:
+                    subject_lists.setdefault(key, []).append(row)
+            author = filter_key(book.get("author") or "")
+            if author:
+                author_lists.setdefault(author, []).append(row)
+            year = str(book.get("year") or "").strip()
+            if year.lstrip("-").isdigit():
+                years.append(int(year))
+                year_rows.append(row)
+
+        subject_bitmaps = {}
+        for subject, rows in subject_lists.items():
+            mask = np.zeros(num_rows, dtype=bool)
+            mask[rows] = True
+            subject_bitmaps[subject] = np.packbits(mask)
+
+        years = np.asarray(years, dtype=np.int32)
+        order = np.argsort(years, kind="stable")
+        return cls(
+            num_rows,
+            subject_bitmaps,
+            {
+                author: np.asarray(rows, dtype=np.int32)
+                for author, rows in author_lists.items()
+            },
+            years[order],
+            np.asarray(year_rows, dtype=np.int32)[order],
+        )
+
+    def subject_bitmap(self, subjects: List[str]) -> np.ndarray:
+        """Packed bitmap of the books tagged with any of `subjects`."""
+        bitmap = np.zeros((self.num_rows + 7) // 8, dtype=np.uint8)
+        for subject in subjects:
+            subject_bitmap = self.subject_bitmaps.get(filter_key(subject))
+            if subject_bitmap is not None:
+                bitmap |= subject_bitmap
+        return bitmap
+
+    def year_range_rows(
+        self, year_min: Optional[int] = None, year_max: Optional[int] = None
+    ) -> np.ndarray:
+        """Sorted rows published within [year_min, year_max]; either bound may be open."""
+        start = 0 if year_min is None else np.searchsorted(self.years, year_min, "left")
+        stop = (
+            len(self.years)
+            if year_max is None
+            else np.searchsorted(self.years, year_max, "right")
+        )
+        return np.sort(self.year_rows[start:stop])
+
+    def filter_rows(
+        self,
+        year_min: Optional[int] = None,
+        year_max: Optional[int] = None,
+        subjects: Optional[List[str]] = None,
+        author: Optional[str] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        Rows matching every given filter; subjects match if any of them applies.
+
+        The most selective indexes are applied first: author rows and the year range
+        are intersected as sorted arrays, and subjects are checked against a bitmap.
+
+        Returns:
+            Optional[np.ndarray]: Sorted int64 row ids, or None when no filter is set.
+        """
+        rows = None
+        if author:
+            rows = self.author_rows.get(filter_key(author), np.empty(0, dtype=np.int32))
+        if year_min is not None or year_max is not None:
+            year_rows = self.year_range_rows(year_min, year_max)
+            rows = (
+                year_rows
+                if rows is None
+                else np.intersect1d(rows, year_rows, assume_unique=True)
+            )
+        if subjects:
+            bitmap = self.subject_bitmap(subjects)
+            if rows is None:
+                rows = np.flatnonzero(
+                    np.unpackbits(bitmap, count=self.num_rows).astype(bool)
+                )
+            else:
+                rows = rows[_test_bits(bitmap, rows)]
+        return None if rows is None else rows.astype(np.int64)
@@ -0,0 +1,168 @@
+# app/services/result_cache.py
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+from app.clients.cache_client import CacheClient
+from app.services.embedding_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticResultCache:
+    """
+    Cache of recommendation streams keyed by query embedding, so near-identical
+    queries ("books like hunter x hunter", "anime similar to hunter hunter") replay an
+    earlier answer instead of paying for a new LLM generation.
+
+    Each worker keeps a small matrix of recently answered, unit-length query vectors.
+    A lookup is one matrix-vector product over it: the most similar live entry is a hit
+    when its cosine similarity reaches `threshold`. The SSE chunks of each answer are
+    stored through `CacheClient`, so Redis expiry and memory limits apply to them too;
+    its blocking round trips run in a worker thread, off the event loop.
+
+    Entries are only matched within the same scope (index version and metadata
+    filters), since those change which books the answer is based on.
+
+    Attributes:
+        namespace (str): Prefix of the Redis keys, e.g. the query encoder name.
+        cache_client (CacheClient): Stores the recorded SSE chunks.
+        threshold (float): Minimum cosine similarity for a hit.
+        max_entries (int): Number of query vectors kept; the least recently used entry
+                           is evicted when full.
+        ttl (int): Time-to-live in seconds of each entry.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        cache_client: CacheClient,
+        threshold: float = 0.9,
+        max_entries: int = 1024,
+        ttl: int = 24 * 3600,
+    ) -> None:
+        self.namespace = namespace
+        self.cache_client = cache_client
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._vectors: Optional[np.ndarray] = None  # [max_entries, dim], on first put
+        self._expires = np.zeros(max_entries)  # 0 marks an empty slot
+        self._last_used = np.zeros(max_entries)
+        self._scopes = np.full(max_entries, None, dtype=object)
+        self._keys: List[Optional[str]] = [None] * max_entries
+        self._stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    def _key(self, query: str, scope: str) -> str:
+        digest = hashlib.sha1(f"{scope}\0{normalize_query(query)}".encode("utf-8"))
+        return f"result_cache:{self.namespace}:{digest.hexdigest()}"
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _free(self, slot: int) -> None:
+        self._expires[slot] = 0.0
+        self._scopes[slot] = None
+        self._keys[slot] = None
+
+    async def lookup(self, vector: np.ndarray, scope: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the stored answer of the most similar earlier query in the same scope.
+
+        Returns:
+            dict: {"query", "chunks", "similarity"} on a hit, or None on a miss.
+        """
+        if self._vectors is None:
+            self._stats["misses"] += 1
+            return None
+        now = time.time()
+        scores = self._vectors @ self._unit(vector)
+        scores[(self._expires <= now) | (self._scopes != scope)] = -np.inf
+        slot = int(np.argmax(scores))
+        if scores[slot] < self.threshold:
+            self._stats["misses"] += 1
+            return None
+
+        key = self._keys[slot]
+        entry = await asyncio.to_thread(self.cache_client.get, key)
+        if not entry:
+            # Evicted or expired in Redis first; drop the stale vector too, unless a
+            # concurrent put reused the slot meanwhile.
+            if self._keys[slot] == key:
+                self._free(slot)
+            self._stats["misses"] += 1
+            return None
+        if self._keys[slot] == key:
+            self._last_used[slot] = now
+        self._stats["hits"] += 1
+        return {**entry, "similarity": float(scores[slot])}
+
+    async def put(
+        self, query: str, vector: np.ndarray, scope: str, chunks: List[str]
+    ) -> bool:
+        """Store the SSE chunks answering a query. Returns False if Redis rejects it."""
+        key = self._key(query, scope)
+        if not await asyncio.to_thread(
+            self.cache_client.set,
+            key,
+            {"query": query, "chunks": chunks},
+            ttl=self.ttl,
+        ):
+            return False
+
+        vector = self._unit(vector)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+        now = time.time()
+        if key in self._keys:
+            slot = self._keys.index(key)
+        else:
+            # Reuse an empty or expired slot, otherwise evict the least recently used.
+            free = np.flatnonzero(self._expires <= now)
+            slot = int(free[0]) if len(free) else int(np.argmin(self._last_used))
+        self._vectors[slot] = vector
+        self._expires[slot] = now + self.ttl
+        self._last_used[slot] = now
+        self._scopes[slot] = scope
+        self._keys[slot] = key
+        self._stats["stores"] += 1
+        return True
+
+    async def record(
+        self,
+        stream: AsyncIterator[str],
+        query: str,
+        vector: np.ndarray,
+        scope: str,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Pass an SSE stream through and store it once it completes. Streams that fail
+        or are abandoned by the client are not cached.
+        """
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        if chunks:
+            await self.put(query, vector, scope, chunks)
+
+    @staticmethod
+    async def replay(chunks: List[str]) -> AsyncGenerator[str, None]:
+        """Stream stored SSE chunks back in their original order."""
+        for chunk in chunks:
+            yield chunk
+
+    def metrics(self) -> Dict[str, Any]:
+        """Report hit counts and the number of live entries."""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "entries": int(np.count_nonzero(self._expires > time.time())),
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
@@ -1,5 +1,8 @@
 import json
+import os
+import shutil
 import logging
+from abc import ABC, abstractmethod
 
 import numpy as np
 import pandas as pd
@@ -7,15 +10,41 @@ import pandas as pd
 import torch
 from sentence_transformers import SentenceTransformer, util
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from pathlib import Path
+from app.config import (
+    EMBEDDING_MODEL_NAME,
+    VECTOR_INDEX_BACKEND,
+    VECTOR_INDEX_DIM,
+    VECTOR_INDEX_DIR,
+    VECTOR_INDEX_PARAMS,
+    VECTOR_INDEX_PROJECTION,
+)
+from app.pipelines.embed import (
+    EMBEDDING_FIELDS,
+    content_hashes,
+    keys_path,
+    refresh_book_embeddings,
+)
+from app.services.lexical_search import BM25Index, reciprocal_rank_fusion
+from app.services.metadata_filter import MetadataIndex
+from app.services.knn_graph import KnnGraph
+from app.services.suggest import SuggestIndex
+from app.services.themes import ThemeCatalog
 from app.pipelines.load import (
     load_book_embeddings,
     load_book_metadata,
-    save_book_embeddings,
+    load_embedding_index,
+    load_embedding_index_offsets,
+    load_json_file,
+    save_embedding_index,
 )
 
+# Number of corpus rows scored per matrix-vector product. Bounds the working set when
+# the corpus is a memory-mapped index larger than RAM.
+SEARCH_CHUNK_ROWS = 65536
+
 
 def create_vector_embedding(
     model: SentenceTransformer, text: str, device: str = "cpu"
@@ -32,27 +61,122 @@ def create_vector_embedding(
         np.ndarray: Vector embedding for the input text.
     """
     print("[*] Creating vector embedding for the input text...")
+    return create_vector_embeddings(model, [text], device)
+
+
+def create_vector_embeddings(
+    model: SentenceTransformer,
+    texts: List[str],
+    device: str = "cpu",
+    batch_size: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Generate vector embeddings for a batch of texts.
+
+    Args:
+        model (SentenceTransformer): A SentenceTransformer model instance, or any
+            query encoder from `app.services.encoders.load_query_encoder`.
+        texts (List[str]): Input texts to embed.
+        device (str): Device to use for encoding (e.g., "cpu" or "cuda").
+        batch_size (int, optional): Texts per forward pass; defaults to all of them.
 
-    processed_text = text.lower()
-    # Encode the text using the model
+    Returns:
+        np.ndarray: float32 embeddings (shape: [len(texts), dim]).
+    """
+    processed_texts = [text.lower() for text in texts]
+    # Encode the texts using the model
     with torch.no_grad():
-        embeddings = model.encode([processed_text], device=device).astype("float32")
+        embeddings = model.encode(
+            processed_texts,
+            batch_size=batch_size or max(len(processed_texts), 1),
+            device=device,
+        ).astype("float32")
     return embeddings
 
 
 def create_book_embeddings(
-    model: SentenceTransformer, book_metadata: List[Dict[str, Any]], device: str = "cpu"
-):
+    model: SentenceTransformer,
+    book_metadata: List[Dict[str, Any]],
+    device: str = "cpu",
+    batch_size: int = 64,
+) -> np.ndarray:
     """
-    Generate vector embeddings for each record in the book corpus and save them as a JSON file.
+    Generate vector embeddings for each record in the book corpus, in batches.
+
+    For large corpora prefer `app.pipelines.embed.build_book_embeddings`, which streams
+    rows to disk and can resume an interrupted build.
     """
+    return create_vector_embeddings(
+        model,
+        [book["embedding_input"] for book in book_metadata],
+        device,
+        batch_size=batch_size,
+    )
 
-    return np.vstack(
-        [
-            create_vector_embedding(model, book["embedding_input"], device)
-            for book in book_metadata
+
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize embedding rows so cosine similarity reduces to a dot product.
+
+    Args:
+        embeddings (np.ndarray): A single vector (shape: [dim]) or a matrix (shape: [n, dim]).
+
+    Returns:
+        np.ndarray: float32 matrix of unit-length rows. All-zero rows are left as zeros.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim == 1:
+        embeddings = embeddings[np.newaxis, :]
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def select_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Select the indices of the k highest scores, best first.
+
+    Uses a partial selection (argpartition) over the whole array and only sorts the k
+    selected candidates, so the cost is O(n + k log k) instead of a full O(n log n) sort.
+
+    Args:
+        scores (np.ndarray): 1-D array of similarity scores.
+        k (int): Number of indices to return.
+
+    Returns:
+        np.ndarray: Indices of the top-k scores in descending score order.
+    """
+    num_scores = scores.shape[0]
+    k = min(k, num_scores)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < num_scores:
+        candidates = np.argpartition(scores, num_scores - k)[num_scores - k :]
+    else:
+        candidates = np.arange(num_scores)
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+def select_top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Row-wise `select_top_k` for a 2-D score matrix (one row of scores per query).
+
+    Returns:
+        np.ndarray: Column indices of each row's top-k scores, best first
+                    (shape: [num_queries, min(k, num_columns)]).
+    """
+    num_columns = scores.shape[1]
+    k = min(k, num_columns)
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < num_columns:
+        candidates = np.argpartition(scores, num_columns - k, axis=1)[
+            :, num_columns - k :
         ]
-    )
+    else:
+        candidates = np.broadcast_to(np.arange(num_columns), scores.shape)
+    order = np.argsort(np.take_along_axis(scores, candidates, axis=1), axis=1)[:, ::-1]
+    return np.take_along_axis(candidates, order, axis=1)
 
 
 def calculate_similarity_scores(
@@ -85,41 +209,1541 @@ def get_top_k_books(
     # Convert the tensor to a numpy array for easier processing
     scores_array = similarity_tensor[0].cpu().numpy()
     # Get indices of the top-k highest scores
-    top_indices = np.argsort(scores_array)[::-1][:k]
+    top_indices = select_top_k(scores_array, k)
     logging.info(f"Top indices: {top_indices}")
     # Map the indices back to the stored metadata
     return [books_metadata[i] for i in top_indices]
 
 
+def spherical_kmeans(
+    embeddings: np.ndarray,
+    num_clusters: int,
+    iterations: int = 20,
+    sample_size: int = 100_000,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Cluster unit-length embeddings with k-means under cosine similarity.
+
+    Centroids are trained on a random sample of at most `sample_size` rows and are
+    re-normalized after every update. Empty clusters are re-seeded from random rows.
+
+    Returns:
+        np.ndarray: Unit-length centroids (shape: [num_clusters, dim]).
+    """
+    rng = np.random.default_rng(seed)
+    num_rows = len(embeddings)
+    sample_rows = np.sort(
+        rng.choice(num_rows, min(num_rows, sample_size), replace=False)
+    )
+    sample = np.asarray(embeddings[sample_rows], dtype=np.float32)
+    num_clusters = min(num_clusters, len(sample))
+
+    centroids = sample[rng.choice(len(sample), num_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = assign_to_centroids(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=num_clusters)
+        empty = counts == 0
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = normalize_embeddings(sums)
+    return centroids
+
+
+def minibatch_spherical_kmeans(
+    embeddings: np.ndarray,
+    num_clusters: int,
+    batch_size: int = 4096,
+    iterations: int = 100,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Mini-batch k-means under cosine similarity, for corpora too large to re-assign in
+    full on every iteration.
+
+    Each iteration assigns one random batch of rows with a single matrix product and
+    moves every centroid towards the mean of its batch members with a per-centroid
+    learning rate of (batch members / all members seen so far), then re-normalizes.
+
+    Returns:
+        np.ndarray: Unit-length centroids (shape: [num_clusters, dim]).
+    """
+    rng = np.random.default_rng(seed)
+    num_rows = len(embeddings)
+    num_clusters = min(num_clusters, num_rows)
+    centroids = np.asarray(
+        embeddings[np.sort(rng.choice(num_rows, num_clusters, replace=False))],
+        dtype=np.float32,
+    ).copy()
+    seen = np.zeros(num_clusters, dtype=np.float64)
+    for _ in range(iterations):
+        batch_rows = np.sort(rng.choice(num_rows, min(batch_size, num_rows), False))
+        batch = np.asarray(embeddings[batch_rows], dtype=np.float32)
+        assignments = np.argmax(batch @ centroids.T, axis=1)
+        counts = np.bincount(assignments, minlength=num_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, batch)
+
+        updated = counts > 0
+        seen[updated] += counts[updated]
+        rate = (counts[updated] / seen[updated])[:, np.newaxis]
+        means = sums[updated] / counts[updated, np.newaxis]
+        centroids[updated] += rate.astype(np.float32) * (means - centroids[updated])
+        centroids = normalize_embeddings(centroids)
+    return centroids
+
+
+def assign_to_centroids(
+    embeddings: np.ndarray, centroids: np.ndarray, chunk_size: int = SEARCH_CHUNK_ROWS
+) -> np.ndarray:
+    """
+    Assign every row to its most similar centroid, scoring the rows in chunks.
+
+    Returns:
+        np.ndarray: Centroid index per row (shape: [num_rows]).
+    """
+    assignments = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), chunk_size):
+        chunk = np.asarray(embeddings[start : start + chunk_size], dtype=np.float32)
+        assignments[start : start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+class VectorIndex(ABC):
+    """
+    Interface for nearest-neighbour indexes over unit-length corpus embeddings.
+
+    Row ids returned by `search` always refer to rows of the original corpus, so they
+    can be mapped straight back to the book metadata.
+    """
+
+    @classmethod
+    @abstractmethod
+    def build(cls, embeddings: np.ndarray, **params) -> "VectorIndex":
+        """Build the index from unit-length embeddings (shape: [num_rows, dim])."""
+
+    @classmethod
+    @abstractmethod
+    def load(cls, path: Path) -> "VectorIndex":
+        """Load an index previously written with `save`."""
+
+    @abstractmethod
+    def save(
+        self,
+        path: Path,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        source: Optional[str] = None,
+    ) -> None:
+        """
+        Persist the index to disk, recording `source` (the checksum of the embedding
+        index it was built from) in its params.json.
+        """
+
+    @abstractmethod
+    def search(
+        self, query: np.ndarray, k: int, **search_params
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k rows most similar to a unit-length query vector.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row ids and their scores, best first.
+        """
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, **search_params
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Search for several unit-length queries (shape: [num_queries, dim]) at once.
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: Row ids and scores per query.
+        """
+        return [self.search(query, k, **search_params) for query in queries]
+
+    @abstractmethod
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        """Return the float32 vectors stored for the given row ids."""
+
+    def search_rows(
+        self,
+        query: np.ndarray,
+        rows: np.ndarray,
+        k: int,
+        chunk_size: int = SEARCH_CHUNK_ROWS,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact search restricted to a subset of rows, e.g. those matching a metadata
+        filter. Only the given rows are scored, so the cost scales with the subset.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row ids and their scores, best first.
+        """
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), chunk_size):
+            chunk = self.reconstruct(rows[start : start + chunk_size])
+            scores[start : start + len(chunk)] = chunk @ query
+        top = select_top_k(scores, k)
+        return rows[top], scores[top]
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of indexed rows."""
+
+
+class FlatIndex(VectorIndex):
+    """
+    Exact index: a brute-force scan over the whole corpus matrix.
+
+    The matrix may be a read-only memory map of a binary embedding index; it is scored
+    in chunks of `chunk_size` rows, keeping only each chunk's top-k.
+    """
+
+    def __init__(
+        self, embeddings: np.ndarray, chunk_size: int = SEARCH_CHUNK_ROWS
+    ) -> None:
+        self.embeddings = embeddings
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def build(
+        cls, embeddings: np.ndarray, chunk_size: int = SEARCH_CHUNK_ROWS
+    ) -> "FlatIndex":
+        return cls(embeddings, chunk_size)
+
+    @classmethod
+    def load(cls, path: Path) -> "FlatIndex":
+        embeddings, header = load_embedding_index(path)
+        if not header["normalized"]:
+            embeddings = normalize_embeddings(embeddings)
+        return cls(embeddings)
+
+    def save(
+        self,
+        path: Path,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        source: Optional[str] = None,
+    ) -> None:
+        save_embedding_index(self.embeddings, path, model_name, normalized=True)
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def score(self, query: np.ndarray) -> np.ndarray:
+        """Score every row against a unit-length query vector."""
+        scores = np.empty(len(self.embeddings), dtype=np.float32)
+        for start in range(0, len(self.embeddings), self.chunk_size):
+            stop = start + self.chunk_size
+            scores[start:stop] = self.embeddings[start:stop] @ query
+        return scores
+
+    def search(
+        self, query: np.ndarray, k: int, **search_params
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        candidate_rows, candidate_scores = [], []
+        for start in range(0, len(self.embeddings), self.chunk_size):
+            chunk_scores = self.embeddings[start : start + self.chunk_size] @ query
+            chunk_top = select_top_k(chunk_scores, k)
+            candidate_rows.append(chunk_top + start)
+            candidate_scores.append(chunk_scores[chunk_top])
+        return _merge_candidates(candidate_rows, candidate_scores, k)
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, **search_params
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Score all queries with one matrix-matrix product per corpus chunk, keeping a
+        running top-k per query.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self.embeddings), self.chunk_size):
+            chunk_scores = queries @ self.embeddings[start : start + self.chunk_size].T
+            chunk_top = select_top_k_rows(chunk_scores, k)
+            rows = np.concatenate([best_rows, chunk_top + start], axis=1)
+            scores = np.concatenate(
+                [best_scores, np.take_along_axis(chunk_scores, chunk_top, axis=1)],
+                axis=1,
+            )
+            top = select_top_k_rows(scores, k)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+            best_scores = np.take_along_axis(scores, top, axis=1)
+        return list(zip(best_rows, best_scores))
+
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.embeddings[rows], dtype=np.float32)
+
+
+class IVFFlatIndex(VectorIndex):
+    """
+    Approximate inverted-file index (IVF-flat).
+
+    The corpus is partitioned into `nlist` clusters by spherical k-means. Vectors are
+    stored grouped by cluster, so a query only scans the `nprobe` clusters whose
+    centroids are closest to it. Raising `nprobe` trades latency for recall.
+
+    Attributes:
+        centroids (np.ndarray): Unit-length cluster centroids (shape: [nlist, dim]).
+        offsets (np.ndarray): Start of each cluster in `vectors` (shape: [nlist + 1]).
+        row_ids (np.ndarray): Original corpus row of every stored vector.
+        vectors (np.ndarray): Corpus vectors grouped by cluster.
+        nprobe (int): Default number of clusters scanned per query.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        row_ids: np.ndarray,
+        vectors: np.ndarray,
+        nprobe: int = 8,
+    ) -> None:
+        self.centroids = centroids
+        self.offsets = offsets
+        self.row_ids = row_ids
+        self.vectors = vectors
+        self.nprobe = nprobe
+        self._positions = np.empty(len(row_ids), dtype=np.int64)
+        self._positions[row_ids] = np.arange(len(row_ids))
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        iterations: int = 20,
+        seed: int = 0,
+    ) -> "IVFFlatIndex":
+        """
+        Args:
+            embeddings (np.ndarray): Unit-length corpus embeddings.
+            nlist (int, optional): Number of clusters; defaults to 4 * sqrt(num_rows).
+            nprobe (int): Default number of clusters scanned per query.
+            iterations (int): k-means iterations.
+            seed (int): Random seed for centroid initialization.
+        """
+        num_rows = len(embeddings)
+        nlist = nlist or max(1, int(4 * np.sqrt(num_rows)))
+        centroids = spherical_kmeans(embeddings, nlist, iterations, seed=seed)
+        assignments = assign_to_centroids(embeddings, centroids)
+
+        row_ids = np.argsort(assignments, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=len(centroids)), out=offsets[1:])
+        vectors = np.asarray(embeddings, dtype=np.float32)[row_ids]
+        return cls(centroids, offsets, row_ids, vectors, nprobe)
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFFlatIndex":
+        path = Path(path)
+        vectors, _ = load_embedding_index(path / "vectors.bin")
+        params = load_json_file(path / "params.json")
+        return cls(
+            np.load(path / "centroids.npy"),
+            np.load(path / "offsets.npy"),
+            np.load(path / "row_ids.npy", mmap_mode="r"),
+            vectors,
+            nprobe=params.get("nprobe", 8),
+        )
+
+    def save(
+        self,
+        path: Path,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        source: Optional[str] = None,
+    ) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "centroids.npy", self.centroids)
+        np.save(path / "offsets.npy", self.offsets)
+        np.save(path / "row_ids.npy", self.row_ids)
+        save_embedding_index(self.vectors, path / "vectors.bin", model_name, True)
+        save_index_params(
+            path, {"nlist": len(self.centroids), "nprobe": self.nprobe}, source
+        )
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def search(
+        self, query: np.ndarray, k: int, nprobe: Optional[int] = None, **search_params
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            nprobe (int, optional): Clusters to scan for this query; overrides the default.
+        """
+        probes = select_top_k(self.centroids @ query, nprobe or self.nprobe)
+        candidate_rows, candidate_scores = [], []
+        for cluster in probes:
+            start, stop = self.offsets[cluster], self.offsets[cluster + 1]
+            if start == stop:
+                continue
+            cluster_scores = self.vectors[start:stop] @ query
+            cluster_top = select_top_k(cluster_scores, k)
+            candidate_rows.append(self.row_ids[start + cluster_top])
+            candidate_scores.append(cluster_scores[cluster_top])
+        return _merge_candidates(candidate_rows, candidate_scores, k)
+
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.vectors[self._positions[rows]])
+
+
+class QuantizedIndex(VectorIndex):
+    """
+    Two-stage index: a compact quantized first-stage scan, then exact re-ranking.
+
+    Only the quantized codes are held in memory. The first stage scores every code and
+    keeps a shortlist of candidates, which are re-ranked with their float32 vectors read
+    from `vectors` (typically a read-only memory map of the binary embedding index).
+    Raising `shortlist` trades latency for recall.
+
+    Subclasses implement `quantize`, `prepare_query` and `approximate_scores`.
+
+    Attributes:
+        codes (np.ndarray): Quantized corpus codes.
+        vectors (np.ndarray): Float32 corpus vectors used for re-ranking.
+        shortlist (int): Default number of first-stage candidates re-ranked per query.
+    """
+
+    # Rows scored per first-stage step; subclasses tune this to stay cache resident.
+    CODES_CHUNK_ROWS = 16384
+
+    def __init__(
+        self, codes: np.ndarray, vectors: np.ndarray, shortlist: int = 100
+    ) -> None:
+        self.codes = codes
+        self.vectors = vectors
+        self.shortlist = shortlist
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, shortlist: int = 100) -> "QuantizedIndex":
+        """
+        Args:
+            embeddings (np.ndarray): Unit-length corpus embeddings; kept by reference
+                                     for re-ranking, so a memory map stays on disk.
+            shortlist (int): Default number of candidates re-ranked per query.
+        """
+        codes, params = cls.quantize(embeddings)
+        return cls(codes, embeddings, shortlist, **params)
+
+    @classmethod
+    @abstractmethod
+    def quantize(cls, embeddings: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Encode the corpus; returns the codes and any parameters needed to score them."""
+
+    @abstractmethod
+    def prepare_query(self, query: np.ndarray) -> Any:
+        """Convert a unit-length query into the form used by `approximate_scores`."""
+
+    @abstractmethod
+    def approximate_scores(self, codes: np.ndarray, prepared_query: Any) -> np.ndarray:
+        """Score a chunk of codes against a prepared query (higher is more similar)."""
+
+    def _params(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    @classmethod
+    def load(cls, path: Path) -> "QuantizedIndex":
+        path = Path(path)
+        vectors, _ = load_embedding_index(path / "vectors.bin")
+        params = load_json_file(path / "params.json")
+        arrays = np.load(path / "codes.npz")
+        extra = {name: arrays[name] for name in arrays.files if name != "codes"}
+        return cls(arrays["codes"], vectors, params.get("shortlist", 100), **extra)
+
+    def save(
+        self,
+        path: Path,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        source: Optional[str] = None,
+    ) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.savez(path / "codes.npz", codes=self.codes, **self._params())
+        save_embedding_index(self.vectors, path / "vectors.bin", model_name, True)
+        save_index_params(path, {"shortlist": self.shortlist}, source)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        shortlist: Optional[int] = None,
+        **search_params,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            shortlist (int, optional): First-stage candidates to re-rank for this query.
+        """
+        prepared_query = self.prepare_query(query)
+        approximate = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), self.CODES_CHUNK_ROWS):
+            stop = start + self.CODES_CHUNK_ROWS
+            approximate[start:stop] = self.approximate_scores(
+                self.codes[start:stop], prepared_query
+            )
+        candidates = select_top_k(approximate, max(k, shortlist or self.shortlist))
+
+        # Re-rank the shortlist exactly; sorted rows make the disk reads sequential.
+        candidates = np.sort(candidates)
+        exact_scores = self.reconstruct(candidates) @ query
+        top = select_top_k(exact_scores, k)
+        return candidates[top], exact_scores[top]
+
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.vectors[rows], dtype=np.float32)
+
+
+class Int8Index(QuantizedIndex):
+    """
+    Scalar int8 quantization (4x smaller than float32).
+
+    Each dimension is scaled by its maximum absolute value so it fits in [-127, 127].
+    The per-dimension scale is folded into the query, and codes are widened to float32
+    in small cache-resident blocks so the first stage still runs on BLAS.
+    """
+
+    CODES_CHUNK_ROWS = 1024
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        vectors: np.ndarray,
+        shortlist: int = 100,
+        scale: Optional[np.ndarray] = None,
+    ) -> None:
+        super().__init__(codes, vectors, shortlist)
+        self.scale = scale
+
+    @classmethod
+    def quantize(cls, embeddings: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+        max_abs = np.zeros(embeddings.shape[1], dtype=np.float32)
+        for start in range(0, len(embeddings), SEARCH_CHUNK_ROWS):
+            chunk = np.abs(embeddings[start : start + SEARCH_CHUNK_ROWS])
+            np.maximum(max_abs, chunk.max(axis=0), out=max_abs)
+        scale = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+
+        codes = np.empty(embeddings.shape, dtype=np.int8)
+        for start in range(0, len(embeddings), SEARCH_CHUNK_ROWS):
+            chunk = embeddings[start : start + SEARCH_CHUNK_ROWS] / scale
+            codes[start : start + SEARCH_CHUNK_ROWS] = np.clip(
+                np.rint(chunk), -127, 127
+            )
+        return codes, {"scale": scale}
+
+    def _params(self) -> Dict[str, np.ndarray]:
+        return {"scale": self.scale}
+
+    def prepare_query(self, query: np.ndarray) -> Any:
+        buffer = np.empty((self.CODES_CHUNK_ROWS, self.codes.shape[1]), np.float32)
+        return query * self.scale, buffer
+
+    def approximate_scores(self, codes: np.ndarray, prepared_query: Any) -> np.ndarray:
+        scaled_query, buffer = prepared_query
+        block = buffer[: len(codes)]
+        np.copyto(block, codes, casting="unsafe")
+        return block @ scaled_query
+
+
+# Number of set bits in every 16-bit value, for vectorized popcounts.
+_POPCOUNT_8 = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(
+    axis=1, dtype=np.uint8
+)
+POPCOUNT_TABLE = (
+    _POPCOUNT_8[np.arange(65536) & 0xFF] + _POPCOUNT_8[np.arange(65536) >> 8]
+).astype(np.uint8)
+
+
+class BinaryIndex(QuantizedIndex):
+    """
+    Sign-bit binary quantization (32x smaller than float32).
+
+    Each dimension is reduced to one bit (positive or not) and packed into 16-bit
+    words. The first stage ranks rows by Hamming distance to the query's bits, computed
+    with XOR and a 16-bit popcount lookup table.
+    """
+
+    @classmethod
+    def quantize(cls, embeddings: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+        num_words = (embeddings.shape[1] + 15) // 16
+        codes = np.zeros((len(embeddings), num_words * 2), dtype=np.uint8)
+        for start in range(0, len(embeddings), SEARCH_CHUNK_ROWS):
+            bits = np.packbits(
+                embeddings[start : start + SEARCH_CHUNK_ROWS] > 0, axis=1
+            )
+            codes[start : start + SEARCH_CHUNK_ROWS, : bits.shape[1]] = bits
+        return codes.view(np.uint16), {}
+
+    def prepare_query(self, query: np.ndarray) -> Any:
+        query_bits = np.zeros(self.codes.shape[1] * 2, dtype=np.uint8)
+        bits = np.packbits(query > 0)
+        query_bits[: len(bits)] = bits
+        return query_bits.view(np.uint16)
+
+    def approximate_scores(self, codes: np.ndarray, prepared_query: Any) -> np.ndarray:
+        distances = np.take(POPCOUNT_TABLE, codes ^ prepared_query)
+        return -distances.sum(axis=1, dtype=np.int32)
+
+
+def _merge_candidates(
+    candidate_rows: List[np.ndarray], candidate_scores: List[np.ndarray], k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge per-partition top-k candidates into a global top-k."""
+    if not candidate_rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    rows = np.concatenate(candidate_rows)
+    scores = np.concatenate(candidate_scores)
+    top = select_top_k(scores, k)
+    return rows[top], scores[top]
+
+
+PROJECTION_METHODS = ("pca", "truncate")
+
+
+def fit_projection(
+    embeddings: np.ndarray,
+    dim: int,
+    method: str = "pca",
+    sample_size: int = 100_000,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Fit a linear projection of unit-length embeddings down to `dim` dimensions.
+
+    - "pca": the top eigenvectors of the (uncentered) second-moment matrix of a sample
+      of rows, which best preserve inner products among all rank-`dim` projections.
+    - "truncate": keep the first `dim` coordinates, for Matryoshka-style models
+      trained so that prefixes of the embedding remain meaningful.
+
+    Returns:
+        np.ndarray: Projection matrix with orthonormal columns (shape: [full_dim, dim]).
+
+    Raises:
+        ValueError: If the method is unknown or `dim` is not below the full dimension.
+    """
+    full_dim = embeddings.shape[1]
+    if method not in PROJECTION_METHODS:
+        raise ValueError(
+            f"Unknown projection '{method}'. "
+            f"Expected one of: {', '.join(PROJECTION_METHODS)}"
+        )
+    if not 0 < dim < full_dim:
+        raise ValueError(f"Target dimension must be in [1, {full_dim - 1}], got {dim}.")
+    if method == "truncate":
+        return np.eye(full_dim, dim, dtype=np.float32)
+
+    rng = np.random.default_rng(seed)
+    num_rows = len(embeddings)
+    sample_rows = np.sort(
+        rng.choice(num_rows, min(num_rows, sample_size), replace=False)
+    )
+    sample = np.asarray(embeddings[sample_rows], dtype=np.float64)
+    _, eigenvectors = np.linalg.eigh(sample.T @ sample / len(sample))
+    # eigh sorts eigenvalues ascending; keep the largest `dim`, largest first.
+    return np.ascontiguousarray(eigenvectors[:, ::-1][:, :dim], dtype=np.float32)
+
+
+def project_embeddings(
+    embeddings: np.ndarray, projection: np.ndarray, chunk_size: int = SEARCH_CHUNK_ROWS
+) -> np.ndarray:
+    """
+    Project embeddings in row chunks and re-normalize them, so inner products in the
+    reduced space are cosine similarities again.
+
+    Returns:
+        np.ndarray: Unit-length reduced embeddings (shape: [num_rows, dim]).
+    """
+    reduced = np.empty((len(embeddings), projection.shape[1]), dtype=np.float32)
+    for start in range(0, len(embeddings), chunk_size):
+        chunk = np.asarray(embeddings[start : start + chunk_size], dtype=np.float32)
+        reduced[start : start + chunk_size] = normalize_embeddings(chunk @ projection)
+    return reduced
+
+
+class ProjectedIndex(VectorIndex):
+    """
+    Vector index over dimensionality-reduced embeddings.
+
+    The corpus is projected once (see `fit_projection`) and indexed by any other
+    backend; every query is projected the same way before it is searched. Going from
+    384 to 64 dimensions makes the corpus 6x smaller and each scan 6x cheaper, at the
+    cost of recall (see `app/pipelines/reduce.py` for a recall report).
+
+    Attributes:
+        projection (np.ndarray): Projection matrix (shape: [full_dim, dim]).
+        index (VectorIndex): Backend index over the reduced, unit-length corpus.
+        method (str): How the projection was fitted ("pca" or "truncate").
+        backend (str): Name of the backend of `index`.
+    """
+
+    def __init__(
+        self,
+        projection: np.ndarray,
+        index: VectorIndex,
+        method: str = "pca",
+        backend: str = "exact",
+    ) -> None:
+        self.projection = projection
+        self.index = index
+        self.method = method
+        self.backend = backend
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        dim: int = 128,
+        method: str = "pca",
+        backend: str = "exact",
+        sample_size: int = 100_000,
+        seed: int = 0,
+        **backend_params,
+    ) -> "ProjectedIndex":
+        """
+        Args:
+            embeddings (np.ndarray): Unit-length corpus embeddings.
+            dim (int): Target dimension.
+            method (str): "pca" or "truncate".
+            backend (str): Backend indexing the reduced corpus.
+            sample_size (int): Rows used to fit a PCA projection.
+            seed (int): Random seed for the PCA sample.
+            **backend_params: Parameters passed to the backend's `build`.
+        """
+        projection = fit_projection(embeddings, dim, method, sample_size, seed)
+        reduced = project_embeddings(embeddings, projection)
+        index = VECTOR_INDEX_BACKENDS[backend].build(reduced, **backend_params)
+        return cls(projection, index, method, backend)
+
+    @classmethod
+    def load(cls, path: Path) -> "ProjectedIndex":
+        path = Path(path)
+        params = load_json_file(path / "params.json")
+        backend = params.get("backend", "exact")
+        index_class = VECTOR_INDEX_BACKENDS[backend]
+        index = index_class.load(
+            path / ("vectors.bin" if index_class is FlatIndex else backend)
+        )
+        return cls(
+            np.load(path / "projection.npy"), index, params.get("method"), backend
+        )
+
+    def save(
+        self,
+        path: Path,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        source: Optional[str] = None,
+    ) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "projection.npy", self.projection)
+        self.index.save(
+            path
+            / ("vectors.bin" if isinstance(self.index, FlatIndex) else self.backend),
+            model_name,
+        )
+        save_index_params(
+            path,
+            {
+                "method": self.method,
+                "backend": self.backend,
+                "dim": self.projection.shape[1],
+            },
+            source,
+        )
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def project(self, queries: np.ndarray) -> np.ndarray:
+        """Project unit-length queries (shape: [num_queries, full_dim])."""
+        return normalize_embeddings(np.asarray(queries, np.float32) @ self.projection)
+
+    def search(
+        self, query: np.ndarray, k: int, **search_params
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return self.index.search(self.project(query[None, :])[0], k, **search_params)
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, **search_params
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        return self.index.search_batch(self.project(queries), k, **search_params)
+
+    def search_rows(
+        self,
+        query: np.ndarray,
+        rows: np.ndarray,
+        k: int,
+        chunk_size: int = SEARCH_CHUNK_ROWS,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return self.index.search_rows(
+            self.project(query[None, :])[0], rows, k, chunk_size
+        )
+
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        """Return the reduced vectors of the given rows."""
+        return self.index.reconstruct(rows)
+
+
+VECTOR_INDEX_BACKENDS = {
+    "exact": FlatIndex,
+    "ivf": IVFFlatIndex,
+    "int8": Int8Index,
+    "binary": BinaryIndex,
+}
+
+
+def save_index_params(
+    path: Path, params: Dict[str, Any], source: Optional[str] = None
+) -> None:
+    """Write the params.json of a saved index in one atomic replace."""
+    tmp_path = Path(path) / "params.json.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({**params, "source": source}, file)
+    os.replace(tmp_path, Path(path) / "params.json")
+
+
+def save_vector_index(
+    index: VectorIndex,
+    path: Path,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    source: Optional[str] = None,
+) -> None:
+    """
+    Save a prebuilt index and record the checksum of the embedding index it was built
+    from in its params.json, so `load_vector_index` can tell when it is stale.
+
+    The index is built in a sibling directory that is then renamed into place, since
+    servers may be memory-mapping the files of the index being replaced.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    old_path = path.with_name(f"{path.name}.old")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    index.save(tmp_path, model_name, source)
+    shutil.rmtree(old_path, ignore_errors=True)
+    if path.exists():
+        path.rename(old_path)
+    tmp_path.rename(path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def _prebuilt_index_matches(index_path: Optional[Path], source: Optional[str]) -> bool:
+    """Whether a prebuilt index exists and was built from the `source` embeddings."""
+    if index_path is None or not Path(index_path).exists():
+        return False
+    if source is None:
+        return True
+    params_path = Path(index_path) / "params.json"
+    built_from = (
+        load_json_file(params_path).get("source") if params_path.exists() else None
+    )
+    if built_from != source:
+        logging.warning(
+            f"Prebuilt index {index_path} was built from other embeddings "
+            f"({built_from}, expected {source}); rebuilding it in memory."
+        )
+        return False
+    return True
+
+
+def load_vector_index(
+    backend: str,
+    document_embeddings: np.ndarray,
+    index_path: Optional[Path] = None,
+    dim: Optional[int] = None,
+    projection: str = "pca",
+    source: Optional[str] = None,
+    **build_params,
+) -> VectorIndex:
+    """
+    Open the vector index for a configured backend.
+
+    The exact backend wraps the (normalized) corpus matrix directly. Other backends are
+    loaded from `index_path` when it exists and was built from the `source` embeddings,
+    and otherwise built in memory from the corpus, which can be slow for large catalogs.
+
+    Args:
+        backend (str): Backend name, one of VECTOR_INDEX_BACKENDS.
+        document_embeddings (np.ndarray): Unit-length corpus embeddings.
+        index_path (Path, optional): Location of a prebuilt index.
+        dim (int, optional): Reduce the corpus to this many dimensions with a
+            `ProjectedIndex`; None or the full dimension disables the reduction.
+        projection (str): Projection fitted for `dim`, "pca" or "truncate".
+        source (str, optional): Checksum of the corpus embedding index. A prebuilt
+            index recording a different source is rebuilt; None skips the check.
+        **build_params: Parameters passed to `build` when no prebuilt index exists.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend not in VECTOR_INDEX_BACKENDS:
+        raise ValueError(
+            f"Unknown vector index backend '{backend}'. "
+            f"Expected one of: {', '.join(VECTOR_INDEX_BACKENDS)}"
+        )
+    prebuilt = _prebuilt_index_matches(index_path, source)
+    if dim and dim < document_embeddings.shape[1]:
+        if prebuilt:
+            logging.info(f"Loading {dim}-d {backend} index from {index_path}")
+            return ProjectedIndex.load(index_path)
+        logging.warning(
+            f"No prebuilt {dim}-d {backend} index found; building it in memory."
+        )
+        return ProjectedIndex.build(
+            document_embeddings, dim, projection, backend, **build_params
+        )
+    index_class = VECTOR_INDEX_BACKENDS[backend]
+    if index_class is FlatIndex:
+        return FlatIndex(document_embeddings)
+    if prebuilt:
+        logging.info(f"Loading {backend} index from {index_path}")
+        return index_class.load(index_path)
+    logging.warning(f"No prebuilt {backend} index found; building it in memory.")
+    return index_class.build(document_embeddings, **build_params)
+
+
+class PassageIndex:
+    """
+    Multi-vector index over book descriptions. Each description is embedded as several
+    overlapping passages, stored contiguously per book, and a book scores as its best
+    passage (max-pooling), so a query matching one paragraph of a long description is
+    not diluted by the rest of it.
+
+    Attributes:
+        embeddings (np.ndarray): Unit-length passage embeddings, grouped by book.
+        offsets (np.ndarray): The passages of book i are rows offsets[i]:offsets[i + 1]
+                              (shape: [num_books + 1]).
+        chunk_size (int): Number of passages scored per matrix product.
+        query_block (int): Number of queries pooled at once in batch scoring.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        offsets: np.ndarray,
+        chunk_size: int = SEARCH_CHUNK_ROWS,
+        query_block: int = 16,
+    ) -> None:
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if offsets[-1] != len(embeddings):
+            raise ValueError(
+                f"Passage offsets end at {offsets[-1]}, "
+                f"but the index has {len(embeddings)} passages."
+            )
+        self.embeddings = embeddings
+        self.offsets = offsets
+        self.chunk_size = chunk_size
+        self.query_block = query_block
+        # reduceat needs non-empty segments: pool only books that have passages.
+        self._books = np.flatnonzero(np.diff(offsets) > 0)
+        self._starts = offsets[self._books]
+
+    @classmethod
+    def load(cls, path: Path) -> "PassageIndex":
+        """
+        Load a passage index with the per-book offsets stored in its file.
+
+        Raises:
+            ValueError: If the file has no offsets or they do not match its rows.
+        """
+        embeddings, header = load_embedding_index(path)
+        offsets = load_embedding_index_offsets(path)
+        if offsets is None:
+            raise ValueError(f"{path} has no passage offsets.")
+        if not header["normalized"]:
+            embeddings = normalize_embeddings(embeddings)
+        return cls(embeddings, offsets)
+
+    @property
+    def num_books(self) -> int:
+        return len(self.offsets) - 1
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def _passage_scores(self, queries: np.ndarray) -> np.ndarray:
+        """Score every passage against each query (shape: [num_queries, passages])."""
+        scores = np.empty((len(queries), len(self.embeddings)), dtype=np.float32)
+        for start in range(0, len(self.embeddings), self.chunk_size):
+            stop = start + self.chunk_size
+            scores[:, start:stop] = queries @ self.embeddings[start:stop].T
+        return scores
+
+    def book_scores_batch(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Max-pooled score of every book for each unit-length query.
+
+        Returns:
+            np.ndarray: Scores (shape: [num_queries, num_books]); -inf for books
+                        without passages.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        scores = np.full((len(queries), self.num_books), -np.inf, dtype=np.float32)
+        if not len(self._books):
+            return scores
+        # A few queries at a time bounds the [queries, passages] working set.
+        for start in range(0, len(queries), self.query_block):
+            block = slice(start, start + self.query_block)
+            scores[block, self._books] = np.maximum.reduceat(
+                self._passage_scores(queries[block]), self._starts, axis=1
+            )
+        return scores
+
+    def book_scores(self, query: np.ndarray) -> np.ndarray:
+        """Max-pooled score of every book for one unit-length query."""
+        return self.book_scores_batch(query[np.newaxis, :])[0]
+
+    def book_scores_rows(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """
+        Max-pooled score of the books `rows` for one unit-length query. Only their
+        passages are scored, so the cost follows the candidate count, not the corpus.
+
+        Returns:
+            np.ndarray: Scores aligned with `rows`; -inf for books without passages.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        scores = np.full(len(rows), -np.inf, dtype=np.float32)
+        counts = self.offsets[rows + 1] - self.offsets[rows]
+        has_passages = counts > 0
+        if not has_passages.any():
+            return scores
+        counts = counts[has_passages]
+        # Gather the candidates' passage rows, then pool each book's contiguous run.
+        segment_starts = np.cumsum(counts) - counts
+        passage_rows = np.arange(counts.sum()) + np.repeat(
+            self.offsets[rows[has_passages]] - segment_starts, counts
+        )
+        passage_scores = self.embeddings[passage_rows] @ np.asarray(
+            query, dtype=np.float32
+        )
+        scores[has_passages] = np.maximum.reduceat(passage_scores, segment_starts)
+        return scores
+
+
+class FieldIndex:
+    """
+    Per-field embeddings (title, author, subjects) scored together with the whole-book
+    embedding. The field matrices are stacked, so scoring a chunk of books is one
+    matrix product for all fields, and the field similarities are combined with
+    per-request weights without re-encoding the query per field:
+
+        score = (w_book * book + sum_f w_f * field_f) / (w_book + sum_f w_f)
+
+    where f runs over the fields a book has, so a book missing a field is not scored
+    as if that field were dissimilar. The search engine rescores the candidates of the
+    configured vector index with it rather than scanning the whole corpus; with a
+    passage index, `book` is the better of the whole-book and best-passage cosine.
+
+    Attributes:
+        embeddings (np.ndarray): Unit-length field embeddings
+                                 (shape: [num_fields, num_books, dim]).
+        book_embeddings (np.ndarray): Unit-length whole-book embeddings.
+        present (np.ndarray): False where a book's field is empty
+                              (shape: [num_fields, num_books]).
+        fields (tuple): Field names in block order.
+        chunk_size (int): Number of books scored per matrix product.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        book_embeddings: np.ndarray,
+        present: Optional[np.ndarray] = None,
+        fields: tuple = EMBEDDING_FIELDS,
+        chunk_size: int = SEARCH_CHUNK_ROWS,
+    ) -> None:
+        num_books = len(book_embeddings)
+        if len(embeddings) != len(fields) * num_books:
+            raise ValueError(
+                f"Field index has {len(embeddings)} rows; expected {len(fields)} "
+                f"fields x {num_books} books."
+            )
+        self.embeddings = embeddings.reshape(len(fields), num_books, -1)
+        self.book_embeddings = book_embeddings
+        self.present = (
+            np.ones((len(fields), num_books), dtype=bool)
+            if present is None
+            else np.asarray(present, dtype=bool).reshape(len(fields), num_books)
+        )
+        self.fields = tuple(fields)
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def load(cls, path: Path, book_embeddings: np.ndarray) -> "FieldIndex":
+        """Load a field index, masking the rows of empty fields by their content key."""
+        embeddings, header = load_embedding_index(path)
+        if not header["normalized"]:
+            embeddings = normalize_embeddings(embeddings)
+        empty_key = content_hashes(header["model_name"], [""])[0]
+        return cls(embeddings, book_embeddings, np.load(keys_path(path)) != empty_key)
+
+    def __len__(self) -> int:
+        return len(self.book_embeddings)
+
+    def weight_vector(self, weights: Dict[str, float]) -> np.ndarray:
+        """
+        Normalized weights in (book, *fields) order.
+
+        Raises:
+            ValueError: If a weight names an unknown field, or all weights are zero.
+        """
+        unknown = set(weights) - {"book", *self.fields}
+        if unknown:
+            raise ValueError(f"Unknown field weights: {sorted(unknown)}")
+        vector = np.array(
+            [weights.get(name, 0.0) for name in ("book", *self.fields)],
+            dtype=np.float32,
+        )
+        if (vector < 0).any() or vector.sum() <= 0:
+            raise ValueError("Field weights must be non-negative and not all zero.")
+        return vector / vector.sum()
+
+    def _score_block(
+        self,
+        queries: np.ndarray,
+        weights: np.ndarray,
+        rows,
+        passage_scores: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Fused scores of the given rows (a slice or row indices) per query. The book
+        similarity is raised to `passage_scores` ([num_queries, rows]) where higher.
+        """
+        fields = self.embeddings[:, rows]
+        num_fields, num_rows, dim = fields.shape
+        field_scores = (fields.reshape(-1, dim) @ queries.T).reshape(
+            num_fields, num_rows, len(queries)
+        )
+        present = self.present[:, rows]
+        field_scores *= present[:, :, np.newaxis]
+        scores = np.einsum("f,fcq->qc", weights[1:], field_scores)
+        if weights[0]:
+            book_scores = queries @ self.book_embeddings[rows].T
+            if passage_scores is not None:
+                book_scores = np.maximum(book_scores, passage_scores)
+            scores += weights[0] * book_scores
+        # Renormalize per book over the weights of the fields it has.
+        totals = weights[0] + weights[1:] @ present
+        return scores / np.maximum(totals, 1e-12)
+
+    def scores_batch(
+        self,
+        queries: np.ndarray,
+        weights: Dict[str, float],
+        rows: Optional[np.ndarray] = None,
+        passage_scores: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Weighted fused score of every book (or of `rows`) for each unit-length query,
+        optionally with max-pooled passage scores aligned with them.
+
+        Returns:
+            np.ndarray: Scores (shape: [num_queries, num_books or len(rows)]).
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        weight_vector = self.weight_vector(weights)
+        num_rows = len(self) if rows is None else len(rows)
+        scores = np.empty((len(queries), num_rows), dtype=np.float32)
+        for start in range(0, num_rows, self.chunk_size):
+            stop = start + self.chunk_size
+            block = slice(start, stop) if rows is None else rows[start:stop]
+            scores[:, start:stop] = self._score_block(
+                queries,
+                weight_vector,
+                block,
+                None if passage_scores is None else passage_scores[:, start:stop],
+            )
+        return scores
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        weights: Dict[str, float],
+        rows: Optional[np.ndarray] = None,
+        passage_scores: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k books by fused score, optionally restricted to `rows` and with their
+        max-pooled `passage_scores`.
+        """
+        scores = self.scores_batch(
+            query[np.newaxis, :],
+            weights,
+            rows,
+            None if passage_scores is None else passage_scores[np.newaxis, :],
+        )[0]
+        top = select_top_k(scores, k)
+        return (top if rows is None else rows[top]), scores[top]
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, weights: Dict[str, float]
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Top-k books by fused score for each query."""
+        scores = self.scores_batch(queries, weights)
+        top = select_top_k_rows(scores, k)
+        return list(zip(top, np.take_along_axis(scores, top, axis=1)))
+
+
+class SearchEngine:
+    """
+    Cosine-similarity search over a book corpus, built once at startup.
+
+    The corpus is L2-normalized a single time when the engine is created, so each query
+    only costs scoring against a `VectorIndex` plus a partial top-k selection. The index
+    backend (exact scan or approximate IVF) is interchangeable.
+
+    With a lexical index, queries that pass their text run hybrid retrieval: the vector
+    and BM25 rankings are fused with reciprocal rank fusion, so exact title and author
+    matches surface at small k.
+
+    Attributes:
+        index (VectorIndex): Nearest-neighbour index over the unit-length corpus.
+        books_metadata (list): Book metadata dictionaries aligned with the index rows.
+        metadata_index (MetadataIndex): Inverted indexes for year/subject/author filters.
+        lexical_index (BM25Index, optional): Keyword index for hybrid retrieval.
+        hybrid_candidates (int): Depth of each ranking fed into the fusion.
+        rrf_k (int): Reciprocal rank fusion constant; larger flattens rank differences.
+        version (str): Identifies the corpus snapshot the engine was built from.
+        embeddings (np.ndarray, optional): The unit-length corpus matrix, when known.
+        passage_index (PassageIndex, optional): Description passages; when present,
+            the vector index's candidates also score as their best-matching passage.
+        field_index (FieldIndex, optional): Per-field embeddings; when present, the
+            vector index's candidates are rescored as the weighted sum of their
+            whole-book and field similarities.
+        field_candidates (int): Candidates of the vector index rescored per query.
+        passage_candidates (int): Candidates of the vector index whose passages are
+            scored per query.
+        field_weights (dict, optional): Default weights of "book" and each field.
+        themes (ThemeCatalog, optional): Browse-by-theme clusters of this corpus.
+        knn_graph (KnnGraph, optional): Precomputed neighbours of every book.
+        suggest_index (SuggestIndex, optional): Typeahead prefix index of this corpus.
+    """
+
+    def __init__(
+        self,
+        index: VectorIndex,
+        books_metadata: List[Dict[str, Any]],
+        metadata_index: Optional[MetadataIndex] = None,
+        lexical_index: Optional[BM25Index] = None,
+        hybrid_candidates: int = 50,
+        rrf_k: int = 60,
+        version: str = "unversioned",
+        embeddings: Optional[np.ndarray] = None,
+        passage_index: Optional[PassageIndex] = None,
+        field_index: Optional[FieldIndex] = None,
+        field_weights: Optional[Dict[str, float]] = None,
+        themes: Optional[ThemeCatalog] = None,
+        knn_graph: Optional[KnnGraph] = None,
+        suggest_index: Optional[SuggestIndex] = None,
+        field_candidates: int = 100,
+        passage_candidates: int = 100,
+    ) -> None:
+        if len(index) != len(books_metadata):
+            raise ValueError(
+                f"Embedding rows ({len(index)}) do not match "
+                f"metadata records ({len(books_metadata)})."
+            )
+        self.index = index
+        self.books_metadata = books_metadata
+        self.metadata_index = metadata_index or MetadataIndex.build(books_metadata)
+        self.lexical_index = lexical_index
+        self.hybrid_candidates = hybrid_candidates
+        self.rrf_k = rrf_k
+        self.version = version
+        self.embeddings = embeddings
+        self.passage_index = passage_index
+        self.field_index = field_index
+        self.field_weights = field_weights or {"book": 1.0}
+        self.themes = themes
+        self.knn_graph = knn_graph
+        self.suggest_index = suggest_index
+        self.field_candidates = field_candidates
+        self.passage_candidates = passage_candidates
+
+    @classmethod
+    def from_embeddings(
+        cls,
+        document_embeddings: np.ndarray,
+        books_metadata: List[Dict[str, Any]],
+        normalized: bool = False,
+        chunk_size: int = SEARCH_CHUNK_ROWS,
+    ) -> "SearchEngine":
+        """
+        Build an engine with an exact index over a corpus matrix.
+
+        Args:
+            document_embeddings (np.ndarray): Corpus embeddings (shape: [num_books, dim]).
+            books_metadata (list): Book metadata dictionaries aligned with the embedding rows.
+            normalized (bool): Use the rows in place when they are already unit length,
+                               which keeps a memory-mapped index on disk.
+            chunk_size (int): Number of rows scored per matrix-vector product.
+        """
+        embeddings = (
+            document_embeddings
+            if normalized
+            else normalize_embeddings(document_embeddings)
+        )
+        return cls(
+            FlatIndex(embeddings, chunk_size), books_metadata, embeddings=embeddings
+        )
+
+    def __len__(self) -> int:
+        return len(self.books_metadata)
+
+    def resolve_field_weights(
+        self, field_weights: Optional[Dict[str, float]] = None
+    ) -> Dict[str, float]:
+        """
+        Merge per-request field weights over the engine defaults.
+
+        Raises:
+            ValueError: If the merged weights are unusable (see `FieldIndex`).
+        """
+        weights = {**self.field_weights, **(field_weights or {})}
+        if self.field_index is not None:
+            self.field_index.weight_vector(weights)
+        return weights
+
+    def candidate_depth(self, depth: int) -> int:
+        """Rows to fetch from the vector index for a final ranking of `depth` rows."""
+        if self.field_index is not None:
+            depth = max(depth, self.field_candidates)
+        if self.passage_index is not None:
+            depth = max(depth, self.passage_candidates)
+        return depth
+
+    def rescore_candidates(
+        self,
+        query: np.ndarray,
+        depth: int,
+        vector_rows: np.ndarray,
+        vector_scores: np.ndarray,
+        field_weights: Optional[Dict[str, float]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rescore the vector index's candidates and keep the best `depth`. With a passage
+        index a book's cosine is raised to its best passage's (only the candidates'
+        passages are scored); with a field index that cosine is then fused with the
+        field similarities, so both combine scores on the same cosine scale.
+        """
+        if self.passage_index is None and self.field_index is None:
+            return vector_rows, vector_scores
+        passage_scores = (
+            self.passage_index.book_scores_rows(query, vector_rows)
+            if self.passage_index is not None
+            else None
+        )
+        if self.field_index is not None:
+            return self.field_index.search(
+                query,
+                depth,
+                self.resolve_field_weights(field_weights),
+                vector_rows,
+                passage_scores,
+            )
+        scores = np.maximum(vector_scores, passage_scores)
+        top = select_top_k(scores, depth)
+        return vector_rows[top], scores[top]
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        query_text: Optional[str] = None,
+        field_weights: Optional[Dict[str, float]] = None,
+        **search_params,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k most similar rows for a query.
+
+        Args:
+            query_embedding (np.ndarray): Query vector (shape: [dim] or [1, dim]).
+            k (int): Number of rows to return.
+            filters (dict, optional): Metadata filters (`year_min`, `year_max`,
+                `subjects`, `author`). Only matching rows are scored.
+            query_text (str, optional): Raw query text; enables hybrid retrieval when
+                the engine has a lexical index.
+            field_weights (dict, optional): Overrides of the default "book" and field
+                weights, used when the engine has a field index.
+            **search_params: Backend recall knobs, e.g. `nprobe` for the IVF index.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row indices and their scores, best first.
+                Hybrid results carry reciprocal-rank-fusion scores instead of cosine.
+        """
+        query = normalize_embeddings(query_embedding)[0]
+        rows = self.metadata_index.filter_rows(**filters) if filters else None
+        hybrid = self.lexical_index is not None and bool(query_text)
+        depth = max(k, self.hybrid_candidates) if hybrid else k
+        candidates = self.candidate_depth(depth)
+
+        if rows is not None:
+            vector_rows, vector_scores = self.index.search_rows(query, rows, candidates)
+        else:
+            vector_rows, vector_scores = self.index.search(
+                query, candidates, **search_params
+            )
+        vector_rows, vector_scores = self.rescore_candidates(
+            query, depth, vector_rows, vector_scores, field_weights
+        )
+        if not hybrid:
+            return vector_rows, vector_scores
+
+        lexical_rows, _ = self.lexical_index.search(query_text, depth, rows=rows)
+        return reciprocal_rank_fusion([vector_rows, lexical_rows], k, self.rrf_k)
+
+    def search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        k: int = 5,
+        query_texts: Optional[List[str]] = None,
+        field_weights: Optional[Dict[str, float]] = None,
+        **search_params,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Find the k most similar rows for many queries in one pass over the index.
+
+        Args:
+            query_embeddings (np.ndarray): Query vectors (shape: [num_queries, dim]).
+            k (int): Number of rows to return per query.
+            query_texts (List[str], optional): Raw query texts, aligned with the
+                embeddings; enables hybrid retrieval when the engine has a lexical index.
+            field_weights (dict, optional): Overrides of the default field weights.
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: Row indices and scores per query.
+        """
+        queries = normalize_embeddings(query_embeddings)
+        hybrid = self.lexical_index is not None and query_texts is not None
+        depth = max(k, self.hybrid_candidates) if hybrid else k
+        results = [
+            self.rescore_candidates(
+                query, depth, vector_rows, vector_scores, field_weights
+            )
+            for query, (vector_rows, vector_scores) in zip(
+                queries,
+                self.index.search_batch(
+                    queries, self.candidate_depth(depth), **search_params
+                ),
+            )
+        ]
+        if not hybrid:
+            return results
+        return [
+            (
+                reciprocal_rank_fusion(
+                    [vector_rows, self.lexical_index.search(text, depth)[0]],
+                    k,
+                    self.rrf_k,
+                )
+                if text
+                else (vector_rows[:k], vector_scores[:k])
+            )
+            for (vector_rows, vector_scores), text in zip(results, query_texts)
+        ]
+
+    def top_k_books(
+        self,
+        query_embedding: np.ndarray,
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        query_text: Optional[str] = None,
+        field_weights: Optional[Dict[str, float]] = None,
+        **search_params,
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Retrieve the top-k books for a query together with their similarity scores.
+
+        Returns:
+            list: (book metadata, score) pairs in descending score order.
+        """
+        top_indices, top_scores = self.search(
+            query_embedding, k, filters, query_text, field_weights, **search_params
+        )
+        return [
+            (self.books_metadata[i], float(score))
+            for i, score in zip(top_indices, top_scores)
+        ]
+
+    def top_k_books_batch(
+        self,
+        query_embeddings: np.ndarray,
+        k: int = 5,
+        query_texts: Optional[List[str]] = None,
+        field_weights: Optional[Dict[str, float]] = None,
+        **search_params,
+    ) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """
+        Retrieve the top-k books for many queries at once.
+
+        Returns:
+            list: Per query, (book metadata, score) pairs in descending score order.
+        """
+        return [
+            [(self.books_metadata[i], float(score)) for i, score in zip(rows, scores)]
+            for rows, scores in self.search_batch(
+                query_embeddings, k, query_texts, field_weights, **search_params
+            )
+        ]
+
+
+def convert_json_embeddings(
+    json_filepath: Path, index_filepath: Path, model_name: str
+) -> Dict[str, Any]:
+    """
+    One-shot conversion of the legacy JSON embeddings file into a binary embedding index.
+
+    Rows are L2-normalized before they are written, so the server can memory-map the
+    index and search it without making a normalized copy.
+
+    Returns:
+        Dict[str, Any]: The header of the new index.
+    """
+    embeddings = load_book_embeddings(json_filepath)
+    if embeddings is None:
+        raise ValueError(f"Could not read embeddings from {json_filepath}")
+    return save_embedding_index(
+        normalize_embeddings(embeddings), index_filepath, model_name, normalized=True
+    )
+
+
 def main():
     """
     Main function to load data, compute similarities, and display top related books.
     """
     # Initialize the SentenceTransformer model
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
 
     device = "cpu" if not torch.cuda.is_available() else "cuda"
 
-    # Load book embeddings and metadata
-    book_embeddings = load_book_embeddings(BOOK_EMBEDDINGS_FILE)
     book_metadata = load_book_metadata(BOOK_METADATA_FILE)
 
-    #  Explicitly check if book_embeddings is empty
-    if book_embeddings is not None and book_embeddings.size > 0:
-        logging.info("Loaded book embeddings...")
-
-    else:
-        logging.info("Cannot load book embeddings, generating new vectors...")
-
-        logging.info("Encoding book embeddings for corpus...")
-        book_embeddings = create_book_embeddings(model, book_metadata, device)
-
-        print("Book embeddings:", book_embeddings)
-        print("Book embeddings shape:", book_embeddings.shape)
-        print("Book embeddings type:", type(book_embeddings))
+    # Convert a legacy JSON embeddings file into the binary index once.
+    if not BOOK_INDEX_FILE.exists() and BOOK_EMBEDDINGS_FILE.exists():
+        logging.info("Converting JSON embeddings into a binary embedding index...")
+        convert_json_embeddings(
+            BOOK_EMBEDDINGS_FILE, BOOK_INDEX_FILE, EMBEDDING_MODEL_NAME
+        )
 
-        logging.info("Saving book embeddings...")
-        save_book_embeddings(book_embeddings, BOOK_EMBEDDINGS_FILE)
+    # Re-encode only new or changed books; unchanged rows are reused from the index.
+    logging.info("Refreshing book embeddings for corpus...")
+    refresh_book_embeddings(
+        model,
+        [book["embedding_input"] for book in book_metadata],
+        BOOK_INDEX_FILE,
+        model_name=EMBEDDING_MODEL_NAME,
+        device=device,
+    )
+    book_embeddings, header = load_embedding_index(BOOK_INDEX_FILE, verify=True)
+    normalized = header["normalized"]
+    logging.info(f"Book embeddings shape: {book_embeddings.shape}")
 
     # Define the search query
     search_query = "I am looking for a book that contains information about maximizing my potential and doubling my income by learning valuable skills"
@@ -128,16 +1752,42 @@ def main():
     # Encode search query iinto vector embedding
     query_embedding = create_vector_embedding(model, search_query, device)
 
-    # Compute similarity scores between query and document embeddings
-    similarity_tensor = calculate_similarity_scores(query_embedding, book_embeddings)
-    logging.info(f"Similarity tensor: {similarity_tensor}")
+    # Build the configured vector index over the normalized corpus
+    if not normalized:
+        book_embeddings = normalize_embeddings(book_embeddings)
+    if VECTOR_INDEX_DIM:
+        logging.info(
+            f"Building {VECTOR_INDEX_DIM}-d {VECTOR_INDEX_BACKEND} index "
+            f"({VECTOR_INDEX_PROJECTION})..."
+        )
+        index = ProjectedIndex.build(
+            book_embeddings,
+            VECTOR_INDEX_DIM,
+            VECTOR_INDEX_PROJECTION,
+            VECTOR_INDEX_BACKEND,
+            **VECTOR_INDEX_PARAMS.get(VECTOR_INDEX_BACKEND, {}),
+        )
+        save_vector_index(
+            index, VECTOR_INDEX_DIR, EMBEDDING_MODEL_NAME, header["checksum"]
+        )
+    elif VECTOR_INDEX_BACKEND == "exact":
+        index = FlatIndex.build(book_embeddings)
+    else:
+        logging.info(f"Building {VECTOR_INDEX_BACKEND} index...")
+        index = VECTOR_INDEX_BACKENDS[VECTOR_INDEX_BACKEND].build(
+            book_embeddings, **VECTOR_INDEX_PARAMS.get(VECTOR_INDEX_BACKEND, {})
+        )
+        save_vector_index(
+            index, VECTOR_INDEX_DIR, EMBEDDING_MODEL_NAME, header["checksum"]
+        )
 
-    # Retrieve and display the top related books
-    top_books = get_top_k_books(similarity_tensor, book_metadata, k=5)
+    # Score the query against the index and retrieve the top related books
+    search_engine = SearchEngine(index, book_metadata)
+    top_books = search_engine.top_k_books(query_embedding, k=5)
     logging.info("Top related books:")
 
-    for idx, book in enumerate(top_books, start=1):
-        logging.info(f"{idx}. {book['title']} by {book['author']}")
+    for idx, (book, score) in enumerate(top_books, start=1):
+        logging.info(f"{idx}. {book['title']} by {book['author']} ({score:.4f})")
 
 
 if __name__ == "__main__":
@@ -150,14 +1800,14 @@ if __name__ == "__main__":
     BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
     # Construct file paths relative to the base directory.
-    BOOK_EMBEDDINGS_FILE = (
-        BASE_DIR / "app" / "data" / "book_metadata" / "book_embeddings.json"
-    )
-    BOOK_METADATA_FILE = (
-        BASE_DIR / "app" / "data" / "book_metadata" / "book_metadata.json"
-    )
+    DATA_DIR = BASE_DIR / "app" / "data" / "book_metadata"
+    BOOK_EMBEDDINGS_FILE = DATA_DIR / "book_embeddings.json"
+    BOOK_INDEX_FILE = DATA_DIR / "book_embeddings.bin"
+    BOOK_METADATA_FILE = DATA_DIR / "book_metadata.json"
+    VECTOR_INDEX_DIR = DATA_DIR / VECTOR_INDEX_DIR.name
 
     print(f"Embeddings file path: {BOOK_EMBEDDINGS_FILE}")
+    logging.info(f"Embedding index file path: {BOOK_INDEX_FILE}")
     print(f"Book metadata file path: {BOOK_METADATA_FILE}")
 
     main()
@@ -0,0 +1,315 @@
+"""
+Module: sharding.py
+Description: Sharded vector search with scatter-gather top-k merging.
+
+             The corpus rows are split into contiguous shards, one per entry of the
+             configured shard layout (`SEARCH_SHARDS`):
+               - "local":            a worker process on this host that memory-maps its
+                                     slice of the binary embedding index.
+               - "http://host:port": a remote node serving the slice through
+                                     `POST /shards/search`.
+             Every query is sent to all shards in parallel; each returns its own top-k,
+             and the per-shard lists are merged with a heap.
+
+             With VECTOR_INDEX_DIM set, the projection is fitted once on the full corpus
+             and every shard only applies it to its slice, so all shards score queries
+             in the same reduced space.
+"""
+
+import heapq
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from app.config import (
+    EMBEDDING_MODEL_NAME,
+    VECTOR_INDEX_DIM,
+    VECTOR_INDEX_PARAMS,
+    VECTOR_INDEX_PROJECTION,
+)
+from app.pipelines.load import load_embedding_index
+from app.services.semantic_search import (
+    ProjectedIndex,
+    VectorIndex,
+    fit_projection,
+    load_vector_index,
+    normalize_embeddings,
+    project_embeddings,
+)
+
+# Vector index of the shard served by the current worker process.
+_shard_index: Optional[VectorIndex] = None
+
+
+def shard_bounds(num_rows: int, num_shards: int) -> np.ndarray:
+    """Row boundaries of `num_shards` contiguous, near-equal shards ([num_shards + 1])."""
+    return np.linspace(0, num_rows, num_shards + 1).astype(np.int64)
+
+
+def shard_backend_params(backend: str) -> Dict[str, Any]:
+    """
+    Build parameters of the configured backend for one shard. Local shard workers and
+    remote /shards/search nodes both use them, so every shard is indexed alike.
+    """
+    return dict(VECTOR_INDEX_PARAMS.get(backend, {}))
+
+
+def fit_shard_projection(embeddings: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Fit the configured projection on the full corpus, or None when the index keeps the
+    full dimension. The fit is deterministic, so every node holding the same corpus
+    derives the same matrix.
+    """
+    if not VECTOR_INDEX_DIM or VECTOR_INDEX_DIM >= embeddings.shape[1]:
+        return None
+    return fit_projection(embeddings, VECTOR_INDEX_DIM, VECTOR_INDEX_PROJECTION)
+
+
+def build_shard_index(
+    backend: str,
+    shard: np.ndarray,
+    projection: Optional[np.ndarray] = None,
+    **params,
+) -> VectorIndex:
+    """Index one shard's unit-length rows, reduced with the corpus-wide `projection`."""
+    if projection is None:
+        return load_vector_index(backend, shard, **params)
+    index = load_vector_index(backend, project_embeddings(shard, projection), **params)
+    return ProjectedIndex(projection, index, VECTOR_INDEX_PROJECTION, backend)
+
+
+def _init_shard_worker(
+    index_path: str,
+    start: int,
+    stop: int,
+    backend: str,
+    params: Dict[str, Any],
+    projection: Optional[np.ndarray],
+) -> None:
+    """Worker initializer: open this shard's rows of the index and build its backend."""
+    global _shard_index
+    embeddings, header = load_embedding_index(Path(index_path))
+    shard = embeddings[start:stop]
+    if not header["normalized"]:
+        shard = normalize_embeddings(shard)
+    _shard_index = build_shard_index(backend, shard, projection, **params)
+
+
+def _search_shard(queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Search the worker's shard; row ids are relative to the shard."""
+    return _shard_index.search_batch(queries, k)
+
+
+def merge_shard_results(
+    shard_results: List[Tuple[np.ndarray, np.ndarray]], k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge per-shard top-k lists (global row ids, scores best first) into a global
+    top-k with a heap.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Row ids and scores, best first.
+    """
+    best = heapq.nlargest(
+        k,
+        (
+            (float(score), int(row))
+            for rows, scores in shard_results
+            for row, score in zip(rows, scores)
+        ),
+    )
+    return (
+        np.array([row for _, row in best], dtype=np.int64),
+        np.array([score for score, _ in best], dtype=np.float32),
+    )
+
+
+class ShardedIndex(VectorIndex):
+    """
+    Scatter-gather index over shards of a binary embedding index.
+
+    Each local shard runs in its own single-process executor, so shards are scored in
+    parallel on separate cores and concurrent queries queue per shard. Remote shards are
+    called over HTTP from a thread pool. A shard that fails or times out is logged and
+    left out of the merge, so results degrade instead of failing; such responses are
+    counted in `degraded_responses`. Local workers start on first use, so call
+    `warm_up` before serving to keep their cold start out of the query timeout.
+
+    Attributes:
+        embeddings (np.ndarray): Full corpus matrix, used for `reconstruct`.
+        shards (List[str]): Shard layout, "local" or a remote base URL per shard.
+        bounds (np.ndarray): Row boundaries of the shards.
+        timeout (float): Seconds to wait for all shards to answer.
+        token (str): Sent to remote shards in the X-Shard-Token header.
+        projection (np.ndarray, optional): Projection fitted on the full corpus (see
+            `fit_shard_projection`), applied by every local shard worker.
+        degraded_responses (int): Searches merged without every shard's results.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        index_path: Path,
+        shards: List[str],
+        backend: str = "exact",
+        backend_params: Optional[Dict[str, Any]] = None,
+        timeout: float = 5.0,
+        token: str = "",
+        projection: Optional[np.ndarray] = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self.shards = list(shards)
+        self.bounds = shard_bounds(len(embeddings), len(self.shards))
+        self.timeout = timeout
+        self.degraded_responses = 0
+        self._executors: List[Any] = []
+        self._http = None
+
+        context = multiprocessing.get_context("spawn")
+        for shard, (start, stop) in enumerate(zip(self.bounds[:-1], self.bounds[1:])):
+            if self.shards[shard] == "local":
+                self._executors.append(
+                    ProcessPoolExecutor(
+                        max_workers=1,
+                        mp_context=context,
+                        initializer=_init_shard_worker,
+                        initargs=(
+                            str(index_path),
+                            int(start),
+                            int(stop),
+                            backend,
+                            backend_params or {},
+                            projection,
+                        ),
+                    )
+                )
+            else:
+                if self._http is None:
+                    self._http = httpx.Client(
+                        timeout=timeout,
+                        headers={"X-Shard-Token": token} if token else None,
+                    )
+                self._executors.append(ThreadPoolExecutor(max_workers=4))
+        logging.info(
+            f"Serving {len(self.embeddings)} rows from {len(self.shards)} shards: "
+            f"{', '.join(self.shards)}"
+        )
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, **params) -> "ShardedIndex":
+        return cls(embeddings, **params)
+
+    @classmethod
+    def load(cls, path: Path, **params) -> "ShardedIndex":
+        embeddings, _ = load_embedding_index(path)
+        return cls(embeddings, index_path=path, **params)
+
+    def save(
+        self,
+        path: Path,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        source: Optional[str] = None,
+    ) -> None:
+        """Nothing to save: shards are served from the binary embedding index."""
+        logging.info(
+            "Sharded index is served from the binary embedding index; not saving it."
+        )
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def warm_up(self) -> None:
+        """
+        Start every local shard worker and run a no-op search on it, waiting as long as
+        it takes: spawning the process, mapping the shard and building its backend all
+        happen here instead of inside the first queries' timeout. Raises if a worker
+        fails to start.
+        """
+        query = np.zeros((1, self.embeddings.shape[1]), dtype=np.float32)
+        futures = [
+            executor.submit(_search_shard, query, 1)
+            for shard, executor in enumerate(self._executors)
+            if self.shards[shard] == "local"
+        ]
+        for future in futures:
+            future.result()
+
+    def _search_remote(
+        self, base_url: str, start: int, stop: int, queries: np.ndarray, k: int
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        response = self._http.post(
+            f"{base_url.rstrip('/')}/shards/search",
+            json={
+                "start": start,
+                "stop": stop,
+                "queries": queries.tolist(),
+                "k": k,
+            },
+        )
+        response.raise_for_status()
+        return [
+            (np.asarray(result["rows"]), np.asarray(result["scores"], np.float32))
+            for result in response.json()["results"]
+        ]
+
+    def _scatter(self, queries: np.ndarray, k: int) -> List[Future]:
+        futures = []
+        for shard, executor in enumerate(self._executors):
+            start, stop = int(self.bounds[shard]), int(self.bounds[shard + 1])
+            if self.shards[shard] == "local":
+                futures.append(executor.submit(_search_shard, queries, k))
+            else:
+                futures.append(
+                    executor.submit(
+                        self._search_remote, self.shards[shard], start, stop, queries, k
+                    )
+                )
+        return futures
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, **search_params
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        queries = np.asarray(queries, dtype=np.float32)
+        futures = self._scatter(queries, k)
+        wait(futures, timeout=self.timeout)
+
+        # Gather: shift shard-relative rows to corpus rows, then heap-merge per query.
+        per_query: List[List[Tuple[np.ndarray, np.ndarray]]] = [[] for _ in queries]
+        failed = 0
+        for shard, future in enumerate(futures):
+            if not future.done() or future.exception() is not None:
+                error = future.exception() if future.done() else "timed out"
+                logging.warning(f"Shard {shard} ({self.shards[shard]}) failed: {error}")
+                # Only drops a search still queued; one already running finishes.
+                future.cancel()
+                failed += 1
+                continue
+            for query, (rows, scores) in enumerate(future.result()):
+                per_query[query].append((rows + self.bounds[shard], scores))
+        if failed:
+            self.degraded_responses += 1
+            logging.warning(
+                f"Degraded search: {len(futures) - failed} of {len(futures)} shards "
+                "answered."
+            )
+        return [merge_shard_results(results, k) for results in per_query]
+
+    def search(
+        self, query: np.ndarray, k: int, **search_params
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return self.search_batch(np.asarray(query)[None, :], k)[0]
+
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.embeddings[rows], dtype=np.float32)
+
+    def close(self) -> None:
+        """Shut down the shard workers and the HTTP client."""
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self._http is not None:
+            self._http.close()
@@ -0,0 +1,149 @@
+"""
+Module: shared_corpus.py
+Description: Shares one read-only copy of the corpus between all workers on a host.
+
+             The first worker to start publishes the normalized embedding matrix (as a
+             binary embedding index) and a compact metadata blob into a shared
+             directory, ideally on tmpfs such as /dev/shm. Publishing happens under a
+             file lock, so the other workers wait and then find the published version
+             already in place. Every worker memory-maps both files read-only, so the
+             pages are shared through the page cache and each extra worker adds almost
+             no resident memory for the corpus.
+
+             Metadata blob layout (little-endian):
+               bytes 0-7     magic b"LEXIMETA"
+               bytes 8-15    number of records n (uint64)
+               bytes 16-...  record offsets (int64, [n + 1]), relative to the payload
+               then          payload: the UTF-8 JSON encoding of each record
+"""
+
+import os
+import json
+import fcntl
+import struct
+import logging
+from pathlib import Path
+from collections.abc import Sequence
+from typing import List, Dict, Any, Callable, Tuple, Union
+
+import numpy as np
+
+from app.pipelines.load import load_embedding_index, save_embedding_index
+
+SHARED_METADATA_MAGIC = b"LEXIMETA"
+_METADATA_PREAMBLE = struct.Struct("<8sQ")
+
+SHARED_EMBEDDINGS_NAME = "book_embeddings.bin"
+SHARED_METADATA_NAME = "book_metadata.bin"
+SHARED_VERSION_NAME = "VERSION"
+SHARED_LOCK_NAME = "publish.lock"
+
+
+def save_metadata_blob(books_metadata: List[Dict[str, Any]], filepath: Path) -> None:
+    """Encode metadata records as offsets plus concatenated JSON (see module docs)."""
+    records = [
+        json.dumps(book, separators=(",", ":")).encode("utf-8")
+        for book in books_metadata
+    ]
+    offsets = np.zeros(len(records) + 1, dtype="<i8")
+    np.cumsum([len(record) for record in records], out=offsets[1:])
+    with open(filepath, "wb") as file:
+        file.write(_METADATA_PREAMBLE.pack(SHARED_METADATA_MAGIC, len(records)))
+        file.write(offsets.tobytes())
+        for record in records:
+            file.write(record)
+
+
+class SharedMetadata(Sequence):
+    """
+    Read-only, list-like view of a metadata blob. Records are decoded on access, so
+    only the rows a request actually returns are ever turned into dictionaries.
+    """
+
+    def __init__(self, filepath: Path) -> None:
+        self.filepath = Path(filepath)
+        data = np.memmap(self.filepath, dtype=np.uint8, mode="r")
+        magic, count = _METADATA_PREAMBLE.unpack(
+            data[: _METADATA_PREAMBLE.size].tobytes()
+        )
+        if magic != SHARED_METADATA_MAGIC:
+            raise ValueError(f"{filepath} is not a shared metadata blob.")
+        start = _METADATA_PREAMBLE.size
+        payload_start = start + (count + 1) * 8
+        self._offsets = data[start:payload_start].view("<i8")
+        self._payload = data[payload_start:]
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(
+        self, row: Union[int, slice]
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        row = int(row)
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("metadata row out of range")
+        start, stop = self._offsets[row], self._offsets[row + 1]
+        return json.loads(self._payload[start:stop].tobytes())
+
+
+def open_shared_corpus(
+    directory: Path,
+    version: str,
+    load_corpus: Callable[[], Tuple[np.ndarray, List[Dict[str, Any]], str]],
+) -> Tuple[np.memmap, SharedMetadata, Path]:
+    """
+    Attach to the shared corpus in `directory`, publishing it first if the directory
+    holds a different corpus version.
+
+    Args:
+        directory (Path): Shared directory, e.g. /dev/shm/lexi-gpt.
+        version (str): Fingerprint of the source corpus files.
+        load_corpus (Callable): Loads the source corpus as (unit-length embeddings,
+                                metadata records, embedding model name). Only called
+                                by the worker that publishes.
+
+    Returns:
+        Tuple[np.memmap, SharedMetadata, Path]: The read-only embedding matrix, the
+        metadata view and the path of the shared binary embedding index.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    embeddings_path = directory / SHARED_EMBEDDINGS_NAME
+    metadata_path = directory / SHARED_METADATA_NAME
+    version_path = directory / SHARED_VERSION_NAME
+
+    with open(directory / SHARED_LOCK_NAME, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            published = version_path.read_text() if version_path.exists() else None
+            if published != version:
+                embeddings, books_metadata, model_name = load_corpus()
+                # Files are replaced rather than rewritten, so workers still serving
+                # the previous version keep their mappings of the old files.
+                save_embedding_index(
+                    embeddings, embeddings_path.with_suffix(".tmp"), model_name, True
+                )
+                os.replace(embeddings_path.with_suffix(".tmp"), embeddings_path)
+                save_metadata_blob(books_metadata, metadata_path.with_suffix(".tmp"))
+                os.replace(metadata_path.with_suffix(".tmp"), metadata_path)
+                version_path.with_suffix(".tmp").write_text(version)
+                os.replace(version_path.with_suffix(".tmp"), version_path)
+                logging.info(
+                    f"Published corpus version {version} ({len(books_metadata)} "
+                    f"books) to {directory}."
+                )
+            # Map the files before releasing the lock, so a worker publishing the next
+            # version cannot swap them in between and leave this one with a mix.
+            embeddings, _ = load_embedding_index(embeddings_path)
+            books_metadata = SharedMetadata(metadata_path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    if len(embeddings) != len(books_metadata):
+        raise ValueError(f"Shared corpus in {directory} is inconsistent.")
+    logging.info(f"Attached to shared corpus version {version} in {directory}.")
+    return embeddings, books_metadata, embeddings_path
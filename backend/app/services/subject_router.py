@@ -0,0 +1,156 @@
+"""
+Module: subject_router.py
+Description: Routes free-text queries to Open Library subjects. The subjects listed in
+             subjects.json are embedded once into a small matrix (built by the embed
+             pipeline, or at startup when missing), so routing a query costs one
+             matrix-vector product over a few hundred rows. The routed subjects then
+             restrict vector search to the books tagged with them, or, when the local
+             corpus holds too few of those books, select live Open Library results.
+"""
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+import numpy as np
+
+from app.clients.open_library_api_client import OpenLibraryAPI
+from app.pipelines.embed import content_hashes, keys_path
+from app.pipelines.load import load_embedding_index, load_json_file
+from app.services.metadata_filter import MetadataIndex
+from app.services.semantic_search import normalize_embeddings, select_top_k
+
+
+def load_subject_names(path: Path) -> List[str]:
+    """The subject names listed in subjects.json."""
+    return list(load_json_file(path).get("subjects", []))
+
+
+class SubjectRouter:
+    """
+    Nearest-subject lookup for query embeddings.
+
+    Attributes:
+        subjects (List[str]): Subject names, aligned with the embedding rows.
+        embeddings (np.ndarray): Unit-length subject embeddings.
+        top_n (int): Maximum subjects a query is routed to.
+        min_score (float): Minimum similarity of a routed subject; queries matching no
+                           subject that closely search the whole corpus.
+    """
+
+    def __init__(
+        self,
+        subjects: List[str],
+        embeddings: np.ndarray,
+        top_n: int = 3,
+        min_score: float = 0.4,
+    ) -> None:
+        if len(subjects) != len(embeddings):
+            raise ValueError(
+                f"{len(subjects)} subjects but {len(embeddings)} subject embeddings."
+            )
+        self.subjects = list(subjects)
+        self.embeddings = normalize_embeddings(embeddings)
+        self.top_n = top_n
+        self.min_score = min_score
+
+    @classmethod
+    def load(cls, path: Path, subjects: List[str], **params) -> "SubjectRouter":
+        """
+        Load the subject matrix written by the embed pipeline.
+
+        Raises:
+            ValueError: If the matrix was built from a different subject list.
+        """
+        embeddings, header = load_embedding_index(path)
+        expected = content_hashes(header["model_name"], [s.lower() for s in subjects])
+        if not np.array_equal(np.load(keys_path(path)), expected):
+            raise ValueError(f"{path} does not match the current subject list.")
+        return cls(subjects, np.asarray(embeddings), **params)
+
+    @classmethod
+    def build(
+        cls,
+        subjects: List[str],
+        encode: Callable[[List[str]], np.ndarray],
+        **params,
+    ) -> "SubjectRouter":
+        """Embed the subjects with `encode` (e.g. `create_vector_embeddings`)."""
+        return cls(subjects, encode(subjects), **params)
+
+    def __len__(self) -> int:
+        return len(self.subjects)
+
+    def route(self, query_embedding: np.ndarray) -> List[Tuple[str, float]]:
+        """
+        Up to `top_n` subjects scoring at least `min_score` for a query, best first.
+        """
+        query = normalize_embeddings(query_embedding)[0]
+        scores = self.embeddings @ query
+        return [
+            (self.subjects[row], float(scores[row]))
+            for row in select_top_k(scores, self.top_n)
+            if scores[row] >= self.min_score
+        ]
+
+
+def open_library_book(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an Open Library search result onto the corpus book record fields."""
+    year = doc.get("first_publish_year")
+    return {
+        "book_id": str(doc.get("key", "")).rsplit("/", 1)[-1],
+        "title": doc.get("title", ""),
+        "author": (doc.get("author_name") or [""])[0],
+        "subjects": ", ".join((doc.get("subject") or [])[:10]),
+        "year": str(year) if year is not None else "",
+        "source": "openlibrary",
+    }
+
+
+async def live_subject_books(
+    client: OpenLibraryAPI, subjects: List[str], limit: int, timeout: float = 2.0
+) -> List[Dict[str, Any]]:
+    """
+    Fetch books for the subjects from Open Library. Failures and timeouts return an
+    empty list, so a slow upstream never fails the search.
+    """
+    try:
+        data = await asyncio.wait_for(
+            client.search_subjects(", ".join(subjects)), timeout
+        )
+    except asyncio.TimeoutError:
+        logging.warning(f"Open Library subject search timed out for {subjects}.")
+        return []
+    except Exception as e:
+        logging.warning(f"Open Library subject search failed for {subjects}: {e}")
+        return []
+    return [open_library_book(doc) for doc in data.get("docs", [])[:limit]]
+
+
+def routed_filters(
+    router: Optional[SubjectRouter],
+    metadata_index: MetadataIndex,
+    query_embedding: np.ndarray,
+    filters: Dict[str, Any],
+    min_books: int,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Route a query to its subjects and decide how to use them.
+
+    Queries that already filter by subject are left alone.
+
+    Returns:
+        Tuple[dict, List[str]]: The filters to search with (with the routed subjects
+        added when at least `min_books` books match them and the other filters), and
+        the routed subjects to fetch live instead (empty unless the corpus is thin).
+    """
+    if router is None or filters.get("subjects"):
+        return filters, []
+    subjects = [subject for subject, _ in router.route(query_embedding)]
+    if not subjects:
+        return filters, []
+    routed = {**filters, "subjects": subjects}
+    if len(metadata_index.filter_rows(**routed)) >= min_books:
+        return routed, []
+    return filters, subjects
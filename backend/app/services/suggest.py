@@ -0,0 +1,262 @@
+"""
+Module: suggest.py
+Description: Prefix index behind the /suggest typeahead. Titles, authors and subjects of
+             the corpus are normalized into keys, and every word start of a key is
+             indexed, so "potter" completes "harry potter philosopher stone". The index is
+             a sorted suffix array: each entry stores a key once, and the sorted order is
+             two integer arrays (entry, character offset). A prefix is two binary searches
+             over that order, giving the contiguous range of matching keys.
+
+             Suggestions are ranked by a static popularity prior: the number of books of
+             an author or subject, and the number of subjects of a title (Open Library
+             tags well-known works far more heavily). Prefixes matching many keys have
+             their best entries precomputed at build time, so a lookup never scans more
+             than `scan_limit` keys.
+
+             Stored titles, authors and subjects were normalized by the transform
+             pipeline (lemmatized, stopwords dropped). Each is indexed both as stored
+             and folded by `lexical_search.key_terms`, and the complete words of a
+             typed query are folded the same way, so matching needs no spaCy model.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import List, Dict, Any, Sequence, Tuple
+
+import numpy as np
+
+from app.services.lexical_search import key_terms, tokenize
+
+SUGGESTION_KINDS = ("title", "author", "subject")
+_TITLE, _AUTHOR, _SUBJECT = range(len(SUGGESTION_KINDS))
+
+
+def suggestion_key(text: str) -> str:
+    """The form of a stored title, author or subject that prefixes are matched against."""
+    return " ".join(tokenize(text))
+
+
+def suggestion_keys(text: str) -> List[str]:
+    """
+    Every key a stored text is indexed under: as stored, plus its `key_terms` form when
+    that differs, so folded query words match either way.
+    """
+    key = suggestion_key(text)
+    folded = " ".join(key_terms(text))
+    return [key, folded] if folded and folded != key else [key]
+
+
+def query_prefix_key(text: str) -> str:
+    """
+    The prefix a typed query is looked up with. Complete words are folded like the
+    indexed keys; a trailing partial word is kept as typed, since folding half a word
+    could change its prefix.
+    """
+    words = tokenize(text)
+    if not words:
+        return ""
+    complete, partial = (words, []) if text[-1].isspace() else (words[:-1], words[-1:])
+    return " ".join(key_terms(" ".join(complete)) + partial)
+
+
+class SuggestIndex:
+    """
+    Popularity-ranked prefix lookup over book titles, authors and subjects.
+
+    Attributes:
+        texts (List[str]): Display text of every entry.
+        kinds (np.ndarray): Index into SUGGESTION_KINDS of every entry (int8).
+        rows (np.ndarray): Corpus row of every title entry, -1 otherwise (int32).
+        priors (np.ndarray): Popularity prior of every entry (float32).
+        key_entries (np.ndarray): Entry of every indexed key, in sorted key order.
+        key_ids (np.ndarray): Which of the entries' keys each indexed key starts in.
+        key_offsets (np.ndarray): Character offset of every indexed key in that key.
+        scan_limit (int): Largest key range ranked at lookup time.
+    """
+
+    def __init__(
+        self,
+        texts: List[str],
+        kinds: np.ndarray,
+        rows: np.ndarray,
+        priors: np.ndarray,
+        scan_limit: int = 1024,
+        max_suggestions: int = 64,
+    ) -> None:
+        self.texts = texts
+        self.kinds = kinds
+        self.rows = rows
+        self.priors = priors
+        self.scan_limit = scan_limit
+        self.max_suggestions = max_suggestions
+        self._keys: List[str] = []
+
+        key_entries, key_ids, key_offsets = [], [], []
+        for entry, text in enumerate(texts):
+            for key in suggestion_keys(text):
+                if not key:
+                    continue
+                starts = [0] + [match.end() for match in re.finditer(" ", key)]
+                key_entries.extend([entry] * len(starts))
+                key_ids.extend([len(self._keys)] * len(starts))
+                key_offsets.extend(starts)
+                self._keys.append(key)
+        # Equal keys keep whole values ahead of word suffixes.
+        order = sorted(
+            range(len(key_entries)),
+            key=lambda i: (self._keys[key_ids[i]][key_offsets[i] :], key_offsets[i]),
+        )
+        self.key_entries = np.asarray(key_entries, dtype=np.int32)[order]
+        self.key_ids = np.asarray(key_ids, dtype=np.int32)[order]
+        self.key_offsets = np.asarray(key_offsets, dtype=np.int32)[order]
+        self._top = self._precompute_heavy_prefixes()
+
+    @classmethod
+    def build(
+        cls, books_metadata: Sequence[Dict[str, Any]], **params
+    ) -> "SuggestIndex":
+        """
+        Index the titles, authors and subjects of a corpus.
+
+        Every book contributes its title; authors and subjects are deduplicated and
+        weighted by the number of books carrying them.
+        """
+        texts, kinds, rows, priors = [], [], [], []
+        authors: Counter = Counter()
+        subjects: Counter = Counter()
+        for row, book in enumerate(books_metadata):
+            title = str(book.get("title") or "").strip()
+            book_subjects = {
+                s.strip() for s in str(book.get("subjects") or "").split(",")
+            } - {""}
+            if title:
+                texts.append(title)
+                kinds.append(_TITLE)
+                rows.append(row)
+                priors.append(math.log1p(len(book_subjects)))
+            author = str(book.get("author") or "").strip()
+            if author:
+                authors[author] += 1
+            subjects.update(book_subjects)
+        for kind, counts in ((_AUTHOR, authors), (_SUBJECT, subjects)):
+            for text, count in counts.items():
+                texts.append(text)
+                kinds.append(kind)
+                rows.append(-1)
+                priors.append(math.log1p(count))
+        return cls(
+            texts,
+            np.asarray(kinds, dtype=np.int8),
+            np.asarray(rows, dtype=np.int32),
+            np.asarray(priors, dtype=np.float32),
+            **params,
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def _key(self, position: int) -> str:
+        return self._keys[self.key_ids[position]][self.key_offsets[position] :]
+
+    def _prefix_range(
+        self, prefix: str, lo: int = 0, hi: int = None
+    ) -> Tuple[int, int]:
+        """The [start, stop) positions of the keys starting with `prefix`."""
+        hi = len(self.key_entries) if hi is None else hi
+        start, stop = lo, hi
+        while start < stop:
+            mid = (start + stop) // 2
+            if self._key(mid) < prefix:
+                start = mid + 1
+            else:
+                stop = mid
+        stop = hi
+        lo = start
+        while lo < stop:
+            mid = (lo + stop) // 2
+            if self._key(mid)[: len(prefix)] <= prefix:
+                lo = mid + 1
+            else:
+                stop = mid
+        return start, lo
+
+    def _rank(self, start: int, stop: int) -> np.ndarray:
+        """The distinct entries of a key range, most popular first."""
+        entries = np.unique(self.key_entries[start:stop])
+        order = np.argsort(-self.priors[entries], kind="stable")
+        return entries[order[: self.max_suggestions]]
+
+    def _precompute_heavy_prefixes(self) -> Dict[str, np.ndarray]:
+        """
+        Rank every prefix whose key range exceeds `scan_limit`. Ranges only shrink as
+        prefixes grow, so each level only splits the heavy ranges of the level before.
+        """
+        top: Dict[str, np.ndarray] = {}
+        heavy = [(0, len(self.key_entries))]
+        length = 1
+        while heavy:
+            next_heavy = []
+            for lo, hi in heavy:
+                position = lo
+                while position < hi:
+                    prefix = self._key(position)[:length]
+                    if len(prefix) < length:
+                        # Keys shorter than the prefix sort first in their range.
+                        position += 1
+                        continue
+                    start, stop = self._prefix_range(prefix, position, hi)
+                    if stop - start > self.scan_limit:
+                        top[prefix] = self._rank(start, stop)
+                        next_heavy.append((start, stop))
+                    position = stop
+            heavy = next_heavy
+            length += 1
+        return top
+
+    def suggest(self, text: str, k: int = 8) -> List[Dict[str, Any]]:
+        """
+        Complete a partial query.
+
+        Returns:
+            List[dict]: Up to k suggestions, most popular first, each with its "text",
+            "type" and, for titles, the corpus "row".
+        """
+        prefix = query_prefix_key(text)
+        if not prefix:
+            return []
+        entries = self._top.get(prefix)
+        if entries is None:
+            entries = self._rank(*self._prefix_range(prefix))
+        suggestions, seen = [], set()
+        for entry in entries:
+            kind = SUGGESTION_KINDS[self.kinds[entry]]
+            if (kind, self.texts[entry]) in seen:
+                continue
+            seen.add((kind, self.texts[entry]))
+            suggestion = {"text": self.texts[entry], "type": kind}
+            if self.rows[entry] >= 0:
+                suggestion["row"] = int(self.rows[entry])
+            suggestions.append(suggestion)
+            if len(suggestions) == k:
+                break
+        return suggestions
+
+
+def picked_suggestion_books(
+    search_engine, book_id: str, k: int = 5
+) -> List[Dict[str, Any]]:
+    """
+    A book picked from the title suggestions, followed by its nearest neighbours from
+    the kNN graph, or an empty list when the snapshot has no graph or not that book.
+    Lets a search for a picked suggestion skip query encoding and vector search.
+    """
+    graph = search_engine.knn_graph
+    if graph is None:
+        return []
+    try:
+        row = graph.row(book_id)
+    except KeyError:
+        return []
+    rows = [row] + [neighbor for neighbor, _ in graph.similar_rows(row, k - 1)]
+    return [search_engine.books_metadata[row] for row in rows]
@@ -0,0 +1,184 @@
+"""
+Module: themes.py
+Description: Browse-by-theme catalog. Themes are clusters of the book embeddings built
+             offline (see app/pipelines/themes.py), each with a centroid, its member
+             books ordered by similarity to the centroid, and a short label. The
+             catalog is loaded with the search engine snapshot and answers /themes
+             requests from memory: the theme list is rendered once at load, and a
+             page of a theme is a slice of its member rows.
+
+             Directory layout:
+               centroids.npy  unit-length centroids (float32, [num_themes, dim])
+               members.npy    member rows grouped by theme, best first (int32)
+               scores.npy     member similarity to its centroid (float16)
+               offsets.npy    members of theme t are offsets[t]:offsets[t + 1] (int64)
+               themes.json    labels and build parameters
+
+             A catalog is written to a sibling temporary directory that is then
+             renamed into place, so its files are always replaced together.
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+from app.config import EMBEDDING_MODEL_NAME
+
+THEMES_MANIFEST_NAME = "themes.json"
+
+
+def public_book_fields(book: Dict[str, Any]) -> Dict[str, Any]:
+    """Book metadata as returned by the API, without the internal embedding input."""
+    return {key: value for key, value in book.items() if key != "embedding_input"}
+
+
+class ThemeCatalog:
+    """
+    Clusters of the corpus with their labels and ranked members.
+
+    Attributes:
+        centroids (np.ndarray): Unit-length theme centroids.
+        labels (List[str]): Short label per theme.
+        members (np.ndarray): Member rows, grouped by theme and ordered best first.
+        scores (np.ndarray): Cosine similarity of each member to its theme centroid.
+        offsets (np.ndarray): Members of theme t are members[offsets[t]:offsets[t + 1]].
+        num_books (int): Size of the corpus the themes were built from.
+        representatives (int): Books listed per theme in the theme overview.
+        source (str, optional): Fingerprint of the corpus the themes were built from.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        labels: List[str],
+        members: np.ndarray,
+        scores: np.ndarray,
+        offsets: np.ndarray,
+        num_books: int,
+        representatives: int = 5,
+        source: Optional[str] = None,
+    ) -> None:
+        if not len(labels) == len(centroids) == len(offsets) - 1:
+            raise ValueError("Theme centroids, labels and offsets do not match.")
+        self.centroids = centroids
+        self.labels = list(labels)
+        self.members = members
+        self.scores = scores
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.num_books = num_books
+        self.representatives = representatives
+        self.source = source
+        self._summaries: Optional[List[Dict[str, Any]]] = None
+
+    @classmethod
+    def load(cls, path: Path) -> "ThemeCatalog":
+        path = Path(path)
+        with open(path / THEMES_MANIFEST_NAME, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        return cls(
+            np.load(path / "centroids.npy"),
+            manifest["labels"],
+            np.load(path / "members.npy"),
+            np.load(path / "scores.npy"),
+            np.load(path / "offsets.npy"),
+            manifest["num_books"],
+            manifest["representatives"],
+            manifest.get("source"),
+        )
+
+    def save(self, path: Path, model_name: str = EMBEDDING_MODEL_NAME) -> None:
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        old_path = path.with_name(f"{path.name}.old")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        np.save(tmp_path / "centroids.npy", self.centroids.astype(np.float32))
+        np.save(tmp_path / "members.npy", self.members.astype(np.int32))
+        np.save(tmp_path / "scores.npy", self.scores.astype(np.float16))
+        np.save(tmp_path / "offsets.npy", self.offsets)
+        with open(tmp_path / THEMES_MANIFEST_NAME, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "model_name": model_name,
+                    "num_books": self.num_books,
+                    "representatives": self.representatives,
+                    "labels": self.labels,
+                    "source": self.source,
+                },
+                file,
+            )
+        # Swap the directories; a reader in between finds no manifest and skips themes.
+        shutil.rmtree(old_path, ignore_errors=True)
+        if path.exists():
+            path.rename(old_path)
+        tmp_path.rename(path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def size(self, theme_id: int) -> int:
+        return int(self.offsets[theme_id + 1] - self.offsets[theme_id])
+
+    def _books(
+        self, books_metadata: Sequence[Dict[str, Any]], start: int, stop: int
+    ) -> List[Dict[str, Any]]:
+        return [
+            {**public_book_fields(books_metadata[int(row)]), "score": float(score)}
+            for row, score in zip(self.members[start:stop], self.scores[start:stop])
+        ]
+
+    def summaries(
+        self, books_metadata: Sequence[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Every theme with its label, size and representative books. Rendered on the
+        first call and then reused, since the catalog belongs to one corpus snapshot.
+        """
+        if self._summaries is None:
+            self._summaries = [
+                {
+                    "id": theme_id,
+                    "label": label,
+                    "size": self.size(theme_id),
+                    "representatives": self._books(
+                        books_metadata,
+                        self.offsets[theme_id],
+                        min(
+                            self.offsets[theme_id] + self.representatives,
+                            self.offsets[theme_id + 1],
+                        ),
+                    ),
+                }
+                for theme_id, label in enumerate(self.labels)
+            ]
+        return self._summaries
+
+    def page(
+        self,
+        books_metadata: Sequence[Dict[str, Any]],
+        theme_id: int,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Dict[str, Any]:
+        """
+        One page of a theme's books, ordered by similarity to the theme centroid.
+
+        Raises:
+            KeyError: If the theme does not exist.
+        """
+        if not 0 <= theme_id < len(self):
+            raise KeyError(theme_id)
+        start = self.offsets[theme_id] + offset
+        stop = min(start + limit, self.offsets[theme_id + 1])
+        return {
+            "id": theme_id,
+            "label": self.labels[theme_id],
+            "size": self.size(theme_id),
+            "offset": offset,
+            "limit": limit,
+            "books": self._books(books_metadata, start, stop),
+        }
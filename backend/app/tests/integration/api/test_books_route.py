@@ -0,0 +1,103 @@
+import json
+
+import numpy as np
+import pytest
+import pytest_asyncio
+import httpx
+
+from app.main import app
+from app.services.lexical_search import BM25Index
+from app.services.semantic_search import SearchEngine, normalize_embeddings
+
+
+class FakeEncoder:
+    """Maps each known query to a fixed vector and counts forward passes."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, device=None, **kwargs):
+        self.calls.append(list(texts))
+        return np.stack([self.vectors[text] for text in texts])
+
+
+@pytest_asyncio.fixture
+async def batch_client(retrieved_context_fixture):
+    """
+    An AsyncClient whose app state holds a small in-memory corpus, without running the
+    lifespan (no model download or Redis).
+    """
+    rng = np.random.default_rng(0)
+    embeddings = normalize_embeddings(rng.normal(size=(5, 8)))
+    encoder = FakeEncoder(
+        {"hunter x hunter": embeddings[0], "warrior cats": embeddings[1] + 0.01}
+    )
+    app.state.model = encoder
+    app.state.device = "cpu"
+    app.state.query_embedding_cache = None
+    app.state.search_engine = SearchEngine.from_embeddings(
+        embeddings, retrieved_context_fixture, normalized=True
+    )
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client, encoder
+
+
+@pytest.mark.asyncio
+async def test_batch_search_returns_results_per_query(batch_client):
+    client, encoder = batch_client
+    response = await client.post(
+        "/search_books/batch",
+        json={
+            "queries": ["Hunter x Hunter", "warrior cats", "hunter x hunter"],
+            "k": 2,
+        },
+    )
+    results = response.json()["results"]
+
+    # Assertions
+    assert response.status_code == 200
+    assert [result["query"] for result in results] == [
+        "hunter x hunter",
+        "warrior cats",
+        "hunter x hunter",
+    ]
+    assert encoder.calls == [["hunter x hunter", "warrior cats"]], "One forward pass"
+    assert results[0]["results"][0]["title"] == "hunter x hunter"
+    assert len(results[1]["results"]) == 2
+    assert "embedding_input" not in results[0]["results"][0]
+    scores = [book["score"] for book in results[0]["results"]]
+    assert scores == sorted(scores, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_batch_search_streams_ndjson(batch_client):
+    client, _ = batch_client
+    response = await client.post(
+        "/search_books/batch",
+        json={"queries": ["hunter x hunter", ""], "k": 1, "stream": True},
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    # Assertions
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert lines[0]["results"][0]["title"] == "hunter x hunter"
+    assert lines[1] == {"query": "", "error": "Empty query."}
+
+
+@pytest.mark.asyncio
+async def test_batch_search_fuses_lexical_matches(
+    batch_client, retrieved_context_fixture
+):
+    client, _ = batch_client
+    engine = app.state.search_engine
+    engine.lexical_index = BM25Index.build(retrieved_context_fixture)
+    response = await client.post(
+        "/search_books/batch", json={"queries": ["warrior cats"], "k": 5}
+    )
+
+    # Assertions
+    assert response.status_code == 200
+    assert len(response.json()["results"][0]["results"]) == 5
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import pytest_asyncio
+import httpx
+
+from app.api import shards
+from app.main import app
+from app.services.semantic_search import SearchEngine, normalize_embeddings
+
+
+@pytest_asyncio.fixture
+async def shard_client(retrieved_context_fixture, monkeypatch):
+    """An AsyncClient serving shards of a small corpus, without the lifespan."""
+    monkeypatch.setattr(shards, "SHARD_TOKEN", "secret")
+    embeddings = normalize_embeddings(
+        np.random.default_rng(0).normal(size=(len(retrieved_context_fixture), 8))
+    )
+    app.state.search_engine = SearchEngine.from_embeddings(
+        embeddings, retrieved_context_fixture, normalized=True
+    )
+    app.state.shard_indexes = {}
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client, embeddings
+
+
+@pytest.mark.asyncio
+async def test_shard_search_requires_the_shard_token(shard_client):
+    client, embeddings = shard_client
+    payload = {"start": 1, "stop": 4, "queries": [embeddings[2].tolist()], "k": 2}
+
+    anonymous = await client.post("/shards/search", json=payload)
+    response = await client.post(
+        "/shards/search", json=payload, headers={"X-Shard-Token": "secret"}
+    )
+
+    # Assertions
+    assert anonymous.status_code == 403
+    assert response.status_code == 200
+    assert response.json()["results"][0]["rows"][0] == 1, "Rows are shard-relative"
+
+
+@pytest.mark.asyncio
+async def test_shard_search_reduces_with_the_corpus_projection(
+    shard_client, monkeypatch
+):
+    from app.services import sharding
+    from app.services.semantic_search import (
+        FlatIndex,
+        fit_projection,
+        project_embeddings,
+    )
+
+    client, embeddings = shard_client
+    monkeypatch.setattr(sharding, "VECTOR_INDEX_DIM", 4)
+    reduced = project_embeddings(embeddings, fit_projection(embeddings, 4))
+    query = embeddings[2]
+    expected_rows, _ = FlatIndex(reduced[1:4]).search(
+        normalize_embeddings(query[None, :] @ fit_projection(embeddings, 4))[0], 2
+    )
+
+    response = await client.post(
+        "/shards/search",
+        json={"start": 1, "stop": 4, "queries": [query.tolist()], "k": 2},
+        headers={"X-Shard-Token": "secret"},
+    )
+
+    # Assertions
+    assert response.status_code == 200
+    assert response.json()["results"][0]["rows"] == expected_rows.tolist()
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import pytest_asyncio
+import httpx
+
+from app.main import app
+from app.pipelines.knn_graph import build_knn_graph
+from app.services.knn_graph import KnnGraph
+from app.services.semantic_search import SearchEngine, normalize_embeddings
+
+
+@pytest_asyncio.fixture
+async def similar_client(retrieved_context_fixture):
+    """An AsyncClient over a small corpus with a kNN graph, without the lifespan."""
+    rng = np.random.default_rng(0)
+    embeddings = normalize_embeddings(
+        rng.normal(size=(len(retrieved_context_fixture), 8))
+    )
+    engine = SearchEngine.from_embeddings(
+        embeddings, retrieved_context_fixture, normalized=True
+    )
+    neighbors, scores = build_knn_graph(embeddings, num_neighbors=3)
+    book_ids = [str(book["book_id"]) for book in retrieved_context_fixture]
+    engine.knn_graph = KnnGraph(neighbors, scores, np.asarray(book_ids))
+    app.state.search_engine = engine
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client, engine, book_ids
+
+
+@pytest.mark.asyncio
+async def test_similar_books_reads_the_graph(similar_client):
+    client, engine, book_ids = similar_client
+
+    response = await client.get(f"/books/{book_ids[0]}/similar", params={"k": 2})
+    missing = await client.get("/books/unknown/similar")
+
+    # Assertions
+    assert response.status_code == 200
+    similar = response.json()["similar"]
+    assert [book["book_id"] for book in similar] == [
+        book_ids[row] for row in engine.knn_graph.neighbors[0, :2]
+    ]
+    assert all("embedding_input" not in book for book in similar)
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_similar_books_unavailable_without_graph(similar_client):
+    client, engine, book_ids = similar_client
+    engine.knn_graph = None
+
+    response = await client.get(f"/books/{book_ids[0]}/similar")
+
+    # Assertions
+    assert response.status_code == 503
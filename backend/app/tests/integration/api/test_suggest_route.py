@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+import pytest_asyncio
+import httpx
+
+from app.main import app
+from app.services.semantic_search import SearchEngine, normalize_embeddings
+from app.services.suggest import SuggestIndex
+
+
+@pytest_asyncio.fixture
+async def suggest_client(retrieved_context_fixture):
+    """An AsyncClient over a small corpus with a suggest index, without the lifespan."""
+    rng = np.random.default_rng(0)
+    embeddings = normalize_embeddings(
+        rng.normal(size=(len(retrieved_context_fixture), 8))
+    )
+    engine = SearchEngine.from_embeddings(
+        embeddings, retrieved_context_fixture, normalized=True
+    )
+    engine.suggest_index = SuggestIndex.build(retrieved_context_fixture)
+    app.state.search_engine = engine
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client, engine
+
+
+@pytest.mark.asyncio
+async def test_suggest_returns_completions(suggest_client):
+    client, _ = suggest_client
+
+    response = await client.get("/suggest", params={"q": "inu", "k": 2})
+
+    # Assertions
+    assert response.status_code == 200
+    suggestion = response.json()["suggestions"][0]
+    assert suggestion == {
+        "text": "inuyasha",
+        "type": "title",
+        "book_id": "OL8212073W",
+        "author": "rumiko takahashi",
+    }
+
+
+@pytest.mark.asyncio
+async def test_suggest_unavailable_without_index(suggest_client):
+    client, engine = suggest_client
+    engine.suggest_index = None
+
+    response = await client.get("/suggest", params={"q": "inu"})
+
+    # Assertions
+    assert response.status_code == 503
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import pytest_asyncio
+import httpx
+
+from app.main import app
+from app.pipelines.themes import build_theme_catalog
+from app.services.semantic_search import SearchEngine, normalize_embeddings
+
+
+@pytest_asyncio.fixture
+async def themes_client(retrieved_context_fixture):
+    """An AsyncClient over a small corpus with themes, without running the lifespan."""
+    rng = np.random.default_rng(0)
+    embeddings = normalize_embeddings(
+        rng.normal(size=(len(retrieved_context_fixture), 8))
+    )
+    engine = SearchEngine.from_embeddings(
+        embeddings, retrieved_context_fixture, normalized=True
+    )
+    engine.themes = build_theme_catalog(
+        embeddings, retrieved_context_fixture, num_clusters=2, representatives=1
+    )
+    app.state.search_engine = engine
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client, engine
+
+
+@pytest.mark.asyncio
+async def test_themes_lists_and_pages_themes(themes_client):
+    client, engine = themes_client
+
+    listing = (await client.get("/themes")).json()
+    page = await client.get("/themes/0", params={"offset": 1, "limit": 2})
+    missing = await client.get("/themes/99")
+
+    # Assertions
+    assert listing["version"] == engine.version
+    assert sum(theme["size"] for theme in listing["themes"]) == len(engine)
+    assert all(len(theme["representatives"]) == 1 for theme in listing["themes"])
+    assert page.status_code == 200 and page.json()["offset"] == 1
+    assert len(page.json()["books"]) == min(2, listing["themes"][0]["size"] - 1)
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_themes_unavailable_without_catalog(themes_client):
+    client, engine = themes_client
+    engine.themes = None
+
+    response = await client.get("/themes")
+
+    # Assertions
+    assert response.status_code == 503
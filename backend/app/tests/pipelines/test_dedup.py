@@ -0,0 +1,62 @@
+import numpy as np
+
+from app.pipelines.dedup import (
+    cluster_near_duplicates,
+    deduplicate_books,
+    minhash_signatures,
+)
+
+WARRIORS_SUBJECTS = (
+    "cat, fantasy, fantasy fiction, feral cat, fiction, juvenile fiction, children "
+    "fiction, cat fiction, courage fiction, action, courage, adventure adventurer "
+    "fiction, animal fiction, serieswarriorsthepropheciesbegin"
+)
+
+
+def make_book(book_id, title, author, subjects, year):
+    return {
+        "book_id": book_id,
+        "title": title,
+        "embedding_input": (
+            f"Title: {title}. Author: {author}. Subjects: {subjects}. Year: {year}."
+        ),
+    }
+
+
+def test_minhash_estimates_jaccard_similarity():
+    words = [f"w{i}" for i in range(60)]
+    signatures = minhash_signatures(
+        [" ".join(words), " ".join(words[:55] + ["x1", "x2", "x3", "x4", "x5"]), "zzz"],
+        num_perm=256,
+        shingle_size=1,
+    )
+    similar = np.mean(signatures[0] == signatures[1])
+
+    # Assertions
+    assert abs(similar - 55 / 65) < 0.1, "Agreement should estimate Jaccard (55/65)"
+    assert np.mean(signatures[0] == signatures[2]) < 0.05
+
+
+def test_deduplicate_books_collapses_near_duplicates():
+    books = [
+        make_book("OL1W", "into the wild", "erin hunter", WARRIORS_SUBJECTS, "2003"),
+        make_book("OL2W", "the hobbit", "j r r tolkien", "fantasy, dragon", "1937"),
+        make_book("OL3W", "fire and ice", "erin hunter", WARRIORS_SUBJECTS, "2003"),
+        make_book("OL1W", "into the wild", "erin hunter", WARRIORS_SUBJECTS, "2003"),
+        make_book("OL4W", "dune", "frank herbert", "science fiction", "1965"),
+    ]
+
+    canonical, aliases = deduplicate_books(books, threshold=0.7)
+
+    # Assertions
+    assert [book["book_id"] for book in canonical] == ["OL1W", "OL2W", "OL4W"]
+    assert aliases == {"OL1W": ["OL3W"]}, "Repeated ids collapse without aliasing"
+
+
+def test_cluster_ids_are_the_lowest_row():
+    signatures = np.array(
+        [[1, 2, 3, 4], [9, 9, 9, 9], [1, 2, 3, 4], [9, 9, 9, 9]], dtype=np.uint32
+    )
+
+    # Assertions
+    assert cluster_near_duplicates(signatures, 0.9, bands=2).tolist() == [0, 1, 0, 1]
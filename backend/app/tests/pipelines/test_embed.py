@@ -0,0 +1,182 @@
+import numpy as np
+import pytest
+
+from app.pipelines.embed import (
+    build_book_embeddings,
+    checkpoint_path,
+    keys_path,
+    refresh_book_embeddings,
+    refresh_field_embeddings,
+    refresh_passage_embeddings,
+    split_passages,
+)
+from app.pipelines.load import load_embedding_index, load_embedding_index_offsets
+
+
+class FakeModel:
+    """Deterministic stand-in for SentenceTransformer; fails after `fail_after` calls."""
+
+    def __init__(self, dim=8, fail_after=None):
+        self.dim = dim
+        self.fail_after = fail_after
+        self.segments = []
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=32, device=None, normalize_embeddings=False):
+        if self.fail_after is not None and len(self.segments) >= self.fail_after:
+            raise KeyboardInterrupt("build interrupted")
+        self.segments.append(list(texts))
+        vectors = np.array(
+            [[len(text)] + [i + 1 for i in range(self.dim - 1)] for text in texts],
+            dtype=np.float32,
+        )
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def texts_fixture():
+    return [f"book {'word ' * (i % 7)}{i}" for i in range(25)]
+
+
+def test_build_writes_rows_in_corpus_order(tmp_path, texts_fixture):
+    index_file = tmp_path / "book_embeddings.bin"
+    model = FakeModel()
+
+    header = build_book_embeddings(
+        model, texts_fixture, index_file, "fake-model", checkpoint_rows=10
+    )
+    embeddings, _ = load_embedding_index(index_file, verify=True)
+    expected = FakeModel().encode(texts_fixture)
+
+    # Assertions
+    assert header["rows"] == 25 and header["normalized"] is True
+    assert np.allclose(embeddings, expected), "Row i should belong to texts[i]"
+    assert [len(segment) for segment in model.segments] == [10, 10, 5]
+    lengths = [len(text.split()) for segment in model.segments for text in segment]
+    assert lengths == sorted(lengths, reverse=True), "Texts should be length-sorted"
+    assert not checkpoint_path(index_file).exists(), "Checkpoint should be removed"
+
+
+def test_build_resumes_from_checkpoint(tmp_path, texts_fixture):
+    index_file = tmp_path / "book_embeddings.bin"
+
+    with pytest.raises(KeyboardInterrupt):
+        build_book_embeddings(
+            FakeModel(fail_after=2),
+            texts_fixture,
+            index_file,
+            "fake-model",
+            checkpoint_rows=10,
+        )
+    assert checkpoint_path(index_file).exists(), "Interrupted build should checkpoint"
+
+    resumed_model = FakeModel()
+    build_book_embeddings(
+        resumed_model, texts_fixture, index_file, "fake-model", checkpoint_rows=10
+    )
+    embeddings, _ = load_embedding_index(index_file, verify=True)
+
+    # Assertions
+    assert [len(segment) for segment in resumed_model.segments] == [5]
+    assert np.allclose(embeddings, FakeModel().encode(texts_fixture))
+
+
+def test_refresh_reencodes_only_changed_books(tmp_path, texts_fixture):
+    index_file = tmp_path / "book_embeddings.bin"
+    first = refresh_book_embeddings(
+        FakeModel(), texts_fixture, index_file, "fake-model"
+    )
+
+    # Change one book, drop two, add one new and one duplicate of an existing text.
+    updated = list(texts_fixture)
+    updated[3] = "book a revised description"
+    del updated[10:12]
+    updated += ["book brand new", texts_fixture[0]]
+
+    model = FakeModel()
+    stats = refresh_book_embeddings(model, updated, index_file, "fake-model")
+    embeddings, _ = load_embedding_index(index_file, verify=True)
+
+    # Assertions
+    assert first["encoded"] == 25 and first["reused"] == 0
+    assert stats == {"rows": 25, "reused": 23, "encoded": 2, "removed": 3}
+    assert sorted(text for segment in model.segments for text in segment) == [
+        "book a revised description",
+        "book brand new",
+    ]
+    assert np.allclose(embeddings, FakeModel().encode([t.lower() for t in updated]))
+    assert len(np.load(keys_path(index_file))) == 25
+
+
+def test_refresh_is_a_no_op_for_unchanged_corpus(tmp_path, texts_fixture):
+    index_file = tmp_path / "book_embeddings.bin"
+    refresh_book_embeddings(FakeModel(), texts_fixture, index_file, "fake-model")
+
+    model = FakeModel()
+    stats = refresh_book_embeddings(model, texts_fixture, index_file, "fake-model")
+    other_model = FakeModel()
+    changed_model = refresh_book_embeddings(
+        other_model, texts_fixture, index_file, "other-model"
+    )
+
+    # Assertions
+    assert stats["encoded"] == 0 and model.segments == []
+    assert (
+        changed_model["encoded"] == 25
+    ), "A new model name should invalidate every row"
+
+
+def test_split_passages_overlaps_windows():
+    words = [f"w{i}" for i in range(10)]
+
+    passages = split_passages(" ".join(words), max_words=4, stride=3)
+
+    # Assertions
+    assert passages == ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"]
+    assert split_passages("  short   text ", max_words=4) == ["short text"]
+    assert split_passages("", max_words=4) == []
+
+
+def test_refresh_passages_writes_per_book_offsets(tmp_path):
+    books = [
+        {"title": "A", "description": " ".join(["alpha"] * 10)},
+        {"title": "B", "description": ""},
+        {"title": "C", "description": "one short paragraph"},
+    ]
+    index_file = tmp_path / "book_passages.bin"
+
+    stats = refresh_passage_embeddings(
+        FakeModel(), books, index_file, max_words=4, stride=3, model_name="fake-model"
+    )
+    embeddings, _ = load_embedding_index(index_file)
+    offsets = load_embedding_index_offsets(index_file)
+    books.insert(0, {"title": "D", "description": ""})
+    refresh_passage_embeddings(
+        FakeModel(), books, index_file, max_words=4, stride=3, model_name="fake-model"
+    )
+
+    # Assertions
+    assert list(offsets) == [0, 3, 3, 4]
+    assert len(embeddings) == 4 and stats["books"] == 2
+    offsets = load_embedding_index_offsets(index_file)
+    assert list(offsets) == [0, 0, 3, 3, 4], "Unchanged passages, but new offsets"
+
+
+def test_refresh_fields_embeds_one_block_per_field(tmp_path):
+    books = [
+        {"title": "Dune", "author": "frank herbert", "subjects": "science fiction"},
+        {"title": "Emma", "author": "", "subjects": "romance"},
+    ]
+    index_file = tmp_path / "book_fields.bin"
+    model = FakeModel()
+
+    refresh_field_embeddings(model, books, index_file, model_name="fake-model")
+    embeddings, _ = load_embedding_index(index_file)
+
+    # Assertions
+    assert len(model.segments) == 1, "All fields are encoded in one batched pass"
+    assert len(embeddings) == 6
+    assert np.allclose(embeddings[1], FakeModel().encode(["emma"])[0])
+    assert np.allclose(embeddings[4], FakeModel().encode(["science fiction"])[0])
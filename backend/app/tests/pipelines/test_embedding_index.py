@@ -0,0 +1,82 @@
+import pytest
+import numpy as np
+
+from app.pipelines.load import (
+    save_embedding_index,
+    load_embedding_index,
+    read_embedding_index_header,
+)
+from app.services.semantic_search import SearchEngine, normalize_embeddings
+
+
+@pytest.fixture
+def embeddings_fixture():
+    rng = np.random.default_rng(42)
+    return normalize_embeddings(rng.normal(size=(100, 32)))
+
+
+def test_embedding_index_round_trip(tmp_path, embeddings_fixture):
+    index_file = tmp_path / "book_embeddings.bin"
+    save_embedding_index(
+        embeddings_fixture, index_file, "all-MiniLM-L6-v2", normalized=True
+    )
+
+    embeddings, header = load_embedding_index(index_file, verify=True)
+
+    # Assertions
+    assert isinstance(embeddings, np.memmap), "Index should be memory-mapped"
+    assert embeddings.shape == (100, 32), "Shape should match the saved matrix"
+    assert np.array_equal(embeddings, embeddings_fixture), "Rows should round-trip"
+    assert header["model_name"] == "all-MiniLM-L6-v2"
+    assert header["normalized"] is True
+    assert header["checksum"].startswith("sha256:")
+    assert read_embedding_index_header(index_file) == header
+
+
+def test_saving_over_a_mapped_index_keeps_the_old_mapping(tmp_path, embeddings_fixture):
+    index_file = tmp_path / "book_embeddings.bin"
+    save_embedding_index(embeddings_fixture, index_file, "all-MiniLM-L6-v2", True)
+    served, _ = load_embedding_index(index_file)
+
+    save_embedding_index(embeddings_fixture[:10], index_file, "all-MiniLM-L6-v2", True)
+
+    # Assertions
+    assert np.array_equal(served, embeddings_fixture), "The old file is not truncated"
+    assert load_embedding_index(index_file)[0].shape == (10, 32)
+    assert [path.name for path in tmp_path.iterdir()] == ["book_embeddings.bin"]
+
+
+def test_embedding_index_detects_corruption(tmp_path, embeddings_fixture):
+    index_file = tmp_path / "book_embeddings.bin"
+    save_embedding_index(embeddings_fixture, index_file, "all-MiniLM-L6-v2")
+
+    # Flip the last byte of the matrix.
+    data = bytearray(index_file.read_bytes())
+    data[-1] ^= 0xFF
+    index_file.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError):
+        load_embedding_index(index_file, verify=True)
+
+
+def test_chunked_search_matches_single_pass(tmp_path, embeddings_fixture):
+    index_file = tmp_path / "book_embeddings.bin"
+    save_embedding_index(
+        embeddings_fixture, index_file, "all-MiniLM-L6-v2", normalized=True
+    )
+    embeddings, _ = load_embedding_index(index_file)
+    books_metadata = [{"title": f"book {i}"} for i in range(len(embeddings))]
+    query_embedding = embeddings_fixture[7] + 0.01
+
+    chunked = SearchEngine.from_embeddings(
+        embeddings, books_metadata, normalized=True, chunk_size=16
+    )
+    single = SearchEngine.from_embeddings(embeddings_fixture, books_metadata)
+
+    chunked_indices, chunked_scores = chunked.search(query_embedding, k=5)
+    single_indices, single_scores = single.search(query_embedding, k=5)
+
+    # Assertions
+    assert list(chunked_indices) == list(single_indices)
+    assert np.allclose(chunked_scores, single_scores, atol=1e-6)
+    assert chunked_indices[0] == 7, "The closest row should rank first"
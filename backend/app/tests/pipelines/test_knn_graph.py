@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app.pipelines.knn_graph import build_knn_graph
+from app.services.knn_graph import KnnGraph, graph_book_ids
+from app.services.semantic_search import normalize_embeddings
+
+
+def test_build_knn_graph_matches_brute_force():
+    rng = np.random.default_rng(5)
+    embeddings = normalize_embeddings(rng.normal(size=(50, 12)))
+
+    neighbors, scores = build_knn_graph(
+        embeddings, num_neighbors=4, block_size=7, chunk_size=16
+    )
+
+    # Assertions
+    similarities = embeddings @ embeddings.T
+    np.fill_diagonal(similarities, -np.inf)
+    expected = np.argsort(-similarities, axis=1)[:, :4]
+    assert neighbors.dtype == np.int32 and scores.dtype == np.float16
+    assert np.array_equal(neighbors, expected)
+    assert np.allclose(
+        scores, np.take_along_axis(similarities, expected, axis=1), atol=1e-3
+    )
+
+
+def test_build_knn_graph_excludes_self_among_duplicates():
+    rng = np.random.default_rng(6)
+    embeddings = normalize_embeddings(rng.normal(size=(6, 8)))
+    embeddings = np.vstack([embeddings, embeddings[:1], embeddings[:1]])
+
+    neighbors, _ = build_knn_graph(embeddings, num_neighbors=2, block_size=4)
+
+    # Assertions
+    assert not np.any(neighbors == np.arange(len(embeddings))[:, np.newaxis])
+    assert set(neighbors[0]) == {6, 7}
+
+
+def test_knn_graph_round_trips(tmp_path):
+    rng = np.random.default_rng(7)
+    embeddings = normalize_embeddings(rng.normal(size=(20, 8)))
+    neighbors, scores = build_knn_graph(embeddings, num_neighbors=3)
+    book_ids = np.asarray([f"OL{row}W" for row in range(20)])
+    KnnGraph(neighbors, scores, book_ids).save(tmp_path / "graph")
+
+    graph = KnnGraph.load(tmp_path / "graph")
+    similar = graph.similar("OL4W", k=2)
+
+    # Assertions
+    assert len(graph) == 20 and graph.num_neighbors == 3
+    assert [row for row, _ in similar] == list(neighbors[4, :2])
+    assert similar[0][1] >= similar[1][1]
+    with pytest.raises(KeyError):
+        graph.similar("missing")
+
+
+def test_graph_book_ids_fall_back_to_the_row():
+    books = [
+        {"book_id": "/works/OL1W"},
+        {"book_id": ""},
+        {},
+        {"book_id": "/works/OL4W"},
+    ]
+
+    # Assertions
+    assert graph_book_ids(books) == ["/works/OL1W", "1", "2", "/works/OL4W"]
@@ -0,0 +1,25 @@
+import numpy as np
+
+from app.pipelines.reduce import recall_report
+from app.services.semantic_search import normalize_embeddings
+
+
+def test_recall_report_covers_every_method_and_dimension():
+    rng = np.random.default_rng(2)
+    basis = np.linalg.qr(rng.normal(size=(32, 8)))[0]
+    # Signal in 8 dimensions, plus a little noise in the other 24.
+    embeddings = normalize_embeddings(
+        rng.normal(size=(400, 8)) @ basis.T + 0.01 * rng.normal(size=(400, 32))
+    )
+
+    report = recall_report(
+        embeddings, dims=[16, 4], methods=["pca", "truncate"], k=5, num_queries=50
+    )
+    recall = {(row["method"], row["dim"]): row["recall@5"] for row in report}
+
+    # Assertions
+    assert len(report) == 4
+    assert recall[("pca", 16)] >= 0.95, "PCA keeps the signal subspace"
+    assert recall[("pca", 16)] >= recall[("pca", 4)]
+    assert recall[("pca", 16)] > recall[("truncate", 16)]
+    assert report[0]["bytes_per_vector"] == 64 and report[0]["size_ratio"] == 0.5
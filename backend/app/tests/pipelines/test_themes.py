@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from app.pipelines.themes import build_theme_catalog
+from app.services.semantic_search import normalize_embeddings
+from app.services.themes import ThemeCatalog
+
+SUBJECTS = ["dragons, magic, fiction", "war, history, fiction", "cooking, fiction"]
+
+
+@pytest.fixture
+def themed_corpus_fixture():
+    rng = np.random.default_rng(3)
+    centers = normalize_embeddings(rng.normal(size=(3, 16)))
+    themes = np.repeat(np.arange(3), 30)
+    embeddings = normalize_embeddings(centers[themes] + 0.1 * rng.normal(size=(90, 16)))
+    books_metadata = [
+        {"title": f"Book {i}", "subjects": SUBJECTS[theme], "embedding_input": "x"}
+        for i, theme in enumerate(themes)
+    ]
+    return embeddings, books_metadata, themes
+
+
+def test_build_theme_catalog_recovers_clusters(themed_corpus_fixture):
+    embeddings, books_metadata, themes = themed_corpus_fixture
+
+    catalog = build_theme_catalog(
+        embeddings, books_metadata, num_clusters=3, batch_size=32, iterations=30
+    )
+
+    # Assertions
+    assert len(catalog) == 3 and catalog.offsets[-1] == 90
+    assert sorted(catalog.size(t) for t in range(3)) == [30, 30, 30]
+    for theme_id in range(3):
+        rows = catalog.members[
+            catalog.offsets[theme_id] : catalog.offsets[theme_id + 1]
+        ]
+        assert len(set(themes[rows])) == 1, "Each theme should be one true cluster"
+        scores = catalog.scores[
+            catalog.offsets[theme_id] : catalog.offsets[theme_id + 1]
+        ]
+        assert np.all(np.diff(scores.astype(np.float32)) <= 1e-3), "Best first"
+    # The subject shared by every book does not make it into the labels.
+    assert sorted(catalog.labels) == ["Cooking", "Dragons, Magic", "War, History"]
+
+
+def test_theme_catalog_pages_and_round_trips(tmp_path, themed_corpus_fixture):
+    embeddings, books_metadata, _ = themed_corpus_fixture
+    catalog = build_theme_catalog(
+        embeddings,
+        books_metadata,
+        num_clusters=3,
+        representatives=2,
+        iterations=10,
+        source="sha256:abc",
+    )
+    catalog.save(tmp_path / "themes")
+    catalog.save(tmp_path / "themes")  # Replaces the previous catalog as a whole
+
+    loaded = ThemeCatalog.load(tmp_path / "themes")
+    summaries = loaded.summaries(books_metadata)
+    page = loaded.page(books_metadata, 1, offset=25, limit=10)
+
+    # Assertions
+    assert loaded.labels == catalog.labels
+    assert np.array_equal(loaded.members, catalog.members)
+    assert loaded.source == "sha256:abc"
+    assert [p.name for p in tmp_path.iterdir()] == ["themes"]
+    assert [len(theme["representatives"]) for theme in summaries] == [2, 2, 2]
+    assert "embedding_input" not in summaries[0]["representatives"][0]
+    assert len(page["books"]) == loaded.size(1) - 25
+    assert loaded.page(books_metadata, 1, offset=500)["books"] == []
+    with pytest.raises(KeyError):
+        loaded.page(books_metadata, 3)
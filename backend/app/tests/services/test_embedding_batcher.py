@@ -0,0 +1,75 @@
+# tests/services/test_embedding_batcher.py
+
+import asyncio
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class FakeEncoder:
+    """Records the size of every batch and returns one row per text."""
+
+    def __init__(self, dim: int = 8):
+        self.dim = dim
+        self.batch_sizes = []
+
+    def __call__(self, texts):
+        self.batch_sizes.append(len(texts))
+        return np.array(
+            [[float(len(text))] * self.dim for text in texts], dtype=np.float32
+        )
+
+
+@pytest_asyncio.fixture
+async def batcher_fixture():
+    encoder = FakeEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=16, max_wait_ms=20)
+    await batcher.start()
+    yield batcher, encoder
+    await batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_queries_share_a_batch(batcher_fixture):
+    batcher, encoder = batcher_fixture
+    texts = ["a" * length for length in range(1, 11)]
+
+    embeddings = await asyncio.gather(*(batcher.embed(text) for text in texts))
+
+    # Assertions
+    assert encoder.batch_sizes == [10], "Concurrent queries should be encoded together"
+    for text, embedding in zip(texts, embeddings):
+        assert embedding.shape == (1, 8), "Each caller should get a single row"
+        assert embedding[0, 0] == len(text), "Each caller should get its own row"
+
+    metrics = batcher.metrics()
+    assert metrics["batches"] == 1
+    assert metrics["queries"] == 10
+    assert metrics["batch_size_histogram"] == {10: 1}
+
+
+@pytest.mark.asyncio
+async def test_batches_respect_max_batch_size(batcher_fixture):
+    batcher, encoder = batcher_fixture
+
+    await asyncio.gather(*(batcher.embed(f"query {i}") for i in range(40)))
+
+    # Assertions
+    assert sum(encoder.batch_sizes) == 40
+    assert max(encoder.batch_sizes) <= 16, "Batches should not exceed max_batch_size"
+
+
+@pytest.mark.asyncio
+async def test_encode_errors_propagate_to_callers():
+    def failing_encoder(texts):
+        raise RuntimeError("model failure")
+
+    batcher = EmbeddingBatcher(failing_encoder, max_wait_ms=1)
+    await batcher.start()
+    try:
+        with pytest.raises(RuntimeError, match="model failure"):
+            await batcher.embed("query")
+    finally:
+        await batcher.stop()
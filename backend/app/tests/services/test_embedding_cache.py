@@ -0,0 +1,98 @@
+# tests/services/test_embedding_cache.py
+
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import QueryEmbeddingCache
+
+
+class InMemoryCacheClient:
+    """Stands in for CacheClient's binary get/set methods."""
+
+    def __init__(self):
+        self.store = {}
+
+    def get_bytes(self, key):
+        return self.store.get(key)
+
+    def set_bytes(self, key, value, ttl=None):
+        self.store[key] = value
+        return True
+
+
+@pytest.fixture
+def vector_fixture():
+    return np.arange(8, dtype=np.float32).reshape(1, 8)
+
+
+def test_lookup_normalizes_query_text(vector_fixture):
+    cache = QueryEmbeddingCache("all-MiniLM-L6-v2")
+    cache.put("Books like  Hunter x Hunter", vector_fixture)
+
+    # Assertions
+    assert np.array_equal(cache.get("books like hunter x hunter "), vector_fixture)
+    assert cache.get("books like naruto") is None
+
+
+def test_lru_evicts_least_recently_used(vector_fixture):
+    cache = QueryEmbeddingCache("all-MiniLM-L6-v2", max_entries=2)
+    cache.put("first", vector_fixture)
+    cache.put("second", vector_fixture)
+    cache.get("first")  # "second" is now the least recently used entry
+    cache.put("third", vector_fixture)
+
+    # Assertions
+    assert cache.get("first") is not None
+    assert cache.get("second") is None, "Least recently used entry should be evicted"
+    assert cache.get("third") is not None
+
+
+def test_redis_tier_is_shared_and_keyed_by_model(vector_fixture):
+    redis_tier = InMemoryCacheClient()
+    writer = QueryEmbeddingCache("all-MiniLM-L6-v2", cache_client=redis_tier)
+    reader = QueryEmbeddingCache("all-MiniLM-L6-v2", cache_client=redis_tier)
+    other_model = QueryEmbeddingCache("all-mpnet-base-v2", cache_client=redis_tier)
+
+    writer.put("fantasy with dragons", vector_fixture)
+
+    # Assertions
+    stored = next(iter(redis_tier.store.values()))
+    assert stored == vector_fixture.tobytes(), "Redis should hold raw float32 bytes"
+    assert np.array_equal(reader.get("fantasy with dragons"), vector_fixture)
+    assert reader.metrics()["redis_hits"] == 1
+    assert (
+        other_model.get("fantasy with dragons") is None
+    ), "Keys must include the model"
+
+
+@pytest.mark.asyncio
+async def test_get_or_embed_encodes_once(vector_fixture):
+    cache = QueryEmbeddingCache("all-MiniLM-L6-v2")
+    calls = []
+
+    async def embed(text):
+        calls.append(text)
+        return vector_fixture
+
+    first = await cache.get_or_embed("space opera", embed)
+    second = await cache.get_or_embed("Space Opera", embed)
+
+    # Assertions
+    assert calls == ["space opera"], "A cached query should not be re-encoded"
+    assert np.array_equal(first, second)
+
+
+@pytest.mark.asyncio
+async def test_async_lookups_share_the_redis_tier(vector_fixture):
+    client = InMemoryCacheClient()
+    writer = QueryEmbeddingCache("all-MiniLM-L6-v2", cache_client=client)
+    reader = QueryEmbeddingCache("all-MiniLM-L6-v2", cache_client=client)
+
+    await writer.aput("Fantasy with dragons", vector_fixture)
+    found = await reader.aget("fantasy with dragons")
+    missing = await reader.aget("space opera")
+
+    # Assertions
+    assert np.array_equal(found, vector_fixture)
+    assert missing is None
+    assert reader.metrics()["redis_hits"] == 1 and reader.metrics()["misses"] == 1
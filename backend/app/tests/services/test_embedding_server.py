@@ -0,0 +1,83 @@
+# tests/services/test_embedding_server.py
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_server import (
+    EmbeddingClient,
+    EmbeddingServer,
+    EmbeddingServerError,
+)
+
+
+def fake_encode(texts):
+    """Encodes each text as [len(text), 1, 2, 3]; "slow" sleeps, "fail" raises."""
+    if "fail" in texts:
+        raise ValueError("encoder crashed")
+    if "slow" in texts:
+        time.sleep(0.5)
+    return np.array([[len(text), 1, 2, 3] for text in texts], dtype=np.float32)
+
+
+@pytest_asyncio.fixture
+async def server_fixture(tmp_path):
+    batcher = EmbeddingBatcher(fake_encode, max_batch_size=16, max_wait_ms=20)
+    server = EmbeddingServer(batcher, tmp_path / "embed.sock")
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_client_embeds_through_server(server_fixture):
+    client = EmbeddingClient(server_fixture.socket_path)
+
+    single = await client.embed("dune")
+    batch = await client.embed_batch(["emma", "it"])
+
+    # Assertions
+    assert single.shape == (1, 4) and single[0, 0] == 4
+    assert batch.shape == (2, 4) and batch[:, 0].tolist() == [4, 2]
+    assert client.metrics()["requests"] == 2
+    assert client.metrics()["pooled_connections"] == 1, "Connections are reused"
+    await client.stop()
+
+
+@pytest.mark.asyncio
+async def test_requests_from_all_workers_share_batches(server_fixture):
+    workers = [EmbeddingClient(server_fixture.socket_path) for _ in range(4)]
+
+    await asyncio.gather(
+        *(client.embed(f"query {i}") for i in range(8) for client in workers)
+    )
+    metrics = await workers[0].server_metrics()
+
+    # Assertions
+    assert metrics["queries"] == 32
+    assert metrics["mean_batch_size"] > 1, "Workers' queries should share batches"
+    for client in workers:
+        await client.stop()
+
+
+@pytest.mark.asyncio
+async def test_client_errors_and_timeouts(server_fixture, tmp_path):
+    client = EmbeddingClient(server_fixture.socket_path, timeout=0.2)
+
+    with pytest.raises(EmbeddingServerError, match="encoder crashed"):
+        await client.embed("fail")
+    with pytest.raises(EmbeddingServerError, match="timed out"):
+        await client.embed("slow")
+    await asyncio.sleep(0.5)  # Let the server finish the slow batch
+    recovered = await client.embed("dune")
+    with pytest.raises(EmbeddingServerError, match="unavailable"):
+        await EmbeddingClient(tmp_path / "missing.sock").embed("dune")
+
+    # Assertions
+    assert recovered[0, 0] == 4, "A fresh connection replaces the timed-out one"
+    assert client.metrics()["timeouts"] == 1
+    await client.stop()
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+import torch
+from sentence_transformers import SentenceTransformer, models
+from transformers import BertConfig, BertModel, BertTokenizer
+
+from app.services.encoders import (
+    OnnxEncoder,
+    check_encoder_parity,
+    export_onnx_encoder,
+    load_query_encoder,
+    pool_token_embeddings,
+)
+
+QUERIES = ["fantasy with dragons", "history of rome", "books about money and habits"]
+
+
+@pytest.fixture
+def tiny_model(tmp_path):
+    """A small randomly initialized BERT sentence encoder, built without downloads."""
+    words = "fantasy with dragons history of rome books about money and habits"
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + sorted(set(words.split()))
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab))
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        intermediate_size=64,
+    )
+    model_dir = tmp_path / "tiny-bert"
+    BertModel(config).save_pretrained(model_dir)
+    BertTokenizer(str(vocab_file)).save_pretrained(model_dir)
+
+    transformer = models.Transformer(str(model_dir), max_seq_length=32)
+    pooling = models.Pooling(transformer.get_word_embedding_dimension(), "mean")
+    return SentenceTransformer(
+        modules=[transformer, pooling, models.Normalize()], device="cpu"
+    )
+
+
+def test_pool_token_embeddings_ignores_padding():
+    tokens = np.array([[[1.0, 1.0], [3.0, 3.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+
+    # Assertions
+    assert np.allclose(pool_token_embeddings(tokens, mask, "mean"), [[2.0, 2.0]])
+    assert np.allclose(pool_token_embeddings(tokens, mask, "max"), [[3.0, 3.0]])
+    assert np.allclose(pool_token_embeddings(tokens, mask, "cls"), [[1.0, 1.0]])
+
+
+def test_torch_int8_encoder_matches_reference(tiny_model):
+    quantized = torch.quantization.quantize_dynamic(
+        tiny_model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    report = check_encoder_parity(tiny_model, quantized, QUERIES, threshold=0.95)
+
+    # Assertions
+    assert report["passed"], report
+    assert report["texts"] == len(QUERIES)
+
+
+def test_onnx_encoder_matches_reference(tiny_model, tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    artifact_dir = export_onnx_encoder(
+        "tiny-bert", tmp_path / "onnx", quantize=True, model=tiny_model
+    )
+
+    fp32 = check_encoder_parity(tiny_model, OnnxEncoder(artifact_dir), QUERIES)
+    int8 = check_encoder_parity(
+        tiny_model, OnnxEncoder(artifact_dir, quantized=True), QUERIES, threshold=0.95
+    )
+    batch = OnnxEncoder(artifact_dir).encode(QUERIES, batch_size=2)
+
+    # Assertions
+    assert fp32["min_cosine"] > 0.9999, fp32
+    assert int8["passed"], int8
+    assert batch.shape == (3, 32) and np.allclose(np.linalg.norm(batch, axis=1), 1.0)
+
+
+def test_unknown_encoder_backend_raises():
+    with pytest.raises(ValueError, match="Unknown query encoder backend"):
+        load_query_encoder("tensorrt")
@@ -0,0 +1,110 @@
+import asyncio
+
+import numpy as np
+import pytest
+from starlette.datastructures import State
+
+from app.services.index_reload import IndexReloader, corpus_version
+from app.services.semantic_search import SearchEngine
+
+
+class ClosableIndex:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_engine(version, num_books=3):
+    rng = np.random.default_rng(len(version))
+    engine = SearchEngine.from_embeddings(
+        rng.normal(size=(num_books, 8)).astype(np.float32),
+        [{"book_id": f"/works/{i}", "title": f"Book {i}"} for i in range(num_books)],
+    )
+    engine.version = version
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_reload_swaps_engine_and_reports_version():
+    engines = iter([make_engine("v1"), make_engine("v2", num_books=5)])
+    state = State()
+    reloader = IndexReloader(state, loader=lambda: next(engines), retire_delay=0)
+
+    await reloader.reload("startup")
+    first = state.search_engine
+    status = await reloader.reload("admin")
+
+    # Assertions
+    assert first.version == "v1"
+    assert state.search_engine.version == "v2"
+    assert state.books_metadata is state.search_engine.books_metadata
+    assert status["version"] == "v2" and status["books"] == 5
+    assert status["last_error"] is None and not status["reloading"]
+
+
+@pytest.mark.asyncio
+async def test_failed_reload_keeps_current_engine():
+    def failing_loader():
+        raise ValueError("corrupt index")
+
+    state = State()
+    state.search_engine = make_engine("v1")
+    reloader = IndexReloader(state, loader=failing_loader)
+
+    with pytest.raises(ValueError):
+        await reloader.reload("admin")
+
+    # Assertions
+    assert state.search_engine.version == "v1"
+    assert reloader.status()["last_error"] == "corrupt index"
+
+
+@pytest.mark.asyncio
+async def test_replaced_engine_is_retired():
+    old = make_engine("v1")
+    old.index = ClosableIndex()
+    state = State()
+    state.search_engine = old
+    reloader = IndexReloader(state, loader=lambda: make_engine("v2"), retire_delay=0)
+
+    await reloader.reload("admin")
+    await asyncio.sleep(0.01)
+
+    # Assertions
+    assert old.index.closed
+
+
+def test_corpus_version_tracks_file_changes(tmp_path):
+    path = tmp_path / "book_metadata.json"
+    path.write_text("[]")
+    before = corpus_version([path])
+    path.write_text("[{}]")
+
+    # Assertions
+    assert corpus_version([path]) != before
+    assert corpus_version([tmp_path / "missing.json"]) == corpus_version([])
+
+
+def test_load_search_engine_reloads_files_changed_while_loading(monkeypatch):
+    from app.services import index_reload
+
+    versions = iter(["v1", "v2", "v2", "v2"])
+    built = []
+
+    def build(version):
+        built.append(make_engine(version))
+        built[-1].index = ClosableIndex()
+        return built[-1]
+
+    monkeypatch.setattr(index_reload, "corpus_version", lambda files: next(versions))
+    monkeypatch.setattr(index_reload, "_build_search_engine", build)
+
+    engine = index_reload.load_search_engine()
+
+    # Assertions
+    assert [b.version for b in built] == ["v1", "v2"]
+    assert engine is built[1]
+    assert built[0].index.closed
+    assert not engine.index.closed
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from app.services.lexical_search import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+@pytest.fixture
+def books_metadata_fixture():
+    return [
+        {
+            "title": "hunter x hunter",
+            "author": "yoshihiro togashi",
+            "subjects": "manga",
+        },
+        {"title": "warriors into wild", "author": "erin hunter", "subjects": "cat"},
+        {
+            "title": "the hunger games",
+            "author": "suzanne collins",
+            "subjects": "dystopia",
+        },
+        {"title": "fire and ice", "author": "erin hunter", "subjects": "cat, fantasy"},
+        {"title": "the hobbit", "author": "j r r tolkien", "subjects": "fantasy"},
+    ]
+
+
+def test_tokenize():
+    assert tokenize("Hunter x Hunter: Vol. 1!") == ["hunter", "x", "hunter", "vol", "1"]
+
+
+def test_bm25_ranks_exact_title_and_author_matches(books_metadata_fixture):
+    index = BM25Index.build(books_metadata_fixture)
+
+    title_rows, title_scores = index.search("hunter x hunter", k=3)
+    author_rows, _ = index.search("erin hunter", k=2)
+    filtered_rows, _ = index.search("erin hunter", k=5, rows=np.array([0, 3, 4]))
+
+    # Assertions
+    assert title_rows[0] == 0, "The exact title should rank first"
+    assert np.all(np.diff(title_scores) <= 0), "Scores should be in descending order"
+    assert sorted(author_rows.tolist()) == [1, 3]
+    assert filtered_rows.tolist()[0] == 3 and 1 not in filtered_rows
+    assert index.search("zebra", k=3)[0].size == 0, "Unknown terms match nothing"
+
+
+def test_bm25_normalizes_queries_like_the_indexed_fields(books_metadata_fixture):
+    index = BM25Index.build(books_metadata_fixture)
+
+    rows, _ = index.search("The Cats of Fantasy", k=5)
+
+    # Assertions
+    assert sorted(rows.tolist()) == [1, 3, 4], "Plurals and stopwords should not matter"
+
+
+def test_bm25_postings_are_array_backed(books_metadata_fixture):
+    index = BM25Index.build(books_metadata_fixture)
+    term = index.vocabulary["hunter"]
+    postings = index.doc_ids[index.offsets[term] : index.offsets[term + 1]]
+
+    # Assertions
+    assert postings.tolist() == [0, 1, 3]
+    assert index.doc_ids.dtype == np.int32 and index.impacts.dtype == np.float32
+    assert index.offsets[-1] == len(index.doc_ids)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    rows, scores = reciprocal_rank_fusion(
+        [np.array([1, 2, 3]), np.array([3, 4, 1])], k=3, rrf_k=60
+    )
+
+    # Assertions
+    assert rows.tolist()[:2] == [1, 3], "Rows in both rankings should come first"
+    assert np.isclose(scores[0], 1 / 61 + 1 / 63)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from app.services.metadata_filter import (
+    MetadataIndex,
+    filter_key,
+    normalize_filter_value,
+)
+
+
+@pytest.fixture
+def books_metadata_fixture():
+    return [
+        {"author": "erin hunter", "subjects": "fantasy, cat", "year": "2003"},
+        {"author": "j k rowling", "subjects": "fantasy, magic", "year": "1997"},
+        {"author": "erin hunter", "subjects": "cat", "year": "2010"},
+        {"author": "mary beard", "subjects": "history, rome", "year": ""},
+        {"author": "", "subjects": "", "year": "2015"},
+        {"author": "", "subjects": "history science", "year": ""},
+    ]
+
+
+@pytest.mark.parametrize(
+    "filters,expected",
+    [
+        ({}, None),
+        ({"author": "Erin Hunter"}, [0, 2]),
+        ({"subjects": ["fantasy"]}, [0, 1]),
+        ({"subjects": ["rome", "magic"]}, [1, 3]),
+        ({"year_min": 2000}, [0, 2, 4]),
+        ({"year_min": 1997, "year_max": 2003}, [0, 1]),
+        ({"year_min": 2000, "subjects": ["fantasy"]}, [0]),
+        ({"author": "erin hunter", "year_max": 2005, "subjects": ["cat"]}, [0]),
+        ({"author": "unknown author"}, []),
+        ({"subjects": ["poetry"]}, []),
+        # Filter values and stored fields share one key: plurals folded, no stopwords.
+        ({"subjects": ["Cats"]}, [0, 2]),
+        ({"subjects": ["History of Science"]}, [5]),
+    ],
+)
+def test_filter_rows(filters, expected, books_metadata_fixture):
+    index = MetadataIndex.build(books_metadata_fixture)
+    rows = index.filter_rows(**filters)
+
+    # Assertions
+    if expected is None:
+        assert rows is None, "No filters should mean no restriction"
+    else:
+        assert rows.tolist() == expected
+
+
+def test_metadata_index_is_compact(books_metadata_fixture):
+    index = MetadataIndex.build(books_metadata_fixture * 100)
+
+    # Assertions
+    assert index.subject_bitmaps["fantasy"].nbytes == 75, "One bit per book"
+    assert index.author_rows["erin hunter"].dtype == np.int32
+    assert np.all(np.diff(index.years) >= 0), "Years should be sorted"
+    assert normalize_filter_value("  J.K. Rowling ") == "jk rowling"
+    assert filter_key("The Stories of Cats") == filter_key("story cat") == "story cat"
@@ -0,0 +1,119 @@
+# tests/services/test_result_cache.py
+
+import json
+
+import numpy as np
+import pytest
+
+from app.services import result_cache as result_cache_module
+from app.services.result_cache import SemanticResultCache
+
+CHUNKS = ['data: [{"title": "Yu Yu Hakusho"}]\n\n', 'data: {"done": true}\n\n']
+
+
+class InMemoryCacheClient:
+    """Stands in for CacheClient's JSON get/set methods."""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        data = self.store.get(key)
+        return json.loads(data) if data else None
+
+    def set(self, key, value, ttl=None):
+        self.store[key] = json.dumps(value)
+        return True
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def cache_fixture():
+    return SemanticResultCache("all-MiniLM-L6-v2", InMemoryCacheClient(), threshold=0.9)
+
+
+@pytest.mark.asyncio
+async def test_near_identical_query_replays_answer(cache_fixture):
+    await cache_fixture.put(
+        "books like hunter x hunter", unit(1, 0.1, 0), "v1:{}", CHUNKS
+    )
+
+    hit = await cache_fixture.lookup(unit(1, 0.15, 0.05).reshape(1, -1), "v1:{}")
+
+    # Assertions
+    assert hit["chunks"] == CHUNKS
+    assert hit["query"] == "books like hunter x hunter"
+    assert hit["similarity"] > 0.9
+    assert await cache_fixture.lookup(unit(0, 1, 0), "v1:{}") is None
+    assert cache_fixture.metrics()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_only_match_within_scope(cache_fixture):
+    await cache_fixture.put("space opera", unit(1, 0, 0), "v1:{}", CHUNKS)
+
+    # Assertions
+    assert await cache_fixture.lookup(unit(1, 0, 0), 'v1:{"year_min": 2000}') is None
+    assert await cache_fixture.lookup(unit(1, 0, 0), "v2:{}") is None
+
+
+@pytest.mark.asyncio
+async def test_expired_and_evicted_entries_miss(cache_fixture, monkeypatch):
+    await cache_fixture.put("space opera", unit(1, 0, 0), "v1:{}", CHUNKS)
+    await cache_fixture.put("cozy mystery", unit(0, 1, 0), "v1:{}", CHUNKS)
+    cache_fixture.cache_client.store.clear()  # Redis evicted the stored stream
+
+    # Assertions
+    assert await cache_fixture.lookup(unit(1, 0, 0), "v1:{}") is None
+    now = result_cache_module.time.time()
+    monkeypatch.setattr(
+        result_cache_module.time, "time", lambda: now + cache_fixture.ttl + 1
+    )
+    assert cache_fixture.metrics()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entry_is_evicted():
+    cache = SemanticResultCache("model", InMemoryCacheClient(), max_entries=2)
+    await cache.put("first", unit(1, 0, 0), "v1:{}", CHUNKS)
+    await cache.put("second", unit(0, 1, 0), "v1:{}", CHUNKS)
+    await cache.lookup(unit(1, 0, 0), "v1:{}")  # "second" is now least recently used
+    await cache.put("third", unit(0, 0, 1), "v1:{}", CHUNKS)
+
+    # Assertions
+    assert await cache.lookup(unit(1, 0, 0), "v1:{}") is not None
+    assert await cache.lookup(unit(0, 1, 0), "v1:{}") is None
+    assert await cache.lookup(unit(0, 0, 1), "v1:{}") is not None
+
+
+@pytest.mark.asyncio
+async def test_record_stores_completed_streams_only(cache_fixture):
+    async def stream():
+        for chunk in CHUNKS:
+            yield chunk
+
+    async def failing_stream():
+        yield CHUNKS[0]
+        raise RuntimeError("LLM API error")
+
+    recorded = [
+        chunk
+        async for chunk in cache_fixture.record(
+            stream(), "space opera", unit(1, 0, 0), "v1:{}"
+        )
+    ]
+    with pytest.raises(RuntimeError):
+        async for _ in cache_fixture.record(
+            failing_stream(), "cozy mystery", unit(0, 1, 0), "v1:{}"
+        ):
+            pass
+    replayed = [chunk async for chunk in cache_fixture.replay(recorded)]
+
+    # Assertions
+    assert recorded == CHUNKS and replayed == CHUNKS
+    assert await cache_fixture.lookup(unit(1, 0, 0), "v1:{}") is not None
+    assert await cache_fixture.lookup(unit(0, 1, 0), "v1:{}") is None
@@ -6,7 +6,22 @@ from app.services.semantic_search import (
     create_vector_embedding,
     calculate_similarity_scores,
     get_top_k_books,
+    select_top_k,
+    normalize_embeddings,
+    load_vector_index,
+    save_vector_index,
+    FlatIndex,
+    IVFFlatIndex,
+    Int8Index,
+    BinaryIndex,
+    FieldIndex,
+    PassageIndex,
+    ProjectedIndex,
+    SearchEngine,
+    VECTOR_INDEX_BACKENDS,
+    fit_projection,
 )
+from app.services.lexical_search import BM25Index
 
 
 @pytest.fixture
@@ -176,3 +191,448 @@ def test_get_top_k_books(query, books_metadata, k, setup_fixture):
     assert all(
         isinstance(book, dict) for book in top_books
     ), "Each item should be a dictionary"
+
+
+@pytest.mark.parametrize(
+    "scores,k,expected",
+    [
+        (np.array([0.1, 0.9, 0.3, 0.7, 0.5], dtype=np.float32), 3, [1, 3, 4]),
+        (np.array([0.2, 0.1], dtype=np.float32), 5, [0, 1]),
+        (np.array([0.4, 0.8, 0.6], dtype=np.float32), 0, []),
+    ],
+)
+def test_select_top_k(scores, k, expected):
+    top_indices = select_top_k(scores, k)
+
+    # Assertions
+    assert list(top_indices) == expected, "Indices should be the top-k in score order"
+
+
+def test_search_engine_matches_cosine_similarity():
+    rng = np.random.default_rng(0)
+    document_embeddings = rng.normal(size=(50, 16)).astype(np.float32)
+    books_metadata = [{"title": f"book {i}"} for i in range(50)]
+    query_embedding = rng.normal(size=(1, 16)).astype(np.float32)
+
+    engine = SearchEngine.from_embeddings(document_embeddings, books_metadata)
+    top_indices, top_scores = engine.search(query_embedding, k=5)
+
+    # Reference ranking computed with the original torch-based path
+    reference = calculate_similarity_scores(query_embedding, document_embeddings)
+    reference_books = get_top_k_books(reference, books_metadata, k=5)
+
+    # Assertions
+    assert [books_metadata[i] for i in top_indices] == reference_books
+    assert np.allclose(
+        top_scores, reference[0].numpy()[top_indices], atol=1e-5
+    ), "Scores should match cosine similarity"
+    assert np.all(np.diff(top_scores) <= 0), "Scores should be in descending order"
+
+    results = engine.top_k_books(query_embedding, k=5)
+    assert all(
+        isinstance(book, dict) and isinstance(score, float) for book, score in results
+    ), "Each result should be a (book, score) pair"
+
+
+@pytest.fixture
+def clustered_embeddings_fixture():
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(8, 24))
+    points = centers[rng.integers(0, 8, size=400)] + 0.3 * rng.normal(size=(400, 24))
+    return normalize_embeddings(points)
+
+
+def test_ivf_index_full_probe_matches_exact(clustered_embeddings_fixture):
+    embeddings = clustered_embeddings_fixture
+    exact = FlatIndex.build(embeddings)
+    ivf = IVFFlatIndex.build(embeddings, nlist=8, nprobe=2)
+
+    query = embeddings[3]
+    exact_rows, exact_scores = exact.search(query, 10)
+    ivf_rows, ivf_scores = ivf.search(query, 10, nprobe=8)
+
+    # Assertions
+    assert list(ivf_rows) == list(exact_rows), "Probing every list should be exact"
+    assert np.allclose(ivf_scores, exact_scores, atol=1e-6)
+    assert np.allclose(ivf.reconstruct(ivf_rows), embeddings[ivf_rows])
+
+
+def test_ivf_index_recall(clustered_embeddings_fixture):
+    embeddings = clustered_embeddings_fixture
+    exact = FlatIndex.build(embeddings)
+    ivf = IVFFlatIndex.build(embeddings, nlist=8, nprobe=3)
+
+    hits = 0
+    for row in range(0, 400, 20):
+        exact_rows, _ = exact.search(embeddings[row], 5)
+        ivf_rows, _ = ivf.search(embeddings[row], 5)
+        hits += len(set(exact_rows) & set(ivf_rows))
+
+    # Assertions
+    assert hits / (20 * 5) >= 0.9, "IVF recall@5 should be close to exact search"
+
+
+@pytest.mark.parametrize("backend", ["exact", "ivf", "int8", "binary"])
+def test_vector_index_save_and_load(backend, tmp_path, clustered_embeddings_fixture):
+    embeddings = clustered_embeddings_fixture
+    index_class = VECTOR_INDEX_BACKENDS[backend]
+    index = index_class.build(embeddings)
+    index_path = tmp_path / f"{backend}_index"
+    index.save(index_path)
+
+    loaded = load_vector_index(backend, embeddings, index_path=index_path)
+
+    # Assertions
+    assert isinstance(loaded, index_class)
+    assert len(loaded) == len(embeddings)
+    assert list(loaded.search(embeddings[0], 5)[0]) == list(
+        index.search(embeddings[0], 5)[0]
+    )
+
+
+@pytest.mark.parametrize("index_class,shortlist", [(Int8Index, 20), (BinaryIndex, 60)])
+def test_quantized_index_reranks_to_exact_top_k(
+    index_class, shortlist, clustered_embeddings_fixture
+):
+    embeddings = clustered_embeddings_fixture
+    exact = FlatIndex.build(embeddings)
+    quantized = index_class.build(embeddings, shortlist=shortlist)
+
+    hits = 0
+    for row in range(0, 400, 20):
+        exact_rows, exact_scores = exact.search(embeddings[row], 5)
+        rows, scores = quantized.search(embeddings[row], 5)
+        hits += len(set(exact_rows) & set(rows))
+        # Re-ranked scores are exact float32 cosine scores.
+        assert np.allclose(scores, embeddings[rows] @ embeddings[row], atol=1e-6)
+
+    # Assertions
+    assert hits / (20 * 5) >= 0.95, "Re-ranked top-5 should match exact search"
+    assert quantized.codes.nbytes < embeddings.nbytes / 3, "Codes should be compact"
+
+
+def test_load_vector_index_rebuilds_index_of_other_embeddings(
+    tmp_path, clustered_embeddings_fixture
+):
+    embeddings = clustered_embeddings_fixture
+    index_path = tmp_path / "ivf_index"
+    save_vector_index(IVFFlatIndex.build(embeddings, nlist=4), index_path, source="a")
+
+    reused = load_vector_index("ivf", embeddings, index_path, source="a", nlist=8)
+    rebuilt = load_vector_index("ivf", embeddings, index_path, source="b", nlist=8)
+
+    # Assertions
+    assert len(reused.centroids) == 4
+    assert len(rebuilt.centroids) == 8, "A stale prebuilt index should be rebuilt"
+
+
+def test_load_vector_index_rejects_unknown_backend(clustered_embeddings_fixture):
+    with pytest.raises(ValueError):
+        load_vector_index("hnsw", clustered_embeddings_fixture)
+
+
+@pytest.mark.parametrize("backend", ["exact", "ivf", "int8", "binary"])
+def test_filtered_search_scores_only_matching_rows(
+    backend, clustered_embeddings_fixture
+):
+    embeddings = clustered_embeddings_fixture
+    books_metadata = [
+        {
+            "title": f"book {i}",
+            "author": "erin hunter" if i % 10 == 0 else f"author {i % 7}",
+            "subjects": "fantasy, cats" if i % 3 == 0 else "history",
+            "year": str(1980 + i % 40),
+        }
+        for i in range(len(embeddings))
+    ]
+    engine = SearchEngine(
+        VECTOR_INDEX_BACKENDS[backend].build(embeddings), books_metadata
+    )
+    filters = {"year_min": 2000, "subjects": ["Fantasy"]}
+
+    rows, scores = engine.search(embeddings[0], k=5, filters=filters)
+    matching = np.array(
+        [i for i in range(len(embeddings)) if i % 3 == 0 and 1980 + i % 40 >= 2000]
+    )
+    expected = matching[select_top_k(embeddings[matching] @ embeddings[0], 5)]
+
+    # Assertions
+    assert list(rows) == list(expected), "Filtered search should be exact over matches"
+    assert np.allclose(scores, embeddings[rows] @ embeddings[0], atol=1e-6)
+    assert engine.search(embeddings[0], k=5, filters={"author": "nobody"})[0].size == 0
+
+
+def test_hybrid_search_surfaces_exact_title_match():
+    rng = np.random.default_rng(2)
+    embeddings = normalize_embeddings(rng.normal(size=(200, 16)))
+    books_metadata = [
+        {"title": f"generic novel {i}", "author": f"writer {i}", "subjects": "fiction"}
+        for i in range(200)
+    ]
+    books_metadata[137] = {
+        "title": "hunter x hunter",
+        "author": "yoshihiro togashi",
+        "subjects": "manga",
+    }
+    engine = SearchEngine(
+        FlatIndex.build(embeddings),
+        books_metadata,
+        lexical_index=BM25Index.build(books_metadata),
+    )
+    query = embeddings[0]
+
+    vector_rows, _ = engine.search(query, k=3)
+    hybrid_rows, _ = engine.search(query, k=3, query_text="hunter x hunter")
+
+    # Assertions
+    assert 137 not in vector_rows, "Pure vector search misses the title"
+    assert 137 in hybrid_rows, "Hybrid retrieval should surface the exact title"
+    assert set(hybrid_rows[:2]) == {0, 137}, "Each ranking's best row leads the fusion"
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000])
+def test_search_batch_matches_single_query_search(
+    chunk_size, clustered_embeddings_fixture
+):
+    embeddings = clustered_embeddings_fixture
+    index = FlatIndex(embeddings, chunk_size=chunk_size)
+    queries = embeddings[[0, 13, 250]]
+
+    batch = index.search_batch(queries, 6)
+
+    # Assertions
+    for query, (rows, scores) in zip(queries, batch):
+        expected_rows, expected_scores = index.search(query, 6)
+        assert list(rows) == list(expected_rows)
+        assert np.allclose(scores, expected_scores, atol=1e-6)
+
+
+@pytest.fixture
+def low_rank_embeddings_fixture():
+    rng = np.random.default_rng(5)
+    basis = np.linalg.qr(rng.normal(size=(32, 8)))[0]
+    return normalize_embeddings(rng.normal(size=(300, 8)) @ basis.T)
+
+
+@pytest.mark.parametrize("method", ["pca", "truncate"])
+def test_fit_projection_has_orthonormal_columns(method, low_rank_embeddings_fixture):
+    projection = fit_projection(low_rank_embeddings_fixture, 8, method)
+
+    # Assertions
+    assert projection.shape == (32, 8)
+    assert np.allclose(projection.T @ projection, np.eye(8), atol=1e-5)
+    with pytest.raises(ValueError):
+        fit_projection(low_rank_embeddings_fixture, 32, method)
+
+
+def test_pca_projected_index_preserves_rankings(low_rank_embeddings_fixture):
+    embeddings = low_rank_embeddings_fixture
+    exact = FlatIndex.build(embeddings)
+    # The corpus spans an 8-d subspace, so an 8-d PCA projection loses nothing.
+    projected = ProjectedIndex.build(embeddings, dim=8, method="pca")
+    queries = embeddings[[0, 42, 299]]
+
+    # Assertions
+    for query, (rows, scores) in zip(queries, projected.search_batch(queries, 5)):
+        exact_rows, exact_scores = exact.search(query, 5)
+        assert list(rows) == list(exact_rows)
+        assert np.allclose(scores, exact_scores, atol=1e-4)
+    assert projected.reconstruct(np.array([0])).shape == (1, 8)
+
+
+@pytest.mark.parametrize("backend", ["exact", "int8"])
+def test_projected_index_save_and_load(backend, tmp_path, clustered_embeddings_fixture):
+    embeddings = clustered_embeddings_fixture
+    index = ProjectedIndex.build(embeddings, dim=12, backend=backend)
+    index_path = tmp_path / f"{backend}_pca12_index"
+    index.save(index_path)
+
+    loaded = load_vector_index(backend, embeddings, index_path=index_path, dim=12)
+    rows = np.arange(0, 400, 3)
+
+    # Assertions
+    assert isinstance(loaded, ProjectedIndex)
+    assert isinstance(loaded.index, VECTOR_INDEX_BACKENDS[backend])
+    assert np.allclose(loaded.projection, index.projection)
+    assert list(loaded.search(embeddings[0], 5)[0]) == list(
+        index.search(embeddings[0], 5)[0]
+    )
+    assert list(loaded.search_rows(embeddings[0], rows, 5)[0]) == list(
+        index.search_rows(embeddings[0], rows, 5)[0]
+    )
+
+
+def test_passage_index_max_pools_each_book(clustered_embeddings_fixture):
+    passages = clustered_embeddings_fixture[:10]
+    # Book 1 has no description; book 3 has a single passage.
+    offsets = np.array([0, 4, 4, 9, 10])
+    index = PassageIndex(passages, offsets, chunk_size=3, query_block=2)
+    queries = clustered_embeddings_fixture[[5, 100, 200]]
+
+    scores = index.book_scores_batch(queries)
+
+    # Assertions
+    assert scores.shape == (3, 4)
+    for query, book_scores in zip(queries, scores):
+        expected = [
+            (passages[a:b] @ query).max() if b > a else -np.inf
+            for a, b in zip(offsets[:-1], offsets[1:])
+        ]
+        assert np.allclose(book_scores, expected, atol=1e-6)
+    assert np.isneginf(scores[:, 1]).all()
+    assert np.allclose(index.book_scores(queries[0]), scores[0])
+    with pytest.raises(ValueError):
+        PassageIndex(passages, np.array([0, 4, 12]))
+
+
+def test_passage_index_loads_offsets_stored_in_its_file(tmp_path):
+    from app.pipelines.load import finalize_embedding_index, save_embedding_index
+
+    passages = normalize_embeddings(np.random.default_rng(1).normal(size=(5, 8)))
+    save_embedding_index(passages, tmp_path / "passages.bin", "fake-model", True)
+    with pytest.raises(ValueError, match="no passage offsets"):
+        PassageIndex.load(tmp_path / "passages.bin")
+    finalize_embedding_index(tmp_path / "passages.bin", np.array([0, 2, 2, 5]))
+
+    index = PassageIndex.load(tmp_path / "passages.bin")
+
+    # Assertions
+    assert index.offsets.tolist() == [0, 2, 2, 5]
+    assert np.allclose(index.embeddings, passages)
+
+
+def test_search_engine_finds_book_through_description_passage(
+    clustered_embeddings_fixture,
+):
+    embeddings = clustered_embeddings_fixture[:50]
+    books_metadata = [{"title": f"Book {i}"} for i in range(50)]
+    # Book 30's second passage matches the query, though its book vector does not.
+    query = clustered_embeddings_fixture[399]
+    passages = np.stack([embeddings[30], query, embeddings[31]])
+    offsets = np.array([0] * 31 + [2] * 1 + [3] * 19)
+    passage_index = PassageIndex(passages, offsets)
+    engine = SearchEngine(
+        FlatIndex(embeddings), books_metadata, passage_index=passage_index
+    )
+    plain = SearchEngine(FlatIndex(embeddings), books_metadata)
+
+    rows, scores = engine.search(query, 3)
+    batch_rows, batch_scores = engine.search_batch(query[np.newaxis, :], 3)[0]
+    filtered_rows, _ = engine.search(query, 3, filters={"author": "nobody"})
+
+    # Assertions
+    assert 30 not in plain.search(query, 3)[0]
+    assert rows[0] == 30 and np.isclose(scores[0], 1.0, atol=1e-5)
+    assert list(batch_rows) == list(rows) and np.allclose(batch_scores, scores)
+    assert len(filtered_rows) == 0, "Passages must respect metadata filters"
+    # Books keep their own vector score when it beats their passages.
+    assert np.allclose(
+        np.sort(scores[1:]), np.sort(plain.search(query, 3)[1][:2]), atol=1e-6
+    )
+
+
+def test_passage_search_scores_only_vector_candidates(clustered_embeddings_fixture):
+    embeddings = clustered_embeddings_fixture[:50]
+    books_metadata = [{"title": f"Book {i}"} for i in range(50)]
+    query = clustered_embeddings_fixture[399]
+    passages = np.stack([embeddings[30], query, embeddings[31]])
+    offsets = np.array([0] * 31 + [2] * 1 + [3] * 19)
+    passage_index = PassageIndex(passages, offsets)
+    candidates = FlatIndex(embeddings).search(query, 5)[0]
+    bounded = SearchEngine(
+        FlatIndex(embeddings),
+        books_metadata,
+        passage_index=passage_index,
+        passage_candidates=5,
+    )
+
+    rows = bounded.search(query, 3)[0]
+    candidate_scores = passage_index.book_scores_rows(query, np.array([31, 30, 0]))
+
+    # Assertions
+    assert 30 not in candidates and 30 not in rows, "Only candidates' passages count"
+    assert np.allclose(
+        candidate_scores, passage_index.book_scores(query)[[31, 30, 0]], atol=1e-6
+    )
+
+
+def test_field_index_fuses_passage_scores_as_the_book_score(
+    clustered_embeddings_fixture,
+):
+    books = clustered_embeddings_fixture[:40]
+    fields = clustered_embeddings_fixture[40:160]
+    index = FieldIndex(fields, books)
+    query = clustered_embeddings_fixture[300]
+    rows = np.arange(40)
+    passage_scores = np.full(40, -np.inf, dtype=np.float32)
+    passage_scores[7] = 1.0
+
+    weights = {"book": 1.0, "title": 1.0}
+    plain = index.scores_batch(query[np.newaxis, :], weights, rows)[0]
+    pooled = index.scores_batch(
+        query[np.newaxis, :], weights, rows, passage_scores[np.newaxis, :]
+    )[0]
+
+    # Assertions
+    assert np.isclose(pooled[7], (1.0 + fields[7] @ query) / 2, atol=1e-6)
+    assert np.allclose(np.delete(pooled, 7), np.delete(plain, 7), atol=1e-6)
+
+
+def test_field_index_fuses_weighted_field_scores(clustered_embeddings_fixture):
+    books = clustered_embeddings_fixture[:40]
+    fields = clustered_embeddings_fixture[40:160]  # title, author, subjects blocks
+    present = np.ones(120, dtype=bool)
+    present[40 + 7] = False  # Book 7 has no author.
+    index = FieldIndex(fields, books, present, chunk_size=9)
+    queries = clustered_embeddings_fixture[[300, 350]]
+    weights = {"book": 1.0, "title": 2.0, "author": 1.0}
+
+    scores = index.scores_batch(queries, weights)
+    rows = np.array([3, 7, 21])
+
+    # Assertions
+    blocks = fields.reshape(3, 40, -1) @ queries.T
+    blocks[1, 7] = 0.0
+    totals = np.full(40, 4.0)
+    totals[7] = 3.0  # Book 7's weights are renormalized over the fields it has.
+    expected = (books @ queries.T + 2.0 * blocks[0] + blocks[1]).T / totals
+    assert np.allclose(scores, expected, atol=1e-5)
+    assert np.allclose(index.scores_batch(queries, weights, rows), expected[:, rows])
+    top_rows, top_scores = index.search(queries[0], 5, weights, rows)
+    assert set(top_rows) == set(rows) and np.all(np.diff(top_scores) <= 0)
+    for bad in ({"year": 1.0}, {"book": 0.0}, {"title": -1.0}):
+        with pytest.raises(ValueError):
+            index.weight_vector(bad)
+
+
+def test_search_engine_applies_per_request_field_weights(clustered_embeddings_fixture):
+    books = clustered_embeddings_fixture[:40]
+    fields = np.tile(books, (3, 1))
+    # Only book 12's title matches the query.
+    query = clustered_embeddings_fixture[399]
+    fields[12] = query
+    engine = SearchEngine(
+        FlatIndex(books),
+        [{"title": f"Book {i}"} for i in range(40)],
+        field_index=FieldIndex(fields, books),
+        field_weights={"book": 1.0},
+    )
+
+    default_rows, default_scores = engine.search(query, 3)
+    title_rows, _ = engine.search(query, 3, field_weights={"book": 0.0, "title": 1.0})
+    batch_rows, _ = engine.search_batch(
+        query[np.newaxis, :], 3, field_weights={"book": 0.0, "title": 1.0}
+    )[0]
+
+    # Assertions
+    exact_rows, exact_scores = FlatIndex(books).search(query, 3)
+    assert list(default_rows) == list(exact_rows)
+    assert np.allclose(default_scores, exact_scores, atol=1e-5)
+    assert title_rows[0] == 12 and list(batch_rows) == list(title_rows)
+    with pytest.raises(ValueError):
+        engine.resolve_field_weights({"book": 0.0})
+    engine.field_candidates = 3
+    reranked_rows, _ = engine.search(
+        query, 3, field_weights={"book": 0.0, "title": 1.0}
+    )
+    assert set(reranked_rows) == set(exact_rows), "Only index candidates are rescored"
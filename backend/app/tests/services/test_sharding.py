@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from app.pipelines.load import save_embedding_index
+from app.services.semantic_search import (
+    FlatIndex,
+    ProjectedIndex,
+    fit_projection,
+    normalize_embeddings,
+    project_embeddings,
+)
+from app.services.sharding import ShardedIndex, merge_shard_results, shard_bounds
+
+
+@pytest.fixture
+def corpus_fixture(tmp_path):
+    rng = np.random.default_rng(3)
+    embeddings = normalize_embeddings(rng.normal(size=(301, 16)))
+    index_file = tmp_path / "book_embeddings.bin"
+    save_embedding_index(embeddings, index_file, "fake-model", normalized=True)
+    return embeddings, index_file
+
+
+def test_shard_bounds_cover_the_corpus():
+    bounds = shard_bounds(301, 4)
+
+    # Assertions
+    assert bounds[0] == 0 and bounds[-1] == 301
+    assert np.all(np.diff(bounds) >= 75)
+
+
+def test_merge_shard_results_keeps_global_top_k():
+    rows, scores = merge_shard_results(
+        [
+            (np.array([3, 1]), np.array([0.9, 0.5])),
+            (np.array([10, 12]), np.array([0.95, 0.1])),
+            (np.array([]), np.array([])),
+        ],
+        k=3,
+    )
+
+    # Assertions
+    assert rows.tolist() == [10, 3, 1]
+    assert np.allclose(scores, [0.95, 0.9, 0.5])
+
+
+def test_sharded_index_matches_exact_search(corpus_fixture):
+    embeddings, index_file = corpus_fixture
+    exact = FlatIndex(embeddings)
+    sharded = ShardedIndex(embeddings, index_file, ["local", "local"], timeout=60)
+    try:
+        queries = embeddings[[0, 150, 300]]
+        batch = sharded.search_batch(queries, 5)
+        single_rows, _ = sharded.search(queries[1], 5)
+    finally:
+        sharded.close()
+
+    # Assertions
+    for query, (rows, scores) in zip(queries, batch):
+        expected_rows, expected_scores = exact.search(query, 5)
+        assert rows.tolist() == expected_rows.tolist()
+        assert np.allclose(scores, expected_scores, atol=1e-6)
+    assert single_rows.tolist() == batch[1][0].tolist()
+
+
+def test_sharded_index_applies_one_corpus_projection(corpus_fixture):
+    embeddings, index_file = corpus_fixture
+    projection = fit_projection(embeddings, 8)
+    reduced = ProjectedIndex(
+        projection, FlatIndex(project_embeddings(embeddings, projection))
+    )
+    sharded = ShardedIndex(
+        embeddings, index_file, ["local", "local"], timeout=60, projection=projection
+    )
+    try:
+        batch = sharded.search_batch(embeddings[[0, 150, 300]], 5)
+    finally:
+        sharded.close()
+
+    # Assertions
+    for query, (rows, scores) in zip(embeddings[[0, 150, 300]], batch):
+        expected_rows, expected_scores = reduced.search(query, 5)
+        assert rows.tolist() == expected_rows.tolist()
+        assert np.allclose(scores, expected_scores, atol=1e-6)
+
+
+def test_sharded_index_degrades_when_a_shard_is_unreachable(corpus_fixture):
+    embeddings, index_file = corpus_fixture
+    sharded = ShardedIndex(
+        embeddings, index_file, ["local", "http://127.0.0.1:9"], timeout=60
+    )
+    try:
+        rows, _ = sharded.search(embeddings[0], 5)
+    finally:
+        sharded.close()
+
+    # Assertions
+    assert rows[0] == 0, "The local shard should still answer"
+    assert np.all(rows < sharded.bounds[1]), "Only rows of the live shard are returned"
+    assert sharded.degraded_responses == 1, "The partial response should be flagged"
+
+
+def test_warmed_up_shards_answer_within_a_short_timeout(corpus_fixture):
+    embeddings, index_file = corpus_fixture
+    sharded = ShardedIndex(embeddings, index_file, ["local", "local"], timeout=5)
+    try:
+        sharded.warm_up()
+        sharded.timeout = 0.5
+        rows, _ = sharded.search(embeddings[300], 5)
+    finally:
+        sharded.close()
+
+    # Assertions
+    assert rows[0] == 300, "Both shards should answer once their workers are up"
+    assert sharded.degraded_responses == 0
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from app.services.semantic_search import SearchEngine, normalize_embeddings
+from app.services.shared_corpus import (
+    SharedMetadata,
+    open_shared_corpus,
+    save_metadata_blob,
+)
+
+BOOKS = [
+    {"book_id": "/works/OL1W", "title": "Dune", "subjects": "science fiction"},
+    {"book_id": "/works/OL2W", "title": "Emma", "description": "Café society ✓"},
+    {"book_id": "/works/OL3W", "title": "", "year": ""},
+]
+
+
+@pytest.fixture
+def corpus_loader():
+    embeddings = normalize_embeddings(np.random.default_rng(0).normal(size=(3, 8)))
+    calls = []
+
+    def load_corpus():
+        calls.append(1)
+        return embeddings, BOOKS, "fake-model"
+
+    return embeddings, load_corpus, calls
+
+
+def test_metadata_blob_round_trip(tmp_path):
+    path = tmp_path / "book_metadata.bin"
+    save_metadata_blob(BOOKS, path)
+    books = SharedMetadata(path)
+
+    # Assertions
+    assert len(books) == 3
+    assert list(books) == BOOKS
+    assert books[-1] == BOOKS[2]
+    assert books[1:] == BOOKS[1:]
+    with pytest.raises(IndexError):
+        books[3]
+
+
+def test_shared_corpus_is_published_once_per_version(tmp_path, corpus_loader):
+    embeddings, load_corpus, calls = corpus_loader
+
+    first, books, _ = open_shared_corpus(tmp_path, "v1", load_corpus)
+    second, _, _ = open_shared_corpus(tmp_path, "v1", load_corpus)
+    open_shared_corpus(tmp_path, "v2", load_corpus)
+
+    # Assertions
+    assert len(calls) == 2
+    assert np.allclose(first, embeddings) and np.allclose(second, embeddings)
+    assert not first.flags.writeable
+    assert books[0] == BOOKS[0]
+    assert (tmp_path / "VERSION").read_text() == "v2"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_search_engine_serves_from_shared_corpus(tmp_path, corpus_loader):
+    embeddings, load_corpus, _ = corpus_loader
+    shared_embeddings, books, _ = open_shared_corpus(tmp_path, "v1", load_corpus)
+    engine = SearchEngine.from_embeddings(shared_embeddings, books, normalized=True)
+
+    results = engine.top_k_books(embeddings[1], k=1)
+
+    # Assertions
+    assert results[0][0]["title"] == "Emma"
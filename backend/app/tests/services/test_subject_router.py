@@ -0,0 +1,128 @@
+import asyncio
+
+import httpx
+import numpy as np
+import pytest
+
+from app.pipelines.embed import refresh_book_embeddings
+from app.services.metadata_filter import MetadataIndex
+from app.services.subject_router import (
+    SubjectRouter,
+    live_subject_books,
+    routed_filters,
+)
+
+SUBJECTS = ["Fantasy", "History", "Cooking"]
+
+
+class FakeModel:
+    """Embeds each subject as its own axis."""
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+    def encode(self, texts, batch_size=32, device=None, normalize_embeddings=False):
+        vectors = np.zeros((len(texts), 4), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vectors[row, [s.lower() for s in SUBJECTS].index(text.lower())] = 1.0
+        return vectors
+
+
+class FakeOpenLibrary:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    async def search_subjects(self, query):
+        await asyncio.sleep(self.delay)
+        return {
+            "docs": [
+                {
+                    "key": "/works/OL1W",
+                    "title": "Dragon Tales",
+                    "author_name": ["A. Writer"],
+                    "subject": ["Fantasy"],
+                    "first_publish_year": 1999,
+                }
+            ]
+        }
+
+
+@pytest.fixture
+def router_fixture():
+    return SubjectRouter(SUBJECTS, np.eye(3, 4), top_n=2, min_score=0.5)
+
+
+def test_route_returns_top_subjects_above_threshold(router_fixture):
+    routed = router_fixture.route(np.array([0.8, 0.6, 0.1, 0.0]))
+
+    # Assertions
+    assert [subject for subject, _ in routed] == ["Fantasy", "History"]
+    assert routed[0][1] > routed[1][1]
+    assert router_fixture.route(np.array([0.1, 0.1, 0.1, 1.0])) == []
+
+
+def test_load_checks_subject_list(tmp_path):
+    index_file = tmp_path / "subject_embeddings.bin"
+    refresh_book_embeddings(FakeModel(), SUBJECTS, index_file, "fake-model")
+
+    router = SubjectRouter.load(index_file, SUBJECTS)
+
+    # Assertions
+    assert router.route(np.array([0.0, 0.0, 1.0, 0.0]))[0][0] == "Cooking"
+    with pytest.raises(ValueError):
+        SubjectRouter.load(index_file, ["Cooking", "Fantasy", "History"])
+
+
+def test_routed_filters_restrict_or_fall_back_to_live(router_fixture):
+    books = [{"subjects": "fantasy", "year": "2001"}] * 3 + [
+        {"subjects": "history", "year": "1990"}
+    ]
+    metadata_index = MetadataIndex.build(books)
+    query = np.array([1.0, 0.0, 0.0, 0.0])
+
+    restricted, live = routed_filters(router_fixture, metadata_index, query, {}, 3)
+    thin, thin_live = routed_filters(
+        router_fixture, metadata_index, query, {"year_max": 1995}, 3
+    )
+    explicit, _ = routed_filters(
+        router_fixture, metadata_index, query, {"subjects": ["cooking"]}, 3
+    )
+
+    # Assertions
+    assert restricted == {"subjects": ["Fantasy"]} and live == []
+    assert thin == {"year_max": 1995} and thin_live == ["Fantasy"]
+    assert explicit == {"subjects": ["cooking"]}, "Explicit subjects are kept"
+
+
+@pytest.mark.asyncio
+async def test_live_subject_books_maps_results_and_times_out():
+    books = await live_subject_books(FakeOpenLibrary(), ["Fantasy"], limit=5)
+    slow = await live_subject_books(
+        FakeOpenLibrary(delay=1.0), ["Fantasy"], limit=5, timeout=0.05
+    )
+
+    # Assertions
+    assert books == [
+        {
+            "book_id": "OL1W",
+            "title": "Dragon Tales",
+            "author": "A. Writer",
+            "subjects": "Fantasy",
+            "year": "1999",
+            "source": "openlibrary",
+        }
+    ]
+    assert slow == []
+
+
+class FailingOpenLibrary:
+    async def search_subjects(self, query):
+        raise httpx.ConnectError("Open Library is down")
+
+
+@pytest.mark.asyncio
+async def test_live_subject_books_returns_nothing_when_the_lookup_fails():
+    books = await live_subject_books(FailingOpenLibrary(), ["Fantasy"], limit=5)
+
+    # Assertions
+    assert books == []
@@ -0,0 +1,97 @@
+import random
+
+import numpy as np
+
+from app.pipelines.knn_graph import build_knn_graph
+from app.services.knn_graph import KnnGraph
+from app.services.semantic_search import SearchEngine, normalize_embeddings
+from app.services.suggest import (
+    SUGGESTION_KINDS,
+    SuggestIndex,
+    picked_suggestion_books,
+    suggestion_keys,
+)
+
+
+def test_suggest_completes_word_starts_by_popularity(retrieved_context_fixture):
+    index = SuggestIndex.build(retrieved_context_fixture)
+
+    suggestions = index.suggest("Hunt", k=3)
+
+    # Assertions
+    assert [(s["text"], s["type"]) for s in suggestions] == [
+        ("hunter x hunter", "title"),
+        ("erin hunter", "author"),
+        ("hunter", "subject"),
+    ]
+    assert suggestions[0]["row"] == 0
+    assert index.suggest("shadow")[0]["text"] == "long shadow"
+    assert index.suggest("zzz") == [] and index.suggest("  ") == []
+
+
+def test_suggest_normalizes_complete_query_words(retrieved_context_fixture):
+    index = SuggestIndex.build(retrieved_context_fixture)
+
+    # Assertions
+    assert index.suggest("The Long Sh")[0]["text"] == "long shadow"
+    assert index.suggest("long shadows ")[0]["text"] == "long shadow"
+    # Complete words are folded and matched against the folded form of stored keys.
+    assert suggestion_keys("chaos theory") == ["chaos theory", "chao theory"]
+    chaos = SuggestIndex.build([{"title": "chaos theory"}])
+    assert chaos.suggest("Chaos th")[0]["text"] == "chaos theory"
+    assert chaos.suggest("chaos")[0]["text"] == "chaos theory"
+
+
+def test_suggest_matches_brute_force_with_precomputed_prefixes():
+    rng = random.Random(0)
+    words = ["".join(rng.choices("abcd", k=rng.randint(1, 4))) for _ in range(60)]
+    books = [
+        {
+            "title": " ".join(rng.choices(words, k=rng.randint(1, 3))),
+            "author": rng.choice(words[:10]),
+            "subjects": ", ".join(rng.choices(words[:20], k=rng.randint(0, 3))),
+        }
+        for _ in range(300)
+    ]
+    index = SuggestIndex.build(books, scan_limit=16)
+
+    # Assertions
+    assert index._top, "Short prefixes should be precomputed"
+    for prefix in ["a", "ab", "b c", "dd", "abcd", "c"]:
+        best = {}
+        for text, kind, prior in zip(index.texts, index.kinds, index.priors):
+            keys = [key.split() for key in suggestion_keys(text)]
+            if any(
+                " ".join(words[i:]).startswith(prefix)
+                for words in keys
+                for i in range(len(words))
+            ):
+                key = (text, SUGGESTION_KINDS[kind])
+                best[key] = max(best.get(key, 0.0), float(prior))
+        suggestions = index.suggest(prefix, k=5)
+        priors = [best[(s["text"], s["type"])] for s in suggestions]
+        assert len(suggestions) == min(5, len(best))
+        assert priors == sorted(best.values(), reverse=True)[: len(priors)]
+
+
+def test_picked_suggestion_books_tops_up_with_neighbors(retrieved_context_fixture):
+    embeddings = normalize_embeddings(
+        np.random.default_rng(0).normal(size=(len(retrieved_context_fixture), 8))
+    )
+    engine = SearchEngine.from_embeddings(
+        embeddings, retrieved_context_fixture, normalized=True
+    )
+    neighbors, scores = build_knn_graph(embeddings, num_neighbors=2)
+    book_ids = [book["book_id"] for book in retrieved_context_fixture]
+    engine.knn_graph = KnnGraph(neighbors, scores, np.asarray(book_ids))
+
+    books = picked_suggestion_books(engine, book_ids[3], k=3)
+
+    # Assertions
+    assert [book["book_id"] for book in books] == [
+        book_ids[3],
+        *(book_ids[row] for row in neighbors[3]),
+    ]
+    assert picked_suggestion_books(engine, "/works/missing") == []
+    engine.knn_graph = None
+    assert picked_suggestion_books(engine, book_ids[3]) == []